@@ -3,28 +3,31 @@ import pandas as pd
 import io
 import os
 from datetime import datetime, timedelta
-from config import COLLEGES, BRANCH_FULL_FORM, CSS_COLLEGE_SELECTOR, CSS_MAIN_APP
-from data_processing import read_timetable
+from config import COLLEGES, BRANCH_FULL_FORM, CSS_COLLEGE_SELECTOR, CSS_MAIN_APP, SESSION_PRESETS, DEFAULT_SESSION_PRESET
+from sessions import SessionModel
+from upload_cache import read_timetable_cached
+from progress import BufferedSink
+from cp_scheduler import cp_backend_available
+from campus_partition import schedule_by_campus
+from incremental import reschedule_incrementally
+from venues import read_venues, schedule_with_venues, allocate_rooms
+from enrollment import read_enrollments
 from scheduling import (
-    schedule_all_subjects_comprehensively,
     validate_capacity_constraints,
+    validate_student_clashes,
     optimize_schedule_by_filling_gaps,
     optimize_oe_subjects_after_scheduling,
     schedule_electives_globally,
-    find_next_valid_day_for_electives,
-    get_valid_dates_in_range
-)
-from generation import (
-    save_to_excel,
-    save_verification_excel,
-    generate_pdf_timetable
+    find_next_valid_day_for_electives
 )
+from exam_calendar import get_calendar
+from generation import build_artifacts, build_artifact, schedule_fingerprint
 from utils import (
     format_subject_display,
     format_elective_display,
-    get_preferred_slot,
     calculate_end_time,
-    normalize_date_to_ddmmyyyy
+    is_open_elective,
+    compact_categories
 )
 
 # Set page configuration for college selector
@@ -144,9 +147,8 @@ def init_session_state():
         'custom_holidays': [None],
         'timetable_data': {},
         'processing_complete': False,
-        'excel_data': None,
-        'pdf_data': None,
-        'verification_data': None,
+        'artifact_fingerprint': None,
+        'artifact_cache': {},
         'total_exams': 0,
         'total_semesters': 0,
         'total_branches': 0,
@@ -154,7 +156,15 @@ def init_session_state():
         'unique_exam_days': 0,
         'capacity_slider': 2000,
         'holidays_set': set(),
-        'original_df': None
+        'original_df': None,
+        'scheduling_backend': 'greedy',
+        'solver_time_budget': 30,
+        'improve_seconds': 0,
+        'multistart_runs': 1,
+        'session_preset': DEFAULT_SESSION_PRESET,
+        'room_allocation': None,
+        'scheduled_holidays': None,
+        'schedule_context': None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -208,19 +218,117 @@ def configure_sidebar():
         max_value=3000,
         value=st.session_state.capacity_slider,
         step=100,
-        help="Set the maximum number of students allowed in a single session (morning or afternoon)",
+        help="Set the maximum number of students allowed in a single exam session",
         key="capacity_slider"  # This binds it safely
     )
 
+    st.selectbox(
+        "Sessions per day",
+        options=list(SESSION_PRESETS),
+        key="session_preset",
+        help="Three-session days pack the timetable into fewer calendar days during peak weeks"
+    )
+
     # Display current value
-    st.info(f"Current capacity: **{st.session_state.capacity_slider}** students per session")
+    st.info(f"Current capacity: **{st.session_state.capacity_slider}** students per session, "
+            f"{len(SESSION_PRESETS[st.session_state.session_preset])} sessions per day")
 
     st.markdown('<div style="margin-top: 2rem;"></div>', unsafe_allow_html=True)
 
+    with st.expander("Session Capacities", expanded=False):
+        configure_session_capacities()
+
+    with st.expander("Advanced Scheduling", expanded=False):
+        configure_scheduling_engine()
+
+    with st.expander("Venue Inventory", expanded=False):
+        configure_venues()
+
+    with st.expander("Student Enrollments", expanded=False):
+        configure_enrollments()
+
     # Holiday configuration
     with st.expander("Holiday Configuration", expanded=True):
         configure_holidays()
 
+def configure_session_capacities():
+    """Optional capacity per session of the selected preset (0 = the students-per-session slider)."""
+    for label, _ in SESSION_PRESETS[st.session_state.session_preset]:
+        st.number_input(
+            label,
+            min_value=0,
+            max_value=10000,
+            step=100,
+            key=f"session_capacity_{label}",
+            help="Seats in this session; leave at 0 to use the maximum students per session"
+        )
+
+def current_session_model():
+    """
+    SessionModel for the selected preset, with the slider as the default session capacity
+    and any per-session capacities from the sidebar applied.
+    """
+    model = SessionModel.from_preset(st.session_state.session_preset,
+                                     default_capacity=st.session_state.capacity_slider)
+    for session in model.sessions:
+        capacity = st.session_state.get(f"session_capacity_{session.label}", 0)
+        if capacity:
+            session.capacity = int(capacity)
+    return model
+
+def configure_scheduling_engine():
+    """Configure the scheduling backend and its time budget."""
+    st.radio(
+        "Scheduling engine",
+        options=["greedy", "cp"],
+        format_func=lambda b: "Greedy (fast)" if b == "greedy" else "Exact CP-SAT (tighter timetables)",
+        key="scheduling_backend",
+        help="The exact engine starts from the greedy timetable and only replaces it when it finds a shorter one"
+    )
+    if st.session_state.scheduling_backend == "cp":
+        if not cp_backend_available():
+            st.warning("OR-Tools is not installed (pip install ortools) - the greedy engine will be used")
+        st.slider(
+            "Solver time budget (seconds)",
+            min_value=5,
+            max_value=300,
+            step=5,
+            key="solver_time_budget"
+        )
+    st.slider(
+        "Local search budget (seconds)",
+        min_value=0,
+        max_value=120,
+        step=5,
+        key="improve_seconds",
+        help="Spend extra CPU time moving and swapping exams to shorten the exam window (0 = off)"
+    )
+    st.slider(
+        "Parallel multi-start runs",
+        min_value=1,
+        max_value=16,
+        key="multistart_runs",
+        help="Schedule with several randomized subject orderings on all CPU cores and keep the best timetable (1 = off)"
+    )
+
+def configure_venues():
+    """Optional room list used to seat every session after scheduling."""
+    st.file_uploader(
+        "Rooms file (Room, Campus, Seats)",
+        type=['xlsx', 'xls', 'csv', 'parquet', 'feather', 'arrow'],
+        key="venue_file",
+        help="When provided, every session is allocated to real rooms and over-booked sessions are rescheduled"
+    )
+
+def configure_enrollments():
+    """Optional student -> module enrollment list for student-level clash checks."""
+    st.file_uploader(
+        "Enrollment file (StudentID, ModuleCode)",
+        type=['xlsx', 'xls', 'csv', 'parquet', 'feather', 'arrow'],
+        key="enrollment_file",
+        help="When provided, subjects that share a student are never placed in the same session"
+    )
+
 def configure_holidays():
     """Configure holidays in sidebar."""
     st.markdown("#### 📅 Select Predefined Holidays")
@@ -286,9 +394,9 @@ def process_upload_and_generate():
         """, unsafe_allow_html=True)
 
         uploaded_file = st.file_uploader(
-            "Choose an Excel file",
-            type=['xlsx', 'xls'],
-            help="Upload the Excel file containing your timetable data"
+            "Choose a timetable file",
+            type=['xlsx', 'xls', 'csv', 'parquet', 'feather', 'arrow'],
+            help="Upload the timetable data as Excel, CSV, Parquet or Feather/Arrow"
         )
 
         if uploaded_file is not None:
@@ -311,7 +419,7 @@ def process_upload_and_generate():
         <div class="feature-card">
             <h4>🚀 Features</h4>
             <ul>
-                <li>📊 Excel file processing</li>
+                <li>📊 Excel, CSV, Parquet and Arrow input</li>
                 <li>🎯 Common across semesters first</li>
                 <li>🔗 Common within semester scheduling</li>
                 <li>🔍 Gap-filling optimization</li>
@@ -330,66 +438,84 @@ def process_upload_and_generate():
     if st.session_state.get('uploaded_file') is not None:
         if st.button("📄 Generate Timetable", type="primary", use_container_width=True):
             with st.spinner("Processing your timetable... Please wait..."):
+                # Pipeline stages log into one buffer that is rendered once at the end
+                sink = BufferedSink()
                 try:
                     base_date = st.session_state.base_date
                     end_date = st.session_state.end_date
                     holidays_set = st.session_state.holidays_set
                     max_capacity = st.session_state.capacity_slider
+                    sessions = current_session_model()
+                    enrollment_file = st.session_state.get('enrollment_file')
+                    enrollment = read_enrollments(enrollment_file) if enrollment_file is not None else None
                     uploaded_file = st.session_state.uploaded_file
 
                     date_range_days = (end_date - base_date).days + 1
-                    valid_exam_days = len(get_valid_dates_in_range(base_date, end_date, holidays_set))
+                    valid_exam_days = len(get_calendar(base_date, end_date, holidays_set))
                     st.info(f"📅 Examination Period: {base_date.strftime('%d-%m-%Y')} to {end_date.strftime('%d-%m-%Y')} ({date_range_days} total days, {valid_exam_days} valid exam days)")
                 
-                    df_non_elec, df_ele, original_df = read_timetable(uploaded_file)
+                    df_non_elec, df_ele, original_df = read_timetable_cached(uploaded_file, sink=sink)
 
                     if df_non_elec is not None and not df_non_elec.empty:
                         # Super Scheduling
                         st.info("🚀 SUPER SCHEDULING: All subjects with frequency-based priority and daily branch coverage")
-                        df_scheduled = schedule_all_subjects_comprehensively(df_non_elec, holidays_set, base_date, end_date, MAX_STUDENTS_PER_SESSION=max_capacity)
-
-                        # Create semester dictionary for validation
-                        sem_dict_temp = {}
-                        for s in sorted(df_scheduled["Semester"].unique()):
-                            sem_data = df_scheduled[df_scheduled["Semester"] == s].copy()
-                            sem_dict_temp[s] = sem_data    
-
-                        # Validate capacity
-                        is_valid, violations = validate_capacity_constraints(
-                            sem_dict_temp, 
-                            max_capacity=max_capacity
+                        # Independent campuses are scheduled in parallel worker processes,
+                        # each with st.session_state.multistart_runs priority orderings
+                        engine_options = dict(
+                            backend=st.session_state.scheduling_backend,
+                            time_budget=st.session_state.solver_time_budget,
+                            improve_seconds=st.session_state.improve_seconds,
+                            sessions=sessions,
+                            enrollment=enrollment,
+                            n_starts=st.session_state.multistart_runs
                         )
-
-                        if is_valid:
-                            st.success(f"✅ All sessions meet the {max_capacity}-student capacity constraint!")
+                        venue_file = st.session_state.get('venue_file')
+                        inventory = read_venues(venue_file) if venue_file is not None else None
+                        st.session_state.room_allocation = None
+                        if inventory is not None:
+                            # Rooms are allocated again on the final timetable (see show_schedule_checks)
+                            df_scheduled, _, _ = schedule_with_venues(
+                                df_non_elec, holidays_set, base_date, end_date, inventory,
+                                MAX_STUDENTS_PER_SESSION=max_capacity, scheduler=schedule_by_campus, sink=sink,
+                                **engine_options
+                            )
                         else:
-                            st.error(f"⚠️ {len(violations)} session(s) exceed capacity:")
-                            for v in violations:
-                                st.warning(
-                                    f"  • {v['date']} at {v['time_slot']}: "
-                                    f"{v['student_count']} students ({v['excess']} over {max_capacity} limit, "
-                                    f"{v['subjects_count']} subjects)"
-                                )
+                            df_scheduled = schedule_by_campus(
+                                df_non_elec, holidays_set, base_date, end_date,
+                                MAX_STUDENTS_PER_SESSION=max_capacity, sink=sink,
+                                **engine_options
+                            )
+
+                        # Day bounds come from the scheduler's own conflict-graph pre-pass
+                        day_bounds = df_scheduled.attrs.get('schedule_metrics', {})
+                        if day_bounds.get('lower_bound_days', 0) > valid_exam_days:
+                            st.error(f"❌ This timetable needs at least {day_bounds['lower_bound_days']} exam days, "
+                                     f"but the selected range only has {valid_exam_days}. Extend the end date "
+                                     f"or remove holidays - some subjects remain unscheduled.")
+                        elif day_bounds:
+                            st.info(f"📐 Needs at least {day_bounds['lower_bound_days']} exam days "
+                                    f"(about {day_bounds['colouring_days']} expected); {valid_exam_days} available")
 
                         # Handle electives
                         max_non_elec_date = None
-                        non_elec_dates = pd.to_datetime(df_scheduled['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+                        non_elec_dates = df_scheduled['Exam Date'].dropna()
                         if not non_elec_dates.empty:
-                            max_non_elec_date = max(non_elec_dates).date()
+                            max_non_elec_date = non_elec_dates.max().date()
                         
                         all_scheduled_subjects = df_scheduled
                         if df_ele is not None and not df_ele.empty:
-                            all_scheduled_subjects = handle_electives(df_scheduled, df_ele, end_date, holidays_set, max_non_elec_date)
+                            all_scheduled_subjects = handle_electives(df_scheduled, df_ele, end_date, holidays_set, max_non_elec_date, sink=sink)
                         
                         # Filter successfully scheduled
                         successfully_scheduled = all_scheduled_subjects[
-                            (all_scheduled_subjects['Exam Date'] != "") & 
-                            (all_scheduled_subjects['Exam Date'] != "Out of Range")
+                            all_scheduled_subjects['Exam Date'].notna()
                         ].copy()
                         
-                        # Count subjects that couldn't be scheduled
+                        # Count schedulable subjects that didn't get a date (NaT)
                         out_of_range_subjects = all_scheduled_subjects[
-                            all_scheduled_subjects['Exam Date'] == "Out of Range"
+                            all_scheduled_subjects['Exam Date'].isna()
+                            & (all_scheduled_subjects['Category'] != 'INTD')
+                            & ~is_open_elective(all_scheduled_subjects)
                         ]
                         
                         if not out_of_range_subjects.empty:
@@ -416,14 +542,14 @@ def process_upload_and_generate():
                             
                             # Optimize gaps
                             sem_dict, gap_moves_made, gap_optimization_log = optimize_schedule_by_filling_gaps(
-                                sem_dict, holidays_set, base_date, end_date
+                                sem_dict, holidays_set, base_date, end_date, sink=sink
                             )
 
                             # Step 8: Optimize OE subjects AFTER gap optimization
                             oe_moves_made = 0
                             oe_optimization_log = []
                             if df_ele is not None and not df_ele.empty:
-                                sem_dict, oe_moves_made, oe_optimization_log = optimize_oe_subjects_after_scheduling(sem_dict, holidays_set)        
+                                sem_dict, oe_moves_made, oe_optimization_log = optimize_oe_subjects_after_scheduling(sem_dict, holidays_set, sink=sink)
 
                             # Show combined optimization results
                             total_optimizations = oe_moves_made + gap_moves_made
@@ -434,15 +560,25 @@ def process_upload_and_generate():
                             if gap_moves_made > 0:
                                 st.info(f"📉 Gap Fill Optimizations: {gap_moves_made}")
 
+                            # Validate the final timetable: the gap and OE optimizers move rows after scheduling
+                            show_schedule_checks(sem_dict, max_capacity, sessions, enrollment, inventory)
+
+                            st.session_state.schedule_metrics = df_scheduled.attrs.get('schedule_metrics', {})
                             st.session_state.timetable_data = sem_dict
                             st.session_state.original_df = original_df
+                            st.session_state.scheduled_holidays = set(holidays_set)
+                            # Inputs of this run, so a holiday repair keeps its sessions, students and rooms
+                            st.session_state.schedule_context = dict(
+                                max_capacity=max_capacity, sessions=sessions,
+                                enrollment=enrollment, inventory=inventory
+                            )
                             st.session_state.processing_complete = True
 
                             # Compute statistics
                             compute_and_store_stats(sem_dict, valid_exam_days)
 
-                            # Generate and store downloadable files
-                            generate_files(sem_dict, original_df)
+                            # Downloadable files are built on demand
+                            register_artifacts(sem_dict)
 
                             st.markdown('<div class="status-success">🎉 Timetable generated successfully with THREE-PHASE SCHEDULING and NO DOUBLE BOOKINGS!</div>',
                                         unsafe_allow_html=True)
@@ -466,24 +602,93 @@ def process_upload_and_generate():
                     st.markdown(f'<div class="status-error">❌ An error occurred: {str(e)}</div>',
                                 unsafe_allow_html=True)
 
-def handle_electives(df_scheduled, df_ele, end_date, holidays_set, max_non_elec_date):
+                render_progress_log(sink)
+
+        scheduled_holidays = st.session_state.scheduled_holidays
+        if (st.session_state.processing_complete and scheduled_holidays is not None
+                and scheduled_holidays != st.session_state.holidays_set):
+            st.info("📅 Holidays changed since the timetable was generated.")
+            if st.button("🔧 Repair schedule for holiday changes", use_container_width=True):
+                repair_schedule_for_holiday_changes()
+
+def repair_schedule_for_holiday_changes():
+    """
+    Move only the exams hit by the holiday delta; everything else keeps its published date.
+    The repair uses the sessions, enrollment list and rooms of the run that produced the timetable.
+    """
+    sink = BufferedSink()
+    try:
+        holidays_set = st.session_state.holidays_set
+        previous = st.session_state.scheduled_holidays
+        previous_df = pd.concat(st.session_state.timetable_data.values(), ignore_index=True)
+        context = st.session_state.schedule_context or dict(
+            max_capacity=st.session_state.capacity_slider, sessions=current_session_model(),
+            enrollment=None, inventory=None
+        )
+
+        repaired_df, report = reschedule_incrementally(
+            previous_df, holidays_set, st.session_state.base_date, st.session_state.end_date,
+            MAX_STUDENTS_PER_SESSION=context['max_capacity'],
+            added_holidays=holidays_set - previous, removed_holidays=previous - holidays_set,
+            sink=sink, sessions=context['sessions'], enrollment=context['enrollment'],
+            inventory=context['inventory']
+        )
+
+        sem_dict = {}
+        for s in sorted(repaired_df["Semester"].unique()):
+            sem_dict[s] = repaired_df[repaired_df["Semester"] == s].copy()
+
+        valid_exam_days = len(get_calendar(st.session_state.base_date, st.session_state.end_date, holidays_set))
+        st.session_state.timetable_data = sem_dict
+        st.session_state.scheduled_holidays = set(holidays_set)
+        compute_and_store_stats(sem_dict, valid_exam_days)
+        register_artifacts(sem_dict)
+
+        st.success(f"✅ Schedule repaired in {report['seconds'] * 1000:.0f} ms: "
+                   f"{len(report['moved'])} exams moved, all others unchanged")
+        show_schedule_checks(sem_dict, context['max_capacity'], context['sessions'],
+                             context['enrollment'], context['inventory'])
+    except Exception as e:
+        st.markdown(f'<div class="status-error">❌ Repair failed: {str(e)}</div>', unsafe_allow_html=True)
+
+    render_progress_log(sink)
+
+def render_progress_log(sink):
+    """Render a buffered pipeline log once: problems up front, everything else in one expander."""
+    if not sink.events:
+        return
+
+    for event in sink.by_level("error"):
+        st.error(event['message'])
+    for event in sink.by_level("warning"):
+        st.warning(event['message'])
+
+    if any(event.get('celebrate') for event in sink.events):
+        st.balloons()
+
+    counts = sink.counts()
+    with st.expander(f"📜 Processing log ({len(sink.events)} events, "
+                     f"{counts['warning']} warnings, {counts['error']} errors)"):
+        st.text(sink.as_text())
+
+def handle_electives(df_scheduled, df_ele, end_date, holidays_set, max_non_elec_date, sink=None):
     """Handle elective scheduling."""
     # Find the maximum date from non-elective scheduling
     if max_non_elec_date is None:
-        non_elec_dates = pd.to_datetime(df_scheduled['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+        non_elec_dates = df_scheduled['Exam Date'].dropna()
         if not non_elec_dates.empty:
-            max_non_elec_date = max(non_elec_dates).date()
+            max_non_elec_date = non_elec_dates.max().date()
     
-    # Check if electives can be scheduled within end date
-    elective_day1 = find_next_valid_day_for_electives(
-        datetime.combine(max_non_elec_date, datetime.min.time()) + timedelta(days=1), 
-        holidays_set
-    )
-    elective_day2 = find_next_valid_day_for_electives(elective_day1 + timedelta(days=1), holidays_set)
+    # Check if electives can be scheduled within end date (one calendar serves both lookups)
+    first_day = datetime.combine(max_non_elec_date, datetime.min.time()) + timedelta(days=1)
+    calendar = get_calendar(first_day, end_date, holidays_set)
+    elective_day1 = find_next_valid_day_for_electives(first_day, holidays_set, calendar=calendar)
+    elective_day2 = find_next_valid_day_for_electives(elective_day1 + timedelta(days=1), holidays_set,
+                                                      calendar=calendar)
     
     if elective_day2 <= end_date:
         # Schedule electives globally
-        df_ele_scheduled = schedule_electives_globally(df_ele, max_non_elec_date, holidays_set)
+        df_ele_scheduled = schedule_electives_globally(df_ele, max_non_elec_date, holidays_set, sink=sink)
         
         # Combine non-electives and electives
         all_scheduled_subjects = pd.concat([df_scheduled, df_ele_scheduled], ignore_index=True)
@@ -492,6 +697,53 @@ def handle_electives(df_scheduled, df_ele, end_date, holidays_set, max_non_elec_
         all_scheduled_subjects = df_scheduled
     return all_scheduled_subjects
 
+def show_schedule_checks(sem_dict, max_capacity, sessions, enrollment=None, inventory=None):
+    """
+    Report session capacity violations and, when given, student clashes (enrollment) and
+    room shortfalls (venue inventory) of a timetable. The room allocation is stored in
+    st.session_state.room_allocation.
+    """
+    is_valid, violations = validate_capacity_constraints(sem_dict, max_capacity=max_capacity, sessions=sessions)
+    if is_valid:
+        st.success(f"✅ All sessions meet the {max_capacity}-student capacity constraint!")
+    else:
+        st.error(f"⚠️ {len(violations)} session(s) exceed capacity:")
+        for v in violations:
+            st.warning(
+                f"  • {v['date']:%d-%m-%Y} at {v['time_slot']}: "
+                f"{v['student_count']} students ({v['excess']} over {v['capacity']} limit, "
+                f"{v['subjects_count']} subjects)"
+            )
+
+    # Student-level clashes (only when an enrollment list was uploaded)
+    if enrollment is not None:
+        no_clashes, clashes = validate_student_clashes(sem_dict, enrollment)
+        if no_clashes:
+            st.success(f"✅ No student sits two exams in one session ({len(enrollment)} students checked)")
+        else:
+            st.error(f"⚠️ {len(clashes)} session(s) have students with two exams:")
+            for v in clashes:
+                st.warning(
+                    f"  • {v['date']:%d-%m-%Y} at {v['time_slot']}: {v['student_count']} students "
+                    f"(e.g. {', '.join(map(str, v['students'][:5]))})"
+                )
+
+    # Rooms (only when a venue inventory was uploaded)
+    if inventory is not None:
+        room_allocation, shortfalls = allocate_rooms(pd.concat(sem_dict.values(), ignore_index=True), inventory)
+        st.session_state.room_allocation = room_allocation
+        if shortfalls:
+            st.error(f"🏫 {len(shortfalls)} session(s) could not be fully seated in the available rooms:")
+            for v in shortfalls:
+                st.warning(
+                    f"  • {v['date']:%d-%m-%Y} at {v['time_slot']} ({v['campus'] or 'all campuses'}): "
+                    f"{v['shortfall']} of {v['student_count']} students without a seat ({v['seats']} seats)"
+                )
+        else:
+            st.success(f"🏫 Every session seated: {len(room_allocation)} room assignments")
+        with st.expander("🏫 Room Allocation"):
+            st.dataframe(room_allocation, use_container_width=True)
+
 def compute_and_store_stats(sem_dict, valid_exam_days):
     """Compute and store statistics in session state."""
     final_all_data = pd.concat(sem_dict.values(), ignore_index=True)
@@ -499,7 +751,7 @@ def compute_and_store_stats(sem_dict, valid_exam_days):
     total_semesters = len(sem_dict)
     total_branches = len(final_all_data['Branch'].unique())
 
-    all_dates = pd.to_datetime(final_all_data['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+    all_dates = final_all_data['Exam Date'].dropna()
     overall_date_range = (max(all_dates) - min(all_dates)).days + 1 if len(all_dates) > 0 else 0
     unique_exam_days = len(all_dates.dt.date.unique())
 
@@ -510,53 +762,72 @@ def compute_and_store_stats(sem_dict, valid_exam_days):
     st.session_state.overall_date_range = overall_date_range
     st.session_state.unique_exam_days = unique_exam_days
 
-def generate_files(sem_dict, original_df):
-    """Generate Excel, PDF, and verification files."""
-    # Get college name from session state
-    college_name = st.session_state.get('selected_college', 'NMIMS University')
-    
-    # Generate Excel
-    try:
-        excel_buffer = save_to_excel(sem_dict, college_name)
-        if excel_buffer:
-            st.session_state.excel_data = excel_buffer.getvalue()
-            st.success("✅ Excel file generated successfully")
-        else:
-            st.warning("⚠️ Excel generation completed but no data returned")
-            st.session_state.excel_data = None
-    except Exception as e:
-        st.error(f"❌ Excel generation failed: {str(e)}")
-        st.session_state.excel_data = None
+# Download artifacts: session_state key -> (button label, file name prefix, extension, mime type)
+ARTIFACT_DOWNLOADS = {
+    'excel': ("📊 Excel File", "complete_timetable", "xlsx",
+              "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'pdf': ("📄 PDF File", "complete_timetable", "pdf", "application/pdf"),
+    'verification': ("📋 Verification File", "verification", "xlsx",
+                     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
 
-    # Generate verification file
-    try:
-        verification_buffer = save_verification_excel(sem_dict, college_name)
-        if verification_buffer:
-            st.session_state.verification_data = verification_buffer.getvalue()
-            st.success("✅ Verification file generated successfully")
-        else:
-            st.warning("⚠️ Verification file generation completed but no data returned")
-            st.session_state.verification_data = None
-    except Exception as e:
-        st.error(f"❌ Verification file generation failed: {str(e)}")
-        st.session_state.verification_data = None
+# Memoized artifacts kept across reruns (oldest dropped first)
+ARTIFACT_CACHE_SIZE = 6
 
-    # Generate PDF
-    try:
-        if sem_dict:
-            pdf_buffer = generate_pdf_timetable(sem_dict, college_name)
-            if pdf_buffer:
-                st.session_state.pdf_data = pdf_buffer.getvalue()
-                st.success("✅ PDF generated successfully")
-            else:
-                st.warning("⚠️ PDF generation completed but no data returned")
-                st.session_state.pdf_data = None
-        else:
-            st.warning("⚠️ No data available for PDF generation")
-            st.session_state.pdf_data = None
-    except Exception as e:
-        st.error(f"❌ PDF generation failed: {str(e)}")
-        st.session_state.pdf_data = None
+def register_artifacts(sem_dict):
+    """Fingerprint the new schedule; files are only built when a download is requested."""
+    college_name = st.session_state.get('selected_college', 'NMIMS University')
+    st.session_state.artifact_fingerprint = schedule_fingerprint(sem_dict, college_name)
+
+def artifact_key(name):
+    # The verification workbook is byte-identical to the main one, so they share a cache entry
+    return (st.session_state.artifact_fingerprint, 'excel' if name == 'verification' else name)
+
+def get_artifact(name):
+    """Bytes of one artifact for the current schedule, built on first request and memoized by fingerprint."""
+    cache = st.session_state.artifact_cache
+    key = artifact_key(name)
+    if key not in cache:
+        college_name = st.session_state.get('selected_college', 'NMIMS University')
+        cache[key] = build_artifact(name, st.session_state.timetable_data, college_name)
+        while len(cache) > ARTIFACT_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+    return cache[key]
+
+def prepare_all_artifacts():
+    """Build every missing artifact at once, concurrently (see generation.build_artifacts)."""
+    college_name = st.session_state.get('selected_college', 'NMIMS University')
+    artifacts = build_artifacts(st.session_state.timetable_data, college_name)
+    for name in ('excel', 'pdf'):
+        if name in artifacts['errors']:
+            st.error(f"❌ {ARTIFACT_DOWNLOADS[name][0]} generation failed: {artifacts['errors'][name]}")
+        elif artifacts[name] is not None:
+            st.session_state.artifact_cache[artifact_key(name)] = artifacts[name]
+    st.success("✅ Files prepared in " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in artifacts['timings'].items()
+                                                   if name != 'verification'))
+
+def render_artifact_download(name):
+    """'Prepare' button until the artifact exists, then the download button."""
+    label, prefix, extension, mime = ARTIFACT_DOWNLOADS[name]
+    data = st.session_state.artifact_cache.get(artifact_key(name))
+    if data is None and st.session_state.timetable_data:
+        if st.button(f"⚙️ Prepare {label}", use_container_width=True, key=f"prepare_{name}"):
+            try:
+                with st.spinner(f"Building {label}..."):
+                    data = get_artifact(name)
+            except Exception as e:
+                st.error(f"❌ {label} generation failed: {str(e)}")
+    if data:
+        st.download_button(
+            label=f"Download {label}",
+            data=data,
+            file_name=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            use_container_width=True,
+            key=f"download_{name}"
+        )
+    elif not st.session_state.timetable_data:
+        st.button(f"{label} Not Available", disabled=True, use_container_width=True, key=f"unavailable_{name}")
 
 def display_scheduling_summary(valid_exam_days):
     """Display scheduling summary messages."""
@@ -567,6 +838,11 @@ def display_scheduling_summary(valid_exam_days):
     
     date_range_utilization = (st.session_state.unique_exam_days / valid_exam_days) * 100 if valid_exam_days > 0 else 0
     st.info(f"📅 **Date Range Utilization: {date_range_utilization:.1f}%** ({st.session_state.unique_exam_days}/{valid_exam_days} valid days used)")
+
+    metrics = st.session_state.get('schedule_metrics') or {}
+    if metrics.get('lower_bound_days'):
+        st.info(f"📐 **Schedule Quality: {metrics['quality_ratio']:.2f}×** the minimum possible "
+                f"({metrics['span_days']} exam days used, at least {metrics['lower_bound_days']} required; 1.00 is optimal)")
     
     # Count subjects by type for summary
     final_all_data = pd.concat(st.session_state.timetable_data.values(), ignore_index=True)
@@ -584,7 +860,7 @@ def display_scheduling_summary(valid_exam_days):
         )
     ])
     
-    elective_count = len(final_all_data[final_all_data['OE'].notna() & (final_all_data['OE'].str.strip() != "")])
+    elective_count = len(final_all_data[is_open_elective(final_all_data)])
     uncommon_count = st.session_state.total_exams - common_across_count - common_within_count - elective_count
     
     st.success(f"📈 **Scheduling Breakdown:**\n• Common Across Semesters: {common_across_count}\n• Common Within Semester: {common_within_count}\n• Truly Uncommon: {uncommon_count}\n• Electives: {elective_count}")
@@ -596,46 +872,22 @@ def display_results():
     # Download options
     st.markdown("### 📥 Download Options")
 
+    if st.session_state.timetable_data and not all(
+            artifact_key(name) in st.session_state.artifact_cache for name in ARTIFACT_DOWNLOADS):
+        if st.button("⚙️ Prepare All Downloads", key="prepare_all"):
+            with st.spinner("Building Excel and PDF..."):
+                prepare_all_artifacts()
+
     col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
-        if st.session_state.excel_data:
-            st.download_button(
-                label="📊 Download Excel File",
-                data=st.session_state.excel_data,
-                file_name=f"complete_timetable_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True,
-                key="download_excel"
-            )
-        else:
-            st.button("📊 Excel Not Available", disabled=True, use_container_width=True)
+        render_artifact_download('excel')
 
     with col2:
-        if st.session_state.pdf_data:
-            st.download_button(
-                label="📄 Download PDF File",
-                data=st.session_state.pdf_data,
-                file_name=f"complete_timetable_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mime="application/pdf",
-                use_container_width=True,
-                key="download_pdf"
-            )
-        else:
-            st.button("📄 PDF Not Available", disabled=True, use_container_width=True)
+        render_artifact_download('pdf')
 
     with col3:
-        if st.session_state.verification_data:
-            st.download_button(
-                label="📋 Download Verification File",
-                data=st.session_state.verification_data,
-                file_name=f"verification_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True,
-                key="download_verification"
-            )
-        else:
-            st.button("📋 Verification Not Available", disabled=True, use_container_width=True)
+        render_artifact_download('verification')
 
     with col4:
         st.link_button("♻️ Re-upload Verification File", "https://verification-file-change-to-pdf-converter.streamlit.app/", use_container_width=True)
@@ -646,9 +898,7 @@ def display_results():
             st.session_state.processing_complete = False
             st.session_state.timetable_data = {}
             st.session_state.original_df = None
-            st.session_state.excel_data = None
-            st.session_state.pdf_data = None
-            st.session_state.verification_data = None
+            st.session_state.artifact_fingerprint = None
             st.session_state.total_exams = 0
             st.session_state.total_semesters = 0
             st.session_state.total_branches = 0
@@ -677,13 +927,13 @@ def display_statistics():
         final_all_data = pd.concat(st.session_state.timetable_data.values(), ignore_index=True)
     
         # Separate non-elective and OE subjects
-        non_elective_data = final_all_data[~(final_all_data['OE'].notna() & (final_all_data['OE'].str.strip() != ""))]
-        oe_data = final_all_data[final_all_data['OE'].notna() & (final_all_data['OE'].str.strip() != "")]
+        non_elective_data = final_all_data[~is_open_elective(final_all_data)]
+        oe_data = final_all_data[is_open_elective(final_all_data)]
 
         # Calculate non-elective date range
         non_elec_display = "No data"
         if not non_elective_data.empty:
-            non_elec_dates = pd.to_datetime(non_elective_data['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+            non_elec_dates = non_elective_data['Exam Date'].dropna()
             if not non_elec_dates.empty:
                 non_elec_range = (max(non_elec_dates) - min(non_elec_dates)).days + 1
                 non_elec_start = min(non_elec_dates).strftime("%d %B")
@@ -697,7 +947,7 @@ def display_statistics():
         # Calculate OE date range
         oe_display = "No OE subjects"
         if not oe_data.empty:
-            oe_dates = pd.to_datetime(oe_data['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+            oe_dates = oe_data['Exam Date'].dropna()
             if not oe_dates.empty:
                 unique_oe_dates = sorted(oe_dates.dt.strftime("%d %B").unique())
                 
@@ -713,8 +963,8 @@ def display_statistics():
         # Calculate gap between non-elective and OE
         gap_display = "N/A"
         if not non_elective_data.empty and not oe_data.empty:
-            non_elec_dates = pd.to_datetime(non_elective_data['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
-            oe_dates = pd.to_datetime(oe_data['Exam Date'], format="%d-%m-%Y", errors='coerce').dropna()
+            non_elec_dates = non_elective_data['Exam Date'].dropna()
+            oe_dates = oe_data['Exam Date'].dropna()
             
             if not non_elec_dates.empty and not oe_dates.empty:
                 max_non_elec = max(non_elec_dates)
@@ -777,7 +1027,7 @@ def display_statistics():
                     unsafe_allow_html=True)
 
     # Show gap-filling efficiency
-    total_possible_slots = st.session_state.overall_date_range * 2  # 2 slots per day
+    total_possible_slots = st.session_state.overall_date_range * len(SESSION_PRESETS[st.session_state.session_preset])
     actual_exams = st.session_state.total_exams
     slot_utilization = min(100, (actual_exams / total_possible_slots * 100)) if total_possible_slots > 0 else 0
     
@@ -798,27 +1048,25 @@ def display_timetable():
 
     # Define the subject display formatting functions for Streamlit display
     def format_subject_display(row):
-        """Format subject display for non-electives in Streamlit interface"""
+        """
+        Format subject display for non-electives in Streamlit interface.
+        The session itself is shown from the row's Time Slot; only exams shorter or longer
+        than the 3-hour session get their own time range.
+        """
         subject = row['Subject']
         time_slot = row['Time Slot']
         duration = row.get('Exam Duration', 3)
-        is_common = row.get('CommonAcrossSems', False)
-        semester = row['Semester']
 
         # NEW: Add CM Group prefix
         cm_group = str(row.get('CMGroup', '')).strip()
         cm_group_prefix = f"[{cm_group}] " if cm_group and cm_group != "" and cm_group != "nan" else ""
 
-        preferred_slot = get_preferred_slot(semester)
-
         time_range = ""
 
         if duration != 3 and time_slot and time_slot.strip():
             start_time = time_slot.split(' - ')[0].strip()
             end_time = calculate_end_time(start_time, duration)
             time_range = f" ({start_time} - {end_time})"
-        elif is_common and time_slot != preferred_slot and time_slot and time_slot.strip():
-            time_range = f" ({time_slot})"
 
         return cm_group_prefix + subject + time_range
 
@@ -855,8 +1103,9 @@ def display_timetable():
 
             if not df_mb.empty:
                 # Separate non-electives and electives for display
-                df_non_elec = df_mb[df_mb['OE'].isna() | (df_mb['OE'].str.strip() == "")].copy()
-                df_elec = df_mb[df_mb['OE'].notna() & (df_mb['OE'].str.strip() != "")].copy()
+                oe_rows = is_open_elective(df_mb)
+                df_non_elec = compact_categories(df_mb[~oe_rows].copy())
+                df_elec = compact_categories(df_mb[oe_rows].copy())
 
                 # Display non-electives
                 if not df_non_elec.empty:
@@ -865,14 +1114,13 @@ def display_timetable():
                     try:
                         # Apply formatting
                         df_non_elec["SubjectDisplay"] = df_non_elec.apply(format_subject_display, axis=1)
-                        df_non_elec["Exam Date"] = pd.to_datetime(df_non_elec["Exam Date"], format="%d-%m-%Y", errors='coerce')
                         df_non_elec = df_non_elec.sort_values(by="Exam Date", ascending=True)
                        
-                        # Create a simple table format
+                        # Create a simple table format: one row per session
                         display_data = []
-                        for date, group in df_non_elec.groupby('Exam Date'):
+                        for (date, time_slot), group in df_non_elec.groupby(['Exam Date', 'Time Slot'], observed=True):
                             date_str = date.strftime("%d-%m-%Y") if pd.notna(date) else "Unknown Date"
-                            row_data = {'Exam Date': date_str}
+                            row_data = {'Exam Date': date_str, 'Time Slot': str(time_slot)}
                            
                             # Add subjects for each SubBranch
                             for subbranch in df_non_elec['SubBranch'].unique():
@@ -883,7 +1131,7 @@ def display_timetable():
                        
                         if display_data:
                             display_df = pd.DataFrame(display_data)
-                            display_df = display_df.set_index('Exam Date')
+                            display_df = display_df.set_index(['Exam Date', 'Time Slot'])
                             st.dataframe(display_df, use_container_width=True)
                         else:
                             st.write("No core subjects to display")
@@ -903,16 +1151,16 @@ def display_timetable():
                     try:
                         # Apply formatting
                         df_elec["SubjectDisplay"] = df_elec.apply(format_elective_display, axis=1)
-                        df_elec["Exam Date"] = pd.to_datetime(df_elec["Exam Date"], format="%d-%m-%Y", errors='coerce')
                         df_elec = df_elec.sort_values(by="Exam Date", ascending=True)
                        
                         # Create elective display
                         elec_display_data = []
-                        for (oe_type, date), group in df_elec.groupby(['OE', 'Exam Date']):
+                        for (oe_type, date, time_slot), group in df_elec.groupby(['OE', 'Exam Date', 'Time Slot'], observed=True):
                             date_str = date.strftime("%d-%m-%Y") if pd.notna(date) else "Unknown Date"
                             subjects = ", ".join(group['SubjectDisplay'].tolist())
                             elec_display_data.append({
                                 'Exam Date': date_str,
+                                'Time Slot': str(time_slot),
                                 'OE Type': oe_type,
                                 'Subjects': subjects
                             })
@@ -0,0 +1,307 @@
+"""
+Compiled atomic subject units for the scheduler.
+
+An atomic unit is every eligible row sharing one ModuleCode: a common subject
+must be examined on the same date and slot for every branch that takes it, so
+the scheduler places units, never individual rows. Units are compiled once into
+integer-coded NumPy arrays so the day-by-day loop never touches the DataFrame;
+assignments are accumulated per unit and written back in a single pass.
+"""
+import numpy as np
+import pandas as pd
+
+WORD_BITS = 64
+
+
+def popcount(mask):
+    """Number of set bits in a Python-int bitmask"""
+    return bin(mask).count("1")
+
+
+def iter_bits(mask):
+    """Yield the ids of the set bits of a Python-int bitmask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BranchSemIndex:
+    """
+    Interns branch-semester keys ("<Branch>_<Semester>") to integer ids so that a
+    set of branch-semesters can be held as one Python-int bitmask (bit i = id i).
+    """
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.ids = {}
+        for label in labels:
+            self.intern(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_words(self):
+        return max(1, -(-len(self.labels) // WORD_BITS))
+
+    @property
+    def full_mask(self):
+        return (1 << len(self.labels)) - 1
+
+    def intern(self, label):
+        if label not in self.ids:
+            self.ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self.ids[label]
+
+    def mask_of(self, labels):
+        mask = 0
+        for label in labels:
+            mask |= 1 << self.ids[label]
+        return mask
+
+    def labels_of(self, mask):
+        return [label for i, label in enumerate(self.labels) if mask >> i & 1]
+
+    def to_words(self, mask):
+        """Pack a bitmask into a uint64 word array (for vectorized AND across units)"""
+        words = np.zeros(self.n_words, dtype=np.uint64)
+        for w in range(self.n_words):
+            words[w] = (mask >> (w * WORD_BITS)) & 0xFFFFFFFFFFFFFFFF
+        return words
+
+
+class AtomicUnits:
+    """
+    Integer-coded atomic units of one scheduling problem.
+
+    Unit u owns the DataFrame rows row_positions[row_ptr[u]:row_ptr[u + 1]]
+    (positional indexes into the frame that was compiled). All per-unit
+    attributes are arrays/lists indexed by u.
+    """
+
+    def __init__(self, module_codes, subject_names, row_ptr, row_positions, students,
+                 frequency, is_common, is_common_across, is_common_within,
+                 cross_semester_span, cross_branch_span, unique_semesters, unique_branches,
+                 branch_sem_combinations, priority_score, category, branch_sem_index,
+                 branch_sem_mask, branch_sem_words):
+        self.module_codes = module_codes
+        self.subject_names = subject_names
+        self.row_ptr = row_ptr
+        self.row_positions = row_positions
+        self.students = students
+        self.frequency = frequency
+        self.is_common = is_common
+        self.is_common_across = is_common_across
+        self.is_common_within = is_common_within
+        self.cross_semester_span = cross_semester_span
+        self.cross_branch_span = cross_branch_span
+        self.unique_semesters = unique_semesters
+        self.unique_branches = unique_branches
+        self.branch_sem_combinations = branch_sem_combinations
+        self.priority_score = priority_score
+        self.category = category
+        self.branch_sem_index = branch_sem_index
+        self.branch_sem_mask = branch_sem_mask
+        self.branch_sem_words = branch_sem_words
+
+    def __len__(self):
+        return len(self.module_codes)
+
+    @property
+    def row_counts(self):
+        return np.diff(self.row_ptr)
+
+    def rows_of(self, unit):
+        """Positional row indexes of one unit"""
+        return self.row_positions[self.row_ptr[unit]:self.row_ptr[unit + 1]]
+
+    @property
+    def branch_sem_labels(self):
+        return self.branch_sem_index.labels
+
+    def conflicting(self, day_mask):
+        """Boolean array: which units share at least one branch-semester with day_mask"""
+        day_words = self.branch_sem_index.to_words(day_mask)
+        return (self.branch_sem_words & day_words).any(axis=1)
+
+    def priority_order(self):
+        """Unit ids sorted by descending priority score (ties keep module-code order)"""
+        return np.argsort(-self.priority_score, kind='stable')
+
+
+# Tier names in scheduling order (tier id = position)
+PRIORITY_TIERS = ("Very High", "High", "Medium", "Low")
+
+
+def assign_priority_tiers(units):
+    """
+    Assign every unit its priority tier in one vectorized pass.
+
+    Very High: common across semesters or taken by 8+ branch-semesters
+    High:      common within the semester
+    Medium:    taken by 2+ branch-semesters
+    Low:       everything else
+    Each unit lands in the first tier it qualifies for.
+    """
+    tier = np.full(len(units), 3, dtype=np.int64)
+    tier[units.frequency >= 2] = 2
+    tier[units.is_common_within] = 1
+    tier[units.is_common_across | (units.frequency >= 8)] = 0
+    return tier
+
+
+def tiered_queue(units, tier, seed=None):
+    """
+    Unit ids ordered by tier, then descending priority score within the tier.
+    With a seed, priority scores are randomly scaled by +/-25% (and ties broken
+    randomly) so that repeated runs explore different greedy orderings.
+    """
+    if seed is None:
+        by_priority = units.priority_order()
+    else:
+        rng = np.random.default_rng(seed)
+        perturbed = units.priority_score * rng.uniform(0.75, 1.25, len(units)) + rng.random(len(units))
+        by_priority = np.argsort(-perturbed, kind='stable')
+    return by_priority[np.argsort(tier[by_priority], kind='stable')]
+
+
+def _unique_per_unit(unit_codes, value_codes, n_values):
+    """
+    Unique (unit, value) pairs from two aligned integer code arrays.
+    Returns (pair_units, pair_values) sorted by unit, then value.
+    """
+    pairs = np.unique(unit_codes.astype(np.int64) * max(n_values, 1) + value_codes)
+    return pairs // max(n_values, 1), pairs % max(n_values, 1)
+
+
+def _split_by_unit(pair_units, pair_values, labels, n_units):
+    """Group the values of (unit, value) pairs into one list of labels per unit"""
+    bounds = np.searchsorted(pair_units, np.arange(n_units + 1))
+    labels = np.asarray(labels, dtype=object)
+    return [labels[pair_values[bounds[u]:bounds[u + 1]]].tolist() for u in range(n_units)]
+
+
+def compile_atomic_units(df, row_positions):
+    """
+    Compile the rows at `row_positions` of `df` into AtomicUnits.
+
+    Args:
+        df (DataFrame): timetable frame (needs ModuleCode, Subject, Branch, Semester, StudentCount)
+        row_positions (array-like): positional indexes of the rows eligible for scheduling
+
+    Returns:
+        AtomicUnits: units in ModuleCode order
+    """
+    row_positions = np.asarray(row_positions, dtype=np.int64)
+    sub = df.iloc[row_positions]
+
+    unit_codes, module_codes = pd.factorize(sub['ModuleCode'], sort=True)
+    valid = unit_codes >= 0
+    if not valid.all():
+        # Rows without a module code cannot form a unit (groupby drops them too)
+        sub = sub[valid]
+        row_positions = row_positions[valid]
+        unit_codes = unit_codes[valid]
+    n_units = len(module_codes)
+
+    # unit -> rows (CSR layout, rows keep their original relative order)
+    order = np.argsort(unit_codes, kind='stable')
+    row_counts = np.bincount(unit_codes, minlength=n_units)
+    row_ptr = np.zeros(n_units + 1, dtype=np.int64)
+    np.cumsum(row_counts, out=row_ptr[1:])
+    unit_row_positions = row_positions[order]
+    first_rows = order[row_ptr[:-1]]
+
+    # Precomputed student totals
+    row_students = pd.to_numeric(sub['StudentCount'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    students = np.bincount(unit_codes, weights=row_students, minlength=n_units).astype(np.int64)
+
+    # Branch-semester, branch and semester memberships
+    semesters = sub['Semester'].to_numpy()
+    branches = sub['Branch'].astype(str).to_numpy()
+    bs_codes, bs_labels = pd.factorize(pd.Series(branches) + "_" + pd.Series(semesters).astype(str))
+    branch_codes, branch_labels = pd.factorize(pd.Series(branches))
+    sem_codes, sem_labels = pd.factorize(pd.Series(semesters), sort=True)
+
+    bs_units, bs_values = _unique_per_unit(unit_codes, bs_codes, len(bs_labels))
+    br_units, br_values = _unique_per_unit(unit_codes, branch_codes, len(branch_labels))
+    sem_units, sem_values = _unique_per_unit(unit_codes, sem_codes, len(sem_labels))
+
+    # Bitsets: one Python int per unit for the scalar AND, plus packed uint64 words
+    # so a day mask can be tested against every unit at once
+    branch_sem_index = BranchSemIndex(bs_labels)
+    branch_sem_words = np.zeros((n_units, branch_sem_index.n_words), dtype=np.uint64)
+    np.bitwise_or.at(
+        branch_sem_words,
+        (bs_units, bs_values // WORD_BITS),
+        np.left_shift(np.uint64(1), (bs_values % WORD_BITS).astype(np.uint64)),
+    )
+    branch_sem_mask = [0] * n_units
+    for unit, bs in zip(bs_units.tolist(), bs_values.tolist()):
+        branch_sem_mask[unit] |= 1 << bs
+
+    frequency = np.bincount(bs_units, minlength=n_units)
+    branch_count = np.bincount(br_units, minlength=n_units)
+    semester_count = np.bincount(sem_units, minlength=n_units)
+
+    def first_value(column, default):
+        if column not in sub.columns:
+            return np.full(n_units, default, dtype=object)
+        return sub[column].to_numpy()[first_rows]
+
+    is_common_across = first_value('CommonAcrossSems', False).astype(bool)
+    is_common_within = first_value('IsCommon', 'NO') == 'YES'
+    is_common = is_common_across | is_common_within | (frequency > 1)
+    cross_semester_span = semester_count > 1
+    cross_branch_span = branch_count > 1
+
+    priority_score = (
+        frequency * 10
+        + np.where(is_common_across, 50, np.where(is_common_within, 25, np.where(frequency > 1, 15, 0)))
+        + np.where(cross_semester_span, 15, 0)
+        + np.where(cross_branch_span, 10, 0)
+    ).astype(np.int64)
+
+    return AtomicUnits(
+        module_codes=list(module_codes),
+        subject_names=first_value('Subject', '').tolist(),
+        row_ptr=row_ptr,
+        row_positions=unit_row_positions,
+        students=students,
+        frequency=frequency,
+        is_common=is_common,
+        is_common_across=is_common_across,
+        is_common_within=is_common_within,
+        cross_semester_span=cross_semester_span,
+        cross_branch_span=cross_branch_span,
+        unique_semesters=_split_by_unit(sem_units, sem_values, sem_labels, n_units),
+        unique_branches=_split_by_unit(br_units, br_values, branch_labels, n_units),
+        branch_sem_combinations=_split_by_unit(bs_units, bs_values, bs_labels, n_units),
+        priority_score=priority_score,
+        category=first_value('Category', 'UNKNOWN').tolist(),
+        branch_sem_index=branch_sem_index,
+        branch_sem_mask=branch_sem_mask,
+        branch_sem_words=branch_sem_words,
+    )
+
+
+def write_back_assignments(df, units, unit_day, unit_slot, day_labels, slot_labels):
+    """
+    Write per-unit assignments into df['Exam Date'] (datetime64) / df['Time Slot'] in one
+    vectorized pass. day_labels are the dates of the day ids. Units with unit_day < 0 are left untouched.
+    """
+    row_counts = units.row_counts
+    row_day = np.repeat(unit_day, row_counts)
+    row_slot = np.repeat(unit_slot, row_counts)
+    scheduled = row_day >= 0
+    if not scheduled.any():
+        return df
+
+    positions = units.row_positions[scheduled]
+    dates = pd.DatetimeIndex(day_labels).to_numpy()[row_day[scheduled]]
+    slots = np.asarray(slot_labels, dtype=object)[row_slot[scheduled]]
+    df.iloc[positions, df.columns.get_loc('Exam Date')] = dates
+    df.iloc[positions, df.columns.get_loc('Time Slot')] = slots
+    return df
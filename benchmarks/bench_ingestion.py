@@ -0,0 +1,140 @@
+"""
+Benchmark of the normalization stage (data_processing.normalize_timetable).
+
+Builds synthetic catalogues of 1k, 10k and 100k rows shaped like a registrar
+export and times the normalization alone (no Excel parse). With the stage fully
+vectorized the time per row stays roughly flat as the catalogue grows.
+
+Two checks make the run fail (exit status 1):
+  * up to VERIFY_MAX_ROWS rows, the derived columns must equal the row-wise
+    normalization the stage replaced (semester conversion, branch identifier,
+    MainBranch/SubBranch split, within-semester IsCommon loop);
+  * the time per row may grow by at most MAX_SCALING_RATIO from one size to the
+    next, i.e. the stage scales linearly.
+
+    python benchmarks/bench_ingestion.py [rows ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing import SEMESTER_MAPPINGS, normalize_timetable  # noqa: E402
+
+SEMESTER_LABELS = ["Sem I", "Sem II", "Sem III", "Sem IV", "Sem V", "Sem VI", "Sem VII", "Sem VIII"]
+PROGRAMS = ["B TECH", "MBA TECH", "B TECH INTEGRATED", "DIPLOMA", "M TECH"]
+STREAMS = ["COMPUTER", "MECHANICAL", "CIVIL", "ELECTRICAL", "DATA SCIENCE", "AI", ""]
+CATEGORIES = ["COMP", "ELEC", "INTD"]
+
+# Time per row may grow at most this much between consecutive sizes
+MAX_SCALING_RATIO = 2.0
+# Largest catalogue checked against the (slow) row-wise baseline
+VERIFY_MAX_ROWS = 10_000
+DERIVED_COLUMNS = ["Semester", "Branch", "MainBranch", "SubBranch", "IsCommon"]
+
+
+def synthetic_catalogue(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    n_modules = max(10, n_rows // 4)
+    module_ids = rng.integers(0, n_modules, n_rows)
+    return pd.DataFrame({
+        "Program": rng.choice(PROGRAMS, n_rows),
+        "Stream": rng.choice(STREAMS, n_rows),
+        "Current Session": rng.choice(SEMESTER_LABELS, n_rows),
+        "Module Description": [f"Subject {m}" for m in module_ids],
+        "Module Abbreviation": [f"MOD{m:06d}" for m in module_ids],
+        "Campus Name": rng.choice(["Mumbai", "Shirpur", "Navi Mumbai"], n_rows),
+        "Difficulty Score": rng.integers(1, 5, n_rows),
+        "Exam Duration": 3,
+        "Student count": rng.integers(10, 200, n_rows),
+        "Common across sems": rng.random(n_rows) < 0.05,
+        "Category": rng.choice(CATEGORIES, n_rows, p=[0.8, 0.15, 0.05]),
+        "OE": np.where(rng.random(n_rows) < 0.05, "OE1", ""),
+    })
+
+
+def rowwise_baseline(catalogue):
+    """The derived columns as the row-wise normalization computed them (apply / per-group loop)"""
+    df = pd.DataFrame(index=catalogue.index)
+    program = catalogue["Program"].fillna("").astype(str)
+    stream = catalogue["Stream"].fillna("").astype(str)
+    module_code = catalogue["Module Abbreviation"].fillna("").astype(str)
+
+    def convert_sem(sem):
+        if pd.isna(sem):
+            return 0
+        return SEMESTER_MAPPINGS.get(str(sem).strip(), 0)
+
+    def create_branch_identifier(row):
+        p, s = str(row["Program"]).strip(), str(row["Stream"]).strip()
+        if not s or s == "nan" or s == p:
+            return p
+        return f"{p}-{s}"
+
+    def split_br(b):
+        parts = str(b).split("-", 1)
+        return (parts[0].strip(), "") if len(parts) == 1 else (parts[0].strip(), parts[1].strip())
+
+    df["Semester"] = catalogue["Current Session"].apply(convert_sem).astype(int)
+    df["Branch"] = pd.DataFrame({"Program": program, "Stream": stream}).apply(create_branch_identifier, axis=1)
+    split = df["Branch"].apply(split_br)
+    df["MainBranch"] = split.str[0]
+    df["SubBranch"] = split.str[1]
+
+    df["IsCommon"] = np.where(catalogue["Common across sems"].fillna(False).astype(bool), "YES", "NO")
+    grouped = pd.DataFrame({"Semester": df["Semester"], "ModuleCode": module_code,
+                            "Branch": df["Branch"], "Program": program})
+    for _, group in grouped.groupby(["Semester", "ModuleCode"]):
+        if len(group["Branch"].unique()) > 1 or len(group["Program"].unique()) > 1:
+            df.loc[group.index, "IsCommon"] = "YES"
+    return df
+
+
+def verify_against_baseline(catalogue):
+    """Names of the derived columns where normalize_timetable differs from the row-wise baseline"""
+    _, _, full = normalize_timetable(catalogue.copy())
+    expected = rowwise_baseline(catalogue).loc[full.index]
+    return [column for column in DERIVED_COLUMNS
+            if not (full[column].astype(str).to_numpy() == expected[column].astype(str).to_numpy()).all()]
+
+
+def bench(n_rows, repeats=3):
+    catalogue = synthetic_catalogue(n_rows)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        normalize_timetable(catalogue.copy())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    sizes = sorted(int(arg) for arg in sys.argv[1:]) or [1_000, 10_000, 100_000]
+    failures = []
+    previous = None
+    print(f"{'rows':>8} {'seconds':>9} {'us/row':>8} {'growth':>7}  baseline")
+    for n_rows in sizes:
+        seconds = bench(n_rows)
+        per_row = seconds / n_rows * 1e6
+        growth = per_row / previous if previous else 1.0
+        if growth > MAX_SCALING_RATIO:
+            failures.append(f"{n_rows} rows: time per row grew {growth:.2f}x (limit {MAX_SCALING_RATIO}x)")
+
+        baseline = "skipped"
+        if n_rows <= VERIFY_MAX_ROWS:
+            mismatched = verify_against_baseline(synthetic_catalogue(n_rows))
+            baseline = "match" if not mismatched else f"MISMATCH in {', '.join(mismatched)}"
+            if mismatched:
+                failures.append(f"{n_rows} rows: output differs from the row-wise baseline in {', '.join(mismatched)}")
+
+        print(f"{n_rows:>8} {seconds:>9.3f} {per_row:>8.2f} {growth:>6.2f}x  {baseline}")
+        previous = per_row
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: output matches the row-wise baseline and time per row grows at most {MAX_SCALING_RATIO}x per size step")
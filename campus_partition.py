@@ -0,0 +1,269 @@
+"""
+Per-campus parallel scheduling.
+
+Campuses are independent scheduling problems unless something couples them: a
+common subject (one ModuleCode) taught on several campuses must still sit in one
+session, a branch-semester present on several campuses must not clash, and
+(with enrollment data) subjects sharing a student must not share a session.
+Campuses are merged with a union-find over those shared keys; every resulting
+partition is scheduled in its own worker process and the results are stitched
+back together in the original row order.
+
+Session capacity is shared across the university, so each partition gets a
+share of every session's capacity proportional to its students. The combined
+timetable can therefore never exceed the global capacity. A subject larger than
+its partition's share would fit in a joint schedule but not in the partition,
+so in that case every campus is scheduled together instead. With campus_seats
+(from a venue inventory) a partition is also capped at its own campuses' seats,
+and per-campus session capacities (campus_capacity_overrides) only tighten the
+partitions holding those campuses.
+
+With n_starts > 1 every partition is also tried with several priority orderings
+(as in multistart.py); all partition x ordering runs share one process pool and
+the best run of each partition is kept.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from multistart import schedule_multistart, score_schedule
+from parallel import run_in_processes
+from progress import BufferedSink, get_sink
+from scheduling import schedule_all_subjects_comprehensively, _eligible_mask
+from sessions import SessionModel
+
+
+class _UnionFind:
+    """Disjoint sets over 0..n-1"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        self.parent[self.find(i)] = self.find(j)
+
+
+def _campus_labels(df):
+    if 'Campus' not in df.columns:
+        return pd.Series("", index=df.index)
+    return df['Campus'].astype(object).fillna("").astype(str).str.strip()
+
+
+def partition_by_campus(df, enrollment=None):
+    """
+    Group df's rows into independently schedulable campus partitions.
+    With an enrollment.EnrollmentMatrix, campuses whose subjects share students are coupled too.
+
+    Returns:
+        list: (campus names, positional row indexes) per partition, largest first
+    """
+    campus_codes, campuses = pd.factorize(_campus_labels(df))
+    if len(campuses) <= 1:
+        return [(list(campuses), np.arange(len(df)))]
+
+    # Couple campuses that share a module or a branch-semester among the rows that get scheduled
+    uf = _UnionFind(len(campuses))
+    eligible = _eligible_mask(df).to_numpy()
+    coupling_keys = [
+        df['ModuleCode'].astype(str),
+        df['Branch'].astype(str) + "_" + df['Semester'].astype(str),
+    ]
+    for key in coupling_keys:
+        pairs = pd.DataFrame({'key': key.to_numpy()[eligible], 'campus': campus_codes[eligible]}).drop_duplicates()
+        first = pairs.groupby('key')['campus'].transform('first')
+        for a, b in zip(first.to_numpy(), pairs['campus'].to_numpy()):
+            if a != b:
+                uf.union(int(a), int(b))
+
+    if enrollment is not None:
+        modules = pd.DataFrame({'module': df['ModuleCode'].astype(str).to_numpy()[eligible],
+                                'campus': campus_codes[eligible]}).drop_duplicates('module')
+        module_campus = modules['campus'].to_numpy()
+        shared = enrollment.co_enrollment(modules['module'].tolist())
+        for i, j in zip(shared.row.tolist(), shared.col.tolist()):
+            if module_campus[i] != module_campus[j]:
+                uf.union(int(module_campus[i]), int(module_campus[j]))
+
+    roots = np.array([uf.find(c) for c in range(len(campuses))])
+    row_roots = roots[campus_codes]
+    partitions = [
+        ([campuses[c] for c in np.flatnonzero(roots == root)], np.flatnonzero(row_roots == root))
+        for root in np.unique(roots)
+    ]
+    return sorted(partitions, key=lambda partition: -len(partition[1]))
+
+
+def _schedule_partition(args):
+    """Worker entry point (top level so it can be pickled)"""
+    part, frame, holidays, base_date, end_date, max_students, sessions, seed, schedule_kwargs = args
+    sink = BufferedSink()
+    t_start = time.perf_counter()
+    scheduled = schedule_all_subjects_comprehensively(
+        frame, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=max_students,
+        sink=sink, sessions=sessions, ordering_seed=seed, **schedule_kwargs
+    )
+    return (part, seed, score_schedule(scheduled, max_students, sessions), scheduled,
+            sink.by_level("warning", "error"), time.perf_counter() - t_start)
+
+
+def _campus_kwargs(schedule_kwargs, campuses, sessions, share, campus_seats, campus_overrides):
+    """
+    schedule_kwargs for one group of campuses: global session_capacity_overrides scaled by
+    its share, tightened by the per-campus ones of its campuses (a campus without an
+    override for that session counts with its seats).
+    """
+    kwargs = dict(schedule_kwargs)
+    overrides = {key: int(capacity * share)
+                 for key, capacity in (schedule_kwargs.get('session_capacity_overrides') or {}).items()}
+    for day, label in {(day, label) for day, label, campus in campus_overrides if campus in campuses}:
+        default = sessions.capacity_of_label(label, 0)
+        capacity = sum(campus_overrides.get((day, label, campus), campus_seats.get(campus, default))
+                       for campus in campuses)
+        overrides[(day, label)] = min(capacity, overrides.get((day, label), capacity))
+    kwargs['session_capacity_overrides'] = overrides
+    return kwargs
+
+
+def _oversized_unit(df, partitions, partition_sessions, students, eligible):
+    """(module code, students, campuses) of the first unit larger than every session of its partition, or None"""
+    modules = df['ModuleCode'].astype(str).to_numpy()
+    for (campuses, rows), part_sessions in zip(partitions, partition_sessions):
+        rows = rows[eligible[rows]]
+        unit_students = pd.Series(students[rows]).groupby(modules[rows]).sum()
+        if not unit_students.empty and unit_students.max() > max(part_sessions.capacities):
+            return unit_students.idxmax(), int(unit_students.max()), campuses
+    return None
+
+
+def _schedule_jointly(df, holidays, base_date, end_date, max_students, sessions, n_starts, seed, max_workers,
+                      sink, schedule_kwargs, campus_seats, campus_overrides):
+    schedule_kwargs = _campus_kwargs(schedule_kwargs, list(_campus_labels(df).unique()), sessions, 1.0,
+                                     campus_seats, campus_overrides)
+    if n_starts > 1:
+        return schedule_multistart(
+            df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=max_students, n_starts=n_starts,
+            max_workers=max_workers, seed=seed, sink=sink, sessions=sessions, **schedule_kwargs
+        )
+    return schedule_all_subjects_comprehensively(
+        df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=max_students,
+        sink=sink, sessions=sessions, **schedule_kwargs
+    )
+
+
+def schedule_by_campus(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=2000, sessions=None,
+                       n_starts=1, seed=0, campus_seats=None, campus_capacity_overrides=None,
+                       max_workers=None, sink=None, **schedule_kwargs):
+    """
+    Schedule each independent campus partition of df in its own process and combine the results.
+    A single partition, or a subject too large for its partition's capacity share, is scheduled
+    jointly (through multistart.schedule_multistart when n_starts > 1).
+
+    Args:
+        df (DataFrame): frame to schedule (not modified)
+        sessions (SessionModel): sessions of the day (None = the standard two sessions)
+        n_starts (int): priority orderings tried per partition; start 0 is the deterministic ordering
+        seed (int): base seed for the perturbed orderings
+        campus_seats (dict): campus -> seats available per session; caps each partition at its campuses' seats
+        campus_capacity_overrides (dict): (date, session label, campus) -> capacity, per-campus
+            counterpart of session_capacity_overrides
+        max_workers (int): pool size (default: all cores)
+        **schedule_kwargs: forwarded to schedule_all_subjects_comprehensively (backend, improve_seconds,
+            session_capacity_overrides, ...)
+
+    Returns:
+        DataFrame: the scheduled rows in df's order; df.attrs['schedule_metrics'] carries the
+        combined metrics plus 'partitions' (campuses, rows, seconds, span per partition)
+    """
+    sink = get_sink(sink)
+    if sessions is None:
+        sessions = SessionModel.from_preset(default_capacity=MAX_STUDENTS_PER_SESSION)
+
+    campus_seats = campus_seats or {}
+    campus_overrides = {(pd.Timestamp(day).normalize(), str(label), campus): capacity
+                        for (day, label, campus), capacity in (campus_capacity_overrides or {}).items()}
+
+    partitions = partition_by_campus(df, schedule_kwargs.get('enrollment'))
+    if len(partitions) == 1:
+        return _schedule_jointly(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION, sessions,
+                                 n_starts, seed, max_workers, sink, schedule_kwargs, campus_seats, campus_overrides)
+
+    # Capacity shares follow each partition's students
+    students = pd.to_numeric(df['StudentCount'], errors='coerce').fillna(0).to_numpy()
+    eligible = _eligible_mask(df).to_numpy()
+    total_students = max(1.0, float(students[eligible].sum()))
+    shares = [float(students[rows][eligible[rows]].sum()) / total_students for _, rows in partitions]
+    partition_sessions = [sessions.scaled(share) for share in shares]
+    for part, (campuses, _) in enumerate(partitions):
+        if all(campus in campus_seats for campus in campuses):
+            partition_sessions[part] = partition_sessions[part].capped(sum(campus_seats[c] for c in campuses))
+
+    oversized = _oversized_unit(df, partitions, partition_sessions, students, eligible)
+    if oversized is not None:
+        module_code, unit_students, campuses = oversized
+        sink.info(f"Campus partitions: {module_code} ({unit_students} students) exceeds the session share of "
+                  f"{', '.join(c or 'unassigned' for c in campuses)} - scheduling all campuses jointly")
+        return _schedule_jointly(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION, sessions,
+                                 n_starts, seed, max_workers, sink, schedule_kwargs, campus_seats, campus_overrides)
+
+    seeds = [None] + [seed + i for i in range(1, max(1, n_starts))]
+    jobs = []
+    for part, ((campuses, rows), share, part_sessions) in enumerate(zip(partitions, shares, partition_sessions)):
+        kwargs = _campus_kwargs(schedule_kwargs, campuses, part_sessions, share, campus_seats, campus_overrides)
+        frame = df.iloc[rows].copy()
+        jobs.extend((part, frame, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION,
+                     part_sessions, run_seed, kwargs) for run_seed in seeds)
+
+    sink.info(f"Campus partitions: {len(partitions)} independent groups "
+              f"({'; '.join(', '.join(c or 'unassigned' for c in campuses) for campuses, _ in partitions)})"
+              + (f", {len(seeds)} orderings each" if len(seeds) > 1 else ""))
+    results = run_in_processes(_schedule_partition, jobs, max_workers=max_workers, sink=sink)
+
+    # Best ordering per partition (lowest score; start 0 wins ties)
+    best = {}
+    for part, run_seed, score, frame, events, seconds in results:
+        if part not in best or score < best[part][1]:
+            best[part] = (run_seed, score, frame, events, seconds)
+
+    frames = []
+    partition_metrics = []
+    for part, (campuses, rows) in enumerate(partitions):
+        run_seed, _, frame, events, seconds = best[part]
+        name = ", ".join(c or "unassigned" for c in campuses)
+        metrics = frame.attrs.get('schedule_metrics', {})
+        ordering = "" if len(seeds) == 1 else f", {'baseline' if run_seed is None else f'seed {run_seed}'}"
+        sink.write(f"  {name}: {len(rows)} rows, span {metrics.get('span_days', 0)} days ({seconds:.1f}s{ordering})")
+        for event in events:
+            getattr(sink, event['level'])(f"[{name}] {event['message']}")
+        frames.append(frame)
+        partition_metrics.append({'campuses': campuses, 'rows': len(rows), 'seconds': seconds,
+                                  'span_days': metrics.get('span_days', 0),
+                                  'lower_bound_days': metrics.get('lower_bound_days', 0),
+                                  'colouring_days': metrics.get('colouring_days', 0),
+                                  'unscheduled_units': metrics.get('unscheduled_units', 0),
+                                  'seed': run_seed})
+
+    # Back to df's row order
+    order = np.concatenate([rows for _, rows in partitions])
+    combined = pd.concat(frames).iloc[np.argsort(order, kind='stable')]
+
+    dates = combined['Exam Date'].dropna()
+    lower_bound = max(m['lower_bound_days'] for m in partition_metrics)
+    span_days = max(m['span_days'] for m in partition_metrics)
+    combined.attrs['schedule_metrics'] = {
+        'lower_bound_days': lower_bound,
+        'colouring_days': max(m['colouring_days'] for m in partition_metrics),
+        'span_days': span_days,
+        'days_used': int(dates.nunique()),
+        'quality_ratio': span_days / lower_bound if lower_bound else 0.0,
+        'unscheduled_units': sum(m['unscheduled_units'] for m in partition_metrics),
+        'partitions': partition_metrics,
+    }
+    sink.success(f"Campus scheduling complete: {len(partitions)} partitions, longest span {span_days} exam days")
+    return combined
@@ -34,6 +34,23 @@ BRANCH_FULL_FORM = {
     "DIPLOMA": "DIPLOMA IN ENGINEERING"
 }
 
+# Daily session layouts: name -> [(label, capacity)]; capacity None = the "students per session" setting
+SESSION_PRESETS = {
+    "Two sessions (standard)": [
+        ("10:00 AM - 1:00 PM", None),
+        ("2:00 PM - 5:00 PM", None),
+    ],
+    "Three sessions (peak weeks)": [
+        ("10:00 AM - 1:00 PM", None),
+        ("2:00 PM - 5:00 PM", None),
+        ("5:30 PM - 8:30 PM", None),
+    ],
+}
+DEFAULT_SESSION_PRESET = "Two sessions (standard)"
+
+# Every session label any preset can produce (categories of the Time Slot column)
+ALL_SLOT_LABELS = list(dict.fromkeys(label for preset in SESSION_PRESETS.values() for label, _ in preset))
+
 # Custom CSS for college selector
 CSS_COLLEGE_SELECTOR = """
 <style>
@@ -0,0 +1,116 @@
+"""
+Conflict graph over atomic units and exam-day bounds.
+
+Two units conflict when they share a branch-semester (they can never sit on
+the same day). Every valid timetable is a colouring of this graph with days as
+colours, so:
+    - a clique of k units needs at least k days (lower bound)
+    - a greedy colouring gives a day count that is achievable if capacity allows
+Capacity adds a second lower bound: all students must fit in the available
+sessions. Graphs are held as Python-int bitmasks (bit v = unit v).
+"""
+import math
+
+from atomic_units import popcount, iter_bits
+
+
+def build_conflict_graph(units):
+    """
+    Adjacency bitmask per unit: bit v of adjacency[u] is set when u and v share a branch-semester.
+
+    Returns:
+        tuple: (adjacency list[int], members list[int]) where members[b] is the
+        mask of units taking branch-semester b
+    """
+    members = [0] * len(units.branch_sem_index)
+    for u, mask in enumerate(units.branch_sem_mask):
+        for b in iter_bits(mask):
+            members[b] |= 1 << u
+
+    adjacency = []
+    for u, mask in enumerate(units.branch_sem_mask):
+        neighbours = 0
+        for b in iter_bits(mask):
+            neighbours |= members[b]
+        adjacency.append(neighbours & ~(1 << u))
+    return adjacency, members
+
+
+def greedy_clique_size(adjacency, degree, starts=20):
+    """Grow a clique from each of the `starts` highest-degree units; return the largest size found"""
+    order = sorted(range(len(adjacency)), key=lambda u: degree[u], reverse=True)
+    best = 1 if adjacency else 0
+    for start in order[:starts]:
+        size = 1
+        candidates = adjacency[start]
+        while candidates:
+            nxt = max(iter_bits(candidates), key=lambda v: degree[v])
+            size += 1
+            candidates &= adjacency[nxt]
+        best = max(best, size)
+    return best
+
+
+def greedy_colouring(adjacency, degree):
+    """
+    Largest-degree-first greedy colouring.
+
+    Returns:
+        list[int]: colour (day id) per unit
+    """
+    colour_members = []
+    colour = [0] * len(adjacency)
+    for u in sorted(range(len(adjacency)), key=lambda u: degree[u], reverse=True):
+        for c, members in enumerate(colour_members):
+            if not members & adjacency[u]:
+                colour_members[c] |= 1 << u
+                colour[u] = c
+                break
+        else:
+            colour[u] = len(colour_members)
+            colour_members.append(1 << u)
+    return colour
+
+
+def estimate_day_bounds(units, max_students_per_session, n_slots=2, slot_capacity=None):
+    """
+    Lower/upper estimates of the number of exam days a timetable for `units` needs.
+    slot_capacity (one entry per session of the day) overrides max_students_per_session x n_slots.
+
+    Returns:
+        dict: {
+            'lower_bound':    max of the clique and capacity bounds (no valid timetable is shorter),
+            'clique_bound':   largest set of mutually conflicting units found,
+            'capacity_bound': days needed just to seat every student,
+            'colouring_days': days used by a greedy colouring (achievable ignoring capacity),
+            'unplaceable':    units larger than one session's capacity,
+        }
+    """
+    n_units = len(units)
+    if n_units == 0:
+        return {'lower_bound': 0, 'clique_bound': 0, 'capacity_bound': 0,
+                'colouring_days': 0, 'unplaceable': 0}
+
+    adjacency, members = build_conflict_graph(units)
+    degree = [popcount(mask) for mask in adjacency]
+
+    # Units sharing one branch-semester are already a clique; the heuristic may find a larger one
+    clique_bound = max(greedy_clique_size(adjacency, degree), max(popcount(m) for m in members))
+
+    if slot_capacity is None:
+        slot_capacity = [max_students_per_session] * n_slots
+    largest_session, day_capacity = max(slot_capacity), sum(slot_capacity)
+    students = units.students
+    unplaceable = int((students > largest_session).sum())
+    placeable_students = int(students[students <= largest_session].sum())
+    capacity_bound = math.ceil(placeable_students / day_capacity) if day_capacity > 0 else 0
+
+    colouring_days = max(greedy_colouring(adjacency, degree)) + 1
+
+    return {
+        'lower_bound': max(clique_bound, capacity_bound),
+        'clique_bound': clique_bound,
+        'capacity_bound': capacity_bound,
+        'colouring_days': colouring_days,
+        'unplaceable': unplaceable,
+    }
@@ -0,0 +1,154 @@
+"""
+Exact constraint-programming backend for the exam scheduler.
+
+Formulates the same rules the greedy engine follows as a CP-SAT model:
+    - every atomic unit gets one (day, slot), so common subjects never split
+    - a branch-semester sits at most one exam per day
+    - the students seated in a (day, slot) never exceed the slot capacity
+    - units sharing enrolled students never share a (day, slot) (when enrollment data is given)
+and minimizes the exam span (then the number of units moved off their
+preferred slot). Days are indexes into the valid exam days of the range, so
+Sundays and holidays are excluded by construction.
+
+OR-Tools is optional (pip install ortools). When it is missing,
+cp_backend_available() is False and callers keep the greedy schedule.
+"""
+import numpy as np
+
+from atomic_units import iter_bits
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # optional dependency
+    cp_model = None
+
+
+def cp_backend_available():
+    """True when OR-Tools CP-SAT can be imported"""
+    return cp_model is not None
+
+
+def solve_exam_schedule_cp(units, n_days, slot_capacity, preferred_slot, time_limit=30.0,
+                           hint=None, num_workers=8, day_capacity=None, clash_masks=None):
+    """
+    Solve the unit -> (day, slot) assignment exactly (within a time budget).
+
+    Args:
+        units (AtomicUnits): compiled units
+        n_days (int): number of valid exam days available (day ids 0..n_days-1)
+        slot_capacity (list[int]): maximum students per slot, one entry per slot
+        preferred_slot (array-like): preferred slot id per unit
+        time_limit (float): solver wall-clock budget in seconds
+        hint (tuple): optional (unit_day, unit_slot) arrays to warm-start from (-1 = unplaced)
+        num_workers (int): CP-SAT search workers
+        day_capacity (list[list[int]]): optional per-day slot capacities (n_days x slots), overriding slot_capacity
+        clash_masks (list[int]): optional per-unit bitmask of units sharing students
+
+    Returns:
+        dict or None: {'unit_day', 'unit_slot', 'span', 'unplaced', 'optimal'}
+        or None when the backend is unavailable or no solution was found in time.
+    """
+    if cp_model is None or n_days <= 0 or len(units) == 0:
+        return None
+
+    n_units = len(units)
+    n_slots = len(slot_capacity)
+    students = units.students.tolist()
+    if day_capacity is None:
+        day_capacity = [list(slot_capacity)] * n_days
+    model = cp_model.CpModel()
+
+    # Units that can never be seated stay unplaced, exactly as in the greedy engine
+    placeable = [u for u in range(n_units) if students[u] <= max(slot_capacity)]
+
+    x = {}
+    placed = {}
+    day_of = {}
+    for u in placeable:
+        for d in range(n_days):
+            for s in range(n_slots):
+                if students[u] <= day_capacity[d][s]:
+                    x[u, d, s] = model.NewBoolVar(f"x_{u}_{d}_{s}")
+        choices = [(d, x[u, d, s]) for d in range(n_days) for s in range(n_slots) if (u, d, s) in x]
+        placed[u] = model.NewBoolVar(f"placed_{u}")
+        model.Add(sum(var for _, var in choices) == placed[u])
+        day_of[u] = model.NewIntVar(0, n_days - 1, f"day_{u}")
+        model.Add(day_of[u] == sum(d * var for d, var in choices))
+
+    # One exam per branch-semester per day
+    units_by_branch_sem = {}
+    for u in placeable:
+        mask = units.branch_sem_mask[u]
+        bit = 0
+        while mask:
+            if mask & 1:
+                units_by_branch_sem.setdefault(bit, []).append(u)
+            mask >>= 1
+            bit += 1
+    for members in units_by_branch_sem.values():
+        if len(members) < 2:
+            continue
+        for d in range(n_days):
+            model.Add(sum(x[u, d, s] for u in members for s in range(n_slots) if (u, d, s) in x) <= 1)
+
+    # Slot capacity
+    for d in range(n_days):
+        for s in range(n_slots):
+            seated = [(students[u], x[u, d, s]) for u in placeable if (u, d, s) in x]
+            if seated and sum(count for count, _ in seated) > day_capacity[d][s]:
+                model.Add(sum(count * var for count, var in seated) <= day_capacity[d][s])
+
+    # Student clashes: co-enrolled units never share a session
+    if clash_masks is not None:
+        placeable_set = set(placeable)
+        for u in placeable:
+            for v in iter_bits(clash_masks[u]):
+                if v <= u or v not in placeable_set:
+                    continue
+                for d in range(n_days):
+                    for s in range(n_slots):
+                        if (u, d, s) in x and (v, d, s) in x:
+                            model.Add(x[u, d, s] + x[v, d, s] <= 1)
+
+    # Span: last used day + 1
+    span = model.NewIntVar(0, n_days, "span")
+    for u in placeable:
+        model.Add(span >= day_of[u] + 1).OnlyEnforceIf(placed[u])
+
+    # Objective: place everything, then shortest span, then preferred slots
+    # (at most one off-preferred choice is active per unit, so the weights keep the goals lexicographic)
+    off_preferred = [x[u, d, s] for (u, d, s) in x if s != int(preferred_slot[u])]
+    span_weight = len(placeable) + 1
+    unplaced_weight = (n_days + 1) * span_weight
+    model.Minimize(
+        unplaced_weight * sum(1 - placed[u] for u in placeable)
+        + span_weight * span
+        + sum(off_preferred)
+    )
+
+    if hint is not None:
+        hint_day, hint_slot = hint
+        for (u, d, s), var in x.items():
+            model.AddHint(var, 1 if hint_day[u] == d and hint_slot[u] == s else 0)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit)
+    solver.parameters.num_search_workers = num_workers
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    unit_day = np.full(n_units, -1, dtype=np.int64)
+    unit_slot = np.full(n_units, -1, dtype=np.int64)
+    for (u, d, s), var in x.items():
+        if solver.BooleanValue(var):
+            unit_day[u] = d
+            unit_slot[u] = s
+
+    return {
+        'unit_day': unit_day,
+        'unit_slot': unit_slot,
+        'span': int(solver.Value(span)),
+        'unplaced': int((unit_day < 0).sum()),
+        'optimal': status == cp_model.OPTIMAL,
+    }
@@ -1,73 +1,323 @@
+import os
 import pandas as pd
-import streamlit as st
 import numpy as np
 from datetime import datetime
+from progress import get_sink
+from config import ALL_SLOT_LABELS
+from utils import nonblank_mask
 
-def read_timetable(uploaded_file):
+# Bump whenever parsing/normalization output changes; invalidates upload_cache entries
+PARSER_VERSION = "7"
+
+# Enhanced column mapping to handle more variations (source header -> canonical name)
+COLUMN_MAPPING = {
+    "Program": "Program",
+    "Programme": "Program",  # Alternative spelling
+    "Stream": "Stream",
+    "Specialization": "Stream",  # Alternative name
+    "Branch": "Stream",  # Some files might use Branch for Stream
+    "Current Session": "Semester",
+    "Academic Session": "Semester",
+    "Session": "Semester",
+    "Module Description": "SubjectName",
+    "Subject Name": "SubjectName",
+    "Subject Description": "SubjectName",
+    "Module Abbreviation": "ModuleCode",
+    "Module Code": "ModuleCode",
+    "Subject Code": "ModuleCode",
+    "Code": "ModuleCode",
+    "Campus Name": "Campus",
+    "Campus": "Campus",
+    "Difficulty Score": "Difficulty",
+    "Difficulty": "Difficulty",
+    "Exam Duration": "Exam Duration",
+    "Duration": "Exam Duration",
+    "Student count": "StudentCount",
+    "Student Count": "StudentCount",
+    "Enrollment": "StudentCount",
+    "Count": "StudentCount",
+    "Common across sems": "CommonAcrossSems",
+    "Common Across Sems": "CommonAcrossSems",
+    "Cross Semester": "CommonAcrossSems",
+    "Common Across Semesters": "CommonAcrossSems",
+    # NEW: CM Group column variations
+    "CM group": "CMGroup",
+    "CM Group": "CMGroup",
+    "cm group": "CMGroup",
+    "CMGroup": "CMGroup",
+    "CM_Group": "CMGroup",
+    "Common Module Group": "CMGroup",
+    # NEW: Exam Slot Number column variations
+    "Exam Slot Number": "ExamSlotNumber",
+    "exam slot number": "ExamSlotNumber",
+    "ExamSlotNumber": "ExamSlotNumber",
+    "Exam_Slot_Number": "ExamSlotNumber",
+    "Slot Number": "ExamSlotNumber",
+    "SlotNumber": "ExamSlotNumber",
+    "Exam Slot": "ExamSlotNumber"
+}
+
+# "Is Common" header variations; the first one present is mapped to IsCommon
+IS_COMMON_VARIATIONS = ["Is Common", "IsCommon", "is common", "Is_Common", "is_common", "Common"]
+
+# Headers read as-is (already canonical, no mapping entry needed)
+PASSTHROUGH_COLUMNS = {"Category", "OE"}
+
+
+# Headers the normalization stage actually uses
+TIMETABLE_COLUMNS = set(COLUMN_MAPPING) | set(COLUMN_MAPPING.values()) | PASSTHROUGH_COLUMNS | set(IS_COMMON_VARIATIONS)
+
+
+def projected_columns(headers, wanted=None):
+    """Positions and names of the headers in `wanted` (every named header when None)"""
+    return [(i, str(name)) for i, name in enumerate(headers)
+            if name is not None and (wanted is None or str(name).strip() in wanted)]
+
+
+# Declared dtypes of the normalized timetable: low-cardinality string columns are
+# categoricals so masks and groupbys work on integer codes
+TIMETABLE_SCHEMA = {
+    "Program": "category",
+    "Branch": "category",
+    "MainBranch": "category",
+    "SubBranch": "category",
+    "Category": "category",
+    "OE": "category",
+    "IsCommon": "category",
+    "CMGroup": "category",
+    "Campus": "category",
+    "Time Slot": pd.CategoricalDtype(["", *ALL_SLOT_LABELS]),
+    "Exam Date": "datetime64[ns]",
+}
+
+
+def apply_schema(df):
+    """Cast the TIMETABLE_SCHEMA columns present in df (columns already of the declared kind are left alone)"""
+    for column, dtype in TIMETABLE_SCHEMA.items():
+        if column in df.columns and df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# Semester labels -> semester number (anything else maps to 0)
+SEMESTER_MAPPINGS = {
+    "Sem I": 1, "Sem II": 2, "Sem III": 3, "Sem IV": 4,
+    "Sem V": 5, "Sem VI": 6, "Sem VII": 7, "Sem VIII": 8,
+    "Sem IX": 9, "Sem X": 10, "Sem XI": 11, "Sem XII": 12,
+    # DIPLOMA variations
+    "DIPLOMA Sem I": 1, "DIPLOMA Sem II": 2, "DIPLOMA Sem III": 3,
+    "DIPLOMA Sem IV": 4, "DIPLOMA Sem V": 5, "DIPLOMA Sem VI": 6,
+    # M TECH variations
+    "M TECH Sem I": 1, "M TECH Sem II": 2, "M TECH Sem III": 3, "M TECH Sem IV": 4,
+    # Direct numeric
+    "1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8,
+    "9": 9, "10": 10, "11": 11, "12": 12,
+    # Handle Law school specific formats
+    "1.0": 1, "2.0": 2, "3.0": 3, "4.0": 4, "5.0": 5, "6.0": 6
+}
+
+
+def read_excel_streaming(uploaded_file, columns=None):
+    """
+    Read the first sheet of a workbook in openpyxl read-only mode, keeping only the
+    headers in `columns` (every column when None).
+    Rows are streamed one at a time into per-column lists, so cell styles and
+    unused columns are never materialized.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return pd.DataFrame()
+
+        projection = projected_columns(headers, columns)
+        values = [[] for _ in projection]
+        for row in rows:
+            if row is None or all(cell is None for cell in row):
+                continue
+            for column, (i, _) in zip(values, projection):
+                column.append(row[i] if i < len(row) else None)
+    finally:
+        workbook.close()
+
+    return pd.DataFrame({name: column for (_, name), column in zip(projection, values)})
+
+
+# Formats implied by the file name, for uploads whose leading bytes carry no magic
+# (Arrow IPC streams in particular)
+EXTENSION_FORMATS = {
+    ".xlsx": "xlsx",
+    ".xlsm": "xlsx",
+    ".xls": "xls",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "arrow_stream",
+    ".arrows": "arrow_stream",
+    ".ipc": "arrow_stream",
+}
+
+
+def detect_format(uploaded_file):
+    """
+    Sniff the upload's magic bytes: 'xlsx', 'xls', 'parquet', 'feather', 'arrow_stream' or
+    'csv'. Without a known magic the file extension decides, then CSV is the fallback.
+    The file position is left at the start.
+    """
+    if hasattr(uploaded_file, "getvalue"):
+        head = uploaded_file.getvalue()[:8]
+    elif hasattr(uploaded_file, "read"):
+        head = uploaded_file.read(8)
+        uploaded_file.seek(0)
+    else:
+        with open(uploaded_file, "rb") as f:
+            head = f.read(8)
+
+    if head.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    if head.startswith((b"ARROW1", b"FEA1")):
+        return "feather"
+
+    name = getattr(uploaded_file, "name", uploaded_file)
+    extension = os.path.splitext(str(name))[1].lower()
+    return EXTENSION_FORMATS.get(extension, "csv")
+
+
+def _project(df, columns):
+    """Keep only the headers in `columns` (all of them when None)"""
+    if columns is None:
+        return df
+    return df[[df.columns[i] for i, _ in projected_columns(df.columns, columns)]]
+
+
+def read_arrow_stream(uploaded_file):
+    """Arrow IPC stream format (no ARROW1 file footer), which pd.read_feather cannot open"""
+    import pyarrow as pa
+
+    if hasattr(uploaded_file, "getvalue"):
+        source = pa.BufferReader(uploaded_file.getvalue())
+    elif isinstance(uploaded_file, (str, os.PathLike)):
+        source = pa.OSFile(os.fspath(uploaded_file))
+    else:
+        source = uploaded_file
+    return pa.ipc.open_stream(source).read_pandas()
+
+
+def read_csv_fast(uploaded_file, columns=None):
+    """
+    CSV via the multithreaded pyarrow parser when available, else the default C parser.
+    Only the headers in `columns` are parsed (every column when None).
+    """
+    usecols = None
+    if columns is not None:
+        # Match on stripped names like the Excel reader; usecols needs the raw header text
+        headers = pd.read_csv(uploaded_file, nrows=0).columns
+        usecols = [name for _, name in projected_columns(headers, columns)]
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+    try:
+        return pd.read_csv(uploaded_file, engine="pyarrow", usecols=usecols)
+    except (ImportError, ValueError):
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file, usecols=usecols)
+
+
+def read_table(uploaded_file, columns=None, sink=None, streaming=True):
+    """
+    Read any supported upload (Excel, CSV, Parquet, Feather/Arrow) into a raw, un-normalized DataFrame.
+    Only the headers in `columns` are kept (every column when None). Excel goes through the
+    streaming reader when `streaming` is set (falling back to pandas); CSV, Parquet and
+    Feather use the columnar readers.
+    """
+    sink = get_sink(sink)
+    file_format = detect_format(uploaded_file)
+    sink.write(f"📂 Detected input format: {file_format}")
+
+    if file_format == "parquet":
+        return _project(pd.read_parquet(uploaded_file), columns)
+    if file_format == "feather":
+        return _project(pd.read_feather(uploaded_file), columns)
+    if file_format == "arrow_stream":
+        return _project(read_arrow_stream(uploaded_file), columns)
+    if file_format == "csv":
+        return read_csv_fast(uploaded_file, columns)
+
+    if streaming and file_format == "xlsx":
+        try:
+            return read_excel_streaming(uploaded_file, columns)
+        except Exception as e:
+            sink.info(f"ℹ️ Streaming reader unavailable for this file ({type(e).__name__}) - using full reader")
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+    return _project(pd.read_excel(uploaded_file), columns)
+
+
+def read_timetable(uploaded_file, sink=None, streaming=True):
+    """
+    Read and normalize the uploaded timetable (Excel, CSV, Parquet or Feather).
+    Returns (df_non_elective, df_elective, full_df), or (None, None, None) on failure.
+    Progress and problems are reported to `sink` (see progress.py).
+    streaming=True uses the read-only projected Excel reader (read_excel_streaming).
+    """
+    sink = get_sink(sink)
+    try:
+        df = read_table(uploaded_file, columns=TIMETABLE_COLUMNS, sink=sink, streaming=streaming)
+    except Exception as e:
+        sink.error(f"Error reading the uploaded file: {str(e)}")
+        sink.error(f"Error details: {type(e).__name__}")
+        return None, None, None
+    return normalize_timetable(df, sink=sink)
+
+
+def convert_semesters(semesters):
+    """Vectorized semester label -> number (0 when unrecognised)"""
+    return semesters.astype(str).str.strip().map(SEMESTER_MAPPINGS).fillna(0).astype(int)
+
+
+def branch_identifiers(df):
+    """Vectorized "<Program>-<Stream>" branch key; just the program when the stream is empty or repeats it"""
+    program = df["Program"].astype(str).str.strip() if "Program" in df.columns else pd.Series("", index=df.index)
+    stream = df["Stream"].astype(str).str.strip() if "Stream" in df.columns else pd.Series("", index=df.index)
+    program_only = (stream == "") | (stream == "nan") | (stream == program)
+    return pd.Series(np.where(program_only, program, program + "-" + stream), index=df.index)
+
+
+def split_branches(branches):
+    """Vectorized split of Branch into (MainBranch, SubBranch) at the first '-'"""
+    parts = branches.astype(str).str.split("-", n=1, expand=True)
+    main_branch = parts[0].str.strip()
+    sub_branch = parts[1].fillna("").str.strip() if 1 in parts.columns else pd.Series("", index=branches.index)
+    return main_branch, sub_branch
+
+
+def normalize_timetable(df, sink=None):
+    """
+    Normalization stage shared by every loader: column mapping, type fixes,
+    semester/branch derivation and the elective split, all column-at-a-time.
+    Returns (df_non_elective, df_elective, full_df), or (None, None, None) on failure.
+    """
+    sink = get_sink(sink)
     try:
-        df = pd.read_excel(uploaded_file, engine='openpyxl')
-        
         # Debug: Show actual column names from the Excel file
-        st.write("📋 **Actual columns in uploaded file:**")
-        st.write(list(df.columns))
-        
-        # Enhanced column mapping to handle more variations
-        column_mapping = {
-            "Program": "Program",
-            "Programme": "Program",  # Alternative spelling
-            "Stream": "Stream", 
-            "Specialization": "Stream",  # Alternative name
-            "Branch": "Stream",  # Some files might use Branch for Stream
-            "Current Session": "Semester",
-            "Academic Session": "Semester",
-            "Session": "Semester",
-            "Module Description": "SubjectName",
-            "Subject Name": "SubjectName",
-            "Subject Description": "SubjectName",
-            "Module Abbreviation": "ModuleCode",
-            "Module Code": "ModuleCode",
-            "Subject Code": "ModuleCode",
-            "Code": "ModuleCode",
-            "Campus Name": "Campus",
-            "Campus": "Campus",
-            "Difficulty Score": "Difficulty",
-            "Difficulty": "Difficulty",
-            "Exam Duration": "Exam Duration",
-            "Duration": "Exam Duration",
-            "Student count": "StudentCount",
-            "Student Count": "StudentCount",
-            "Enrollment": "StudentCount",
-            "Count": "StudentCount",
-            "Common across sems": "CommonAcrossSems",
-            "Common Across Sems": "CommonAcrossSems",
-            "Cross Semester": "CommonAcrossSems",
-            "Common Across Semesters": "CommonAcrossSems",
-            # NEW: CM Group column variations
-            "CM group": "CMGroup",
-            "CM Group": "CMGroup",
-            "cm group": "CMGroup",
-            "CMGroup": "CMGroup",
-            "CM_Group": "CMGroup",
-            "Common Module Group": "CMGroup",
-            # NEW: Exam Slot Number column variations
-            "Exam Slot Number": "ExamSlotNumber",
-            "exam slot number": "ExamSlotNumber",
-            "ExamSlotNumber": "ExamSlotNumber",
-            "Exam_Slot_Number": "ExamSlotNumber",
-            "Slot Number": "ExamSlotNumber",
-            "SlotNumber": "ExamSlotNumber",
-            "Exam Slot": "ExamSlotNumber"
-        }
+        sink.write(f"📋 **Actual columns in uploaded file:** {list(df.columns)}")
+        
+        column_mapping = dict(COLUMN_MAPPING)
         
         # Handle the "Is Common" column with flexible naming
-        is_common_variations = ["Is Common", "IsCommon", "is common", "Is_Common", "is_common", "Common"]
-        for variation in is_common_variations:
+        for variation in IS_COMMON_VARIATIONS:
             if variation in df.columns:
                 column_mapping[variation] = "IsCommon"
-                st.write(f"✅ Found 'Is Common' column as: '{variation}'")
+                sink.write(f"✅ Found 'Is Common' column as: '{variation}'")
                 break
         else:
-            st.warning("⚠️ 'Is Common' column not found in uploaded file. Will create default values.")
+            sink.warning("⚠️ 'Is Common' column not found in uploaded file. Will create default values.")
         
         # Apply the column mapping
         df = df.rename(columns=column_mapping)
@@ -99,7 +349,7 @@ def read_timetable(uploaded_file):
         else:
             # Create empty column if not present
             df["CMGroup"] = ""
-            st.info("ℹ️ 'CM Group' column not found - created empty column")
+            sink.info("ℹ️ 'CM Group' column not found - created empty column")
         
         # NEW: Handle ExamSlotNumber column
         if "ExamSlotNumber" in df.columns:
@@ -108,7 +358,7 @@ def read_timetable(uploaded_file):
         else:
             # Create column with default value 0 if not present
             df["ExamSlotNumber"] = 0
-            st.info("ℹ️ 'Exam Slot Number' column not found - created with default value 0")
+            sink.info("ℹ️ 'Exam Slot Number' column not found - created with default value 0")
         
         # 3. Fix numeric columns that might be float
         numeric_columns = ["Exam Duration", "StudentCount", "Difficulty"]
@@ -126,45 +376,10 @@ def read_timetable(uploaded_file):
             if col in df.columns:
                 df[col] = df[col].fillna("").astype(str)
         
-        def convert_sem(sem):
-            if pd.isna(sem):
-                return 0
-            
-            sem_str = str(sem).strip()
-            
-            # Handle different semester formats including DIPLOMA and M TECH
-            semester_mappings = {
-                "Sem I": 1, "Sem II": 2, "Sem III": 3, "Sem IV": 4,
-                "Sem V": 5, "Sem VI": 6, "Sem VII": 7, "Sem VIII": 8,
-                "Sem IX": 9, "Sem X": 10, "Sem XI": 11, "Sem XII": 12,
-                # DIPLOMA variations
-                "DIPLOMA Sem I": 1, "DIPLOMA Sem II": 2, "DIPLOMA Sem III": 3,
-                "DIPLOMA Sem IV": 4, "DIPLOMA Sem V": 5, "DIPLOMA Sem VI": 6,
-                # M TECH variations  
-                "M TECH Sem I": 1, "M TECH Sem II": 2, "M TECH Sem III": 3, "M TECH Sem IV": 4,
-                # Direct numeric
-                "1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, 
-                "9": 9, "10": 10, "11": 11, "12": 12,
-                # Handle Law school specific formats
-                "1.0": 1, "2.0": 2, "3.0": 3, "4.0": 4, "5.0": 5, "6.0": 6
-            }
-            
-            return semester_mappings.get(sem_str, 0)
-
-        df["Semester"] = df["Semester"].apply(convert_sem).astype(int)
+        df["Semester"] = convert_semesters(df["Semester"])
         
         # Create enhanced branch identifier that considers program type
-        def create_branch_identifier(row):
-            program = str(row.get("Program", "")).strip()
-            stream = str(row.get("Stream", "")).strip()
-            
-            # Handle cases where stream might be empty or same as program
-            if not stream or stream == "nan" or stream == program:
-                return program
-            else:
-                return f"{program}-{stream}"
-        
-        df["Branch"] = df.apply(create_branch_identifier, axis=1)
+        df["Branch"] = branch_identifiers(df)
         df["Subject"] = df["SubjectName"].astype(str) + " - (" + df["ModuleCode"].astype(str) + ")"
         
         # FIXED: Handle Difficulty assignment more carefully
@@ -175,7 +390,7 @@ def read_timetable(uploaded_file):
         else:
             df["Difficulty"] = None
         
-        df["Exam Date"] = ""
+        df["Exam Date"] = pd.NaT  # datetime64; NaT = not scheduled yet
         df["Time Slot"] = ""
         
         # CRITICAL FIX: Ensure proper data type handling for all columns
@@ -185,20 +400,19 @@ def read_timetable(uploaded_file):
         
         # Handle IsCommon column - create if it doesn't exist
         if "IsCommon" not in df.columns:
-            st.info("ℹ️ Creating 'IsCommon' column with enhanced logic for all program types")
+            sink.info("ℹ️ Creating 'IsCommon' column with enhanced logic for all program types")
             df["IsCommon"] = "NO"  # Default value
             
             # Set YES for subjects that are common across semesters
             df.loc[df["CommonAcrossSems"] == True, "IsCommon"] = "YES"
             
-            # Enhanced logic to check for subjects common within semester across different programs
-            for (semester, module_code), group in df.groupby(['Semester', 'ModuleCode']):
-                unique_branches = group['Branch'].unique()
-                unique_programs = group['Program'].unique() if 'Program' in group.columns else []
-                
-                # If subject appears in multiple branches or programs within same semester
-                if len(unique_branches) > 1 or len(unique_programs) > 1:
-                    df.loc[group.index, "IsCommon"] = "YES"
+            # Enhanced logic to check for subjects common within semester across different programs:
+            # the subject appears in multiple branches or programs within the same semester
+            by_subject = df.groupby(['Semester', 'ModuleCode'])
+            shared = by_subject['Branch'].transform('nunique') > 1
+            if 'Program' in df.columns:
+                shared |= by_subject['Program'].transform('nunique') > 1
+            df.loc[shared, "IsCommon"] = "YES"
         else:
             # Clean up the IsCommon column values
             df["IsCommon"] = df["IsCommon"].astype(str).str.strip().str.upper()
@@ -216,53 +430,31 @@ def read_timetable(uploaded_file):
         
         final_count = len(df)
         if final_count < initial_count:
-            st.warning(f"⚠️ Removed {initial_count - final_count} rows with missing essential data")
+            sink.warning(f"⚠️ Removed {initial_count - final_count} rows with missing essential data")
         
         if df.empty:
-            st.error("❌ No valid data remaining after filtering")
+            sink.error("❌ No valid data remaining after filtering")
             return None, None, None
         
-        df_non = df[df["Category"] != "INTD"].copy()
-        df_ele = df[df["Category"] == "INTD"].copy()
+        df["MainBranch"], df["SubBranch"] = split_branches(df["Branch"])
         
-        def split_br(b):
-            p = str(b).split("-", 1)
-            if len(p) == 1:
-                # Single program case (like DIPLOMA, M TECH without stream)
-                return pd.Series([p[0].strip(), ""])
-            else:
-                return pd.Series([p[0].strip(), p[1].strip()])
+        # Categoricals are applied before the split so both halves share categories
+        apply_schema(df)
         
-        # CRITICAL FIX: Handle the split_br operation more carefully
-        try:
-            for d in (df_non, df_ele):
-                if not d.empty:
-                    split_result = d["Branch"].apply(split_br)
-                    # Ensure we have exactly 2 columns
-                    if len(split_result.columns) >= 2:
-                        d[["MainBranch", "SubBranch"]] = split_result.iloc[:, :2]
-                    else:
-                        # Fallback if split doesn't work as expected
-                        d["MainBranch"] = d["Branch"]
-                        d["SubBranch"] = ""
-        except Exception as e:
-            st.warning(f"⚠️ Issue with branch splitting: {e}. Using fallback method.")
-            for d in (df_non, df_ele):
-                if not d.empty:
-                    d["MainBranch"] = d["Branch"]
-                    d["SubBranch"] = ""
+        df_non = df[df["Category"] != "INTD"].copy()
+        df_ele = df[df["Category"] == "INTD"].copy()
         
         # UPDATED: Include new columns in the output
         cols = ["MainBranch", "SubBranch", "Branch", "Semester", "Subject", "Category", "OE", "Exam Date", "Time Slot",
                 "Difficulty", "Exam Duration", "StudentCount", "CommonAcrossSems", "ModuleCode", "IsCommon", "Program",
-                "CMGroup", "ExamSlotNumber"]  # Added new columns
+                "CMGroup", "ExamSlotNumber", "Campus"]  # Added new columns
         
         # Ensure all required columns exist before selecting
         available_cols = [col for col in cols if col in df_non.columns]
         missing_cols = [col for col in cols if col not in df_non.columns]
         
         if missing_cols:
-            st.warning(f"⚠️ Missing columns: {missing_cols}")
+            sink.warning(f"⚠️ Missing columns: {missing_cols}")
             # Add missing columns with default values
             for missing_col in missing_cols:
                 if missing_col == "Program":
@@ -273,6 +465,10 @@ def read_timetable(uploaded_file):
                     df_non[missing_col] = ""  # Empty string for CM Group
                     if not df_ele.empty:
                         df_ele[missing_col] = ""
+                elif missing_col == "Campus":
+                    df_non[missing_col] = ""  # Single-campus upload
+                    if not df_ele.empty:
+                        df_ele[missing_col] = ""
                 elif missing_col == "ExamSlotNumber":
                     df_non[missing_col] = 0  # Default value 0
                     if not df_ele.empty:
@@ -285,23 +481,24 @@ def read_timetable(uploaded_file):
         # Update available_cols after adding missing columns
         available_cols = [col for col in cols if col in df_non.columns]
         
-        # STORE ORIGINAL DATA FOR FILTER OPTIONS
-        st.session_state.original_data_df = df.copy()
-        
         # Show summary of new columns
-        cm_group_count = len(df[df["CMGroup"].str.strip() != ""]) if "CMGroup" in df.columns else 0
+        cm_group_count = int(nonblank_mask(df["CMGroup"]).sum()) if "CMGroup" in df.columns else 0
         if cm_group_count > 0:
-            st.info(f"✅ Found {cm_group_count} subjects with CM Group assignments")
+            sink.info(f"✅ Found {cm_group_count} subjects with CM Group assignments")
         
         exam_slot_count = len(df[df["ExamSlotNumber"] > 0]) if "ExamSlotNumber" in df.columns else 0
         if exam_slot_count > 0:
-            st.info(f"✅ Found {exam_slot_count} subjects with Exam Slot Number assignments")
+            sink.info(f"✅ Found {exam_slot_count} subjects with Exam Slot Number assignments")
+        
+        if missing_cols:
+            apply_schema(df_non)
+            apply_schema(df_ele)
         
         return df_non[available_cols], df_ele[available_cols] if not df_ele.empty and available_cols else df_ele, df
         
     except Exception as e:
-        st.error(f"Error reading the Excel file: {str(e)}")
-        st.error(f"Error details: {type(e).__name__}")
+        sink.error(f"Error normalizing the timetable: {str(e)}")
+        sink.error(f"Error details: {type(e).__name__}")
         import traceback
-        st.error(f"Full traceback: {traceback.format_exc()}")
+        sink.error(f"Full traceback: {traceback.format_exc()}")
         return None, None, None
@@ -0,0 +1,137 @@
+"""
+Student-level enrollments.
+
+Branch-semester conflicts miss backlog/repeat students and cross-listed
+subjects. An optional enrollment list (student id -> module codes) is compiled
+once into a sparse student x module matrix M. Then:
+
+    M.T @ M            module x module co-enrollment counts, i.e. which subjects
+                       must never share a session (the scheduler's clash masks)
+    M @ S              students x sessions exam counts for a timetable whose
+                       module -> session incidence is S; any entry > 1 is a clash
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_processing import read_table
+
+ENROLLMENT_COLUMN_MAPPING = {
+    "StudentID": "StudentID",
+    "Student ID": "StudentID",
+    "Student Id": "StudentID",
+    "Roll No": "StudentID",
+    "Roll Number": "StudentID",
+    "SAP ID": "StudentID",
+    "ModuleCode": "ModuleCode",
+    "Module Code": "ModuleCode",
+    "Subject Code": "ModuleCode",
+}
+
+
+class EnrollmentMatrix:
+    """
+    Sparse student x module incidence (1 = enrolled).
+
+    Attributes:
+        students (Index): student ids (row labels)
+        modules (Index): module codes (column labels)
+        matrix (csr_matrix): n_students x n_modules, int32
+    """
+
+    def __init__(self, students, modules, matrix):
+        self.students = students
+        self.modules = modules
+        self.matrix = matrix
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build from one row per (student, module). A ModuleCode cell may also hold
+        several codes separated by commas or semicolons.
+        """
+        df = df.rename(columns=lambda c: ENROLLMENT_COLUMN_MAPPING.get(str(c).strip(), str(c).strip()))
+        if "StudentID" not in df.columns or "ModuleCode" not in df.columns:
+            raise ValueError("Enrollment file needs StudentID and ModuleCode columns")
+        pairs = df[["StudentID", "ModuleCode"]].dropna().astype(str)
+        pairs["ModuleCode"] = pairs["ModuleCode"].str.split(r"[,;]")
+        pairs = pairs.explode("ModuleCode")
+        pairs["StudentID"] = pairs["StudentID"].str.strip()
+        pairs["ModuleCode"] = pairs["ModuleCode"].str.strip()
+        pairs = pairs[(pairs["StudentID"] != "") & (pairs["ModuleCode"] != "")].drop_duplicates()
+
+        student_codes, students = pd.factorize(pairs["StudentID"])
+        module_codes, modules = pd.factorize(pairs["ModuleCode"], sort=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.int32), (student_codes, module_codes)),
+            shape=(len(students), len(modules)),
+        )
+        return cls(students, modules, matrix)
+
+    def __len__(self):
+        return len(self.students)
+
+    def co_enrollment(self, module_codes):
+        """
+        Shared-student counts between the given modules (modules absent from the
+        enrollment list share nobody).
+
+        Returns:
+            coo_matrix: len(module_codes) x len(module_codes), diagonal included
+        """
+        cols = self.modules.get_indexer([str(code) for code in module_codes])
+        present = np.flatnonzero(cols >= 0)
+        sub = self.matrix[:, cols[present]]
+        shared = (sub.T @ sub).tocoo()
+        return sparse.coo_matrix(
+            (shared.data, (present[shared.row], present[shared.col])),
+            shape=(len(module_codes), len(module_codes)),
+        )
+
+    def clash_masks(self, module_codes):
+        """Per module: Python-int bitmask of the other modules (by position) it shares students with"""
+        shared = self.co_enrollment(module_codes)
+        masks = [0] * len(module_codes)
+        for i, j in zip(shared.row.tolist(), shared.col.tolist()):
+            if i != j:
+                masks[i] |= 1 << j
+        return masks
+
+    def session_clashes(self, df):
+        """
+        Students sitting more than one exam in the same session of df.
+
+        Returns:
+            DataFrame: one row per clashing (session, student): Exam Date, Time Slot, StudentID, Exams
+        """
+        scheduled = df[df['Exam Date'].notna()][['ModuleCode', 'Exam Date', 'Time Slot']].copy()
+        scheduled['ModuleCode'] = scheduled['ModuleCode'].astype(str)
+        scheduled = scheduled.drop_duplicates()
+        cols = self.modules.get_indexer(scheduled['ModuleCode'])
+        scheduled = scheduled[cols >= 0]
+        cols = cols[cols >= 0]
+        columns = ['Exam Date', 'Time Slot', 'StudentID', 'Exams']
+        if scheduled.empty:
+            return pd.DataFrame(columns=columns)
+
+        session_codes, sessions = pd.factorize(
+            pd.MultiIndex.from_arrays([scheduled['Exam Date'], scheduled['Time Slot'].astype(str)])
+        )
+        # Module x session incidence, then students x sessions exam counts in one sparse product
+        incidence = sparse.csr_matrix(
+            (np.ones(len(cols), dtype=np.int32), (cols, session_codes)),
+            shape=(len(self.modules), len(sessions)),
+        )
+        counts = (self.matrix @ incidence).tocoo()
+        clash = counts.data > 1
+        return pd.DataFrame({
+            'Exam Date': sessions.get_level_values(0)[counts.col[clash]],
+            'Time Slot': sessions.get_level_values(1)[counts.col[clash]],
+            'StudentID': self.students[counts.row[clash]],
+            'Exams': counts.data[clash],
+        }, columns=columns)
+
+
+def read_enrollments(uploaded_file):
+    """Read an enrollment list from an Excel, CSV, Parquet or Feather upload"""
+    return EnrollmentMatrix.from_frame(read_table(uploaded_file, columns=set(ENROLLMENT_COLUMN_MAPPING)))
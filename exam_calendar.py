@@ -0,0 +1,100 @@
+"""
+Precomputed examination calendar.
+
+The valid exam days of a period (every day that is neither a weekly-off day nor
+a holiday) are computed once into a sorted datetime64 array. Next/previous
+valid day, ordinal index and validity checks are binary searches on that array
+instead of day-by-day walks, and the same calendar object is shared by the
+scheduler, the optimizers and the statistics.
+"""
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Sunday (Monday = 0)
+DEFAULT_WEEKLY_OFF = (6,)
+
+
+def _day(value):
+    """date / datetime / Timestamp / datetime64 -> midnight Timestamp"""
+    return pd.Timestamp(value).normalize()
+
+
+class ExamCalendar:
+    """
+    Valid exam days between `start` and `end` (inclusive).
+
+    Attributes:
+        dates (DatetimeIndex): the valid days, ascending
+        valid_days (ndarray): the same days as datetime64[ns], for searchsorted
+    """
+
+    def __init__(self, start, end, holidays=(), weekly_off=DEFAULT_WEEKLY_OFF):
+        self.start = _day(start)
+        self.end = _day(end)
+        self.weekly_off = tuple(weekly_off)
+        self.holidays = pd.DatetimeIndex(sorted({_day(h) for h in holidays}))
+
+        days = pd.date_range(self.start, self.end, freq='D')
+        open_days = ~days.weekday.isin(self.weekly_off) & ~days.isin(self.holidays)
+        self.dates = days[open_days]
+        self.valid_days = self.dates.to_numpy(dtype='datetime64[ns]')
+
+    def __len__(self):
+        return len(self.valid_days)
+
+    def __contains__(self, day):
+        return self.is_valid(day)
+
+    def labels(self):
+        """Valid days as DD-MM-YYYY strings"""
+        return self.dates.strftime("%d-%m-%Y").tolist()
+
+    def is_open(self, day):
+        """Weekly-off/holiday rule for any day, inside the range or not"""
+        day = _day(day)
+        return day.weekday() not in self.weekly_off and day not in self.holidays
+
+    def is_valid(self, day):
+        """True when `day` is a valid exam day of this calendar"""
+        return self.index_of(day) >= 0
+
+    def index_of(self, day):
+        """Ordinal of `day` among the valid days, or -1 when it is not one"""
+        target = np.datetime64(_day(day), 'ns')
+        i = int(np.searchsorted(self.valid_days, target))
+        return i if i < len(self.valid_days) and self.valid_days[i] == target else -1
+
+    def next_valid(self, day, bounded=True):
+        """
+        First valid day on or after `day`, as a datetime.
+        Past the end of the range this returns None, unless bounded=False, in
+        which case the weekly-off/holiday rules are applied beyond the range.
+        """
+        day = _day(day)
+        i = int(np.searchsorted(self.valid_days, np.datetime64(day, 'ns')))
+        if i < len(self.valid_days):
+            return self.dates[i].to_pydatetime()
+        if bounded:
+            return None
+        day = max(day, self.end + timedelta(days=1))
+        while not self.is_open(day):
+            day += timedelta(days=1)
+        return day.to_pydatetime()
+
+    def previous_valid(self, day):
+        """Last valid day on or before `day`, as a datetime (None before the range)"""
+        i = int(np.searchsorted(self.valid_days, np.datetime64(_day(day), 'ns'), side='right')) - 1
+        return self.dates[i].to_pydatetime() if i >= 0 else None
+
+
+@lru_cache(maxsize=32)
+def _cached_calendar(start, end, holidays, weekly_off):
+    return ExamCalendar(start, end, holidays, weekly_off)
+
+
+def get_calendar(start, end, holidays=(), weekly_off=DEFAULT_WEEKLY_OFF):
+    """Shared (memoized) ExamCalendar for a period and holiday set"""
+    return _cached_calendar(_day(start), _day(end), frozenset(_day(h) for h in holidays), tuple(weekly_off))
@@ -1,13 +1,20 @@
 # generation.py
 import pandas as pd
 import streamlit as st
-from datetime import datetime
 from fpdf import FPDF
 import base64
 from io import BytesIO
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
+from tempfile import SpooledTemporaryFile
 import os
+import time
+import hashlib
+from itertools import accumulate
+from utils import is_open_elective, compact_categories
+from parallel import run_in_processes
 
 # Roman numeral conversion
 def int_to_roman(num):
@@ -78,148 +85,266 @@ def format_elective_for_excel(row):
     return cm_group_prefix + subject + oe_suffix + difficulty_suffix
 
 
+# Named styles of the exported workbooks
+HEADER_STYLE = "Timetable Header"
+CELL_STYLE = "Timetable Cell"
+ALT_CELL_STYLE = "Timetable Cell Alt"
+
+# Schedules with at least this many rows are exported by the write-only streaming writer
+STREAMING_EXCEL_ROWS = 20000
+# The streaming writer's temp file stays in memory up to this size, then spills to disk
+STREAMING_SPOOL_BYTES = 32 * 1024 * 1024
+
+
+def _timetable_styles():
+    """Fresh NamedStyle objects (a NamedStyle is bound to the workbook it is added to)"""
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    body_font = Font(name="Arial", size=10)
+    body_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    return [
+        NamedStyle(name=HEADER_STYLE,
+                   font=Font(name="Arial", size=11, bold=True, color="FFFFFF"),
+                   alignment=Alignment(horizontal="center", vertical="center"),
+                   fill=PatternFill(start_color="951C1C", end_color="951C1C", fill_type="solid"),
+                   border=border),
+        NamedStyle(name=CELL_STYLE, font=body_font, alignment=body_alignment, border=border),
+        NamedStyle(name=ALT_CELL_STYLE, font=body_font, alignment=body_alignment, border=border,
+                   fill=PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")),
+    ]
+
+
+def register_named_styles(workbook):
+    """Add the timetable named styles to a workbook once"""
+    existing = set(workbook.named_styles)
+    for style in _timetable_styles():
+        if style.name not in existing:
+            workbook.add_named_style(style)
+
+
+def _style_sheet(worksheet, n_columns):
+    """Apply the named styles: header row, then body rows with alternating fill"""
+    for cell in worksheet[1][:n_columns]:
+        cell.style = HEADER_STYLE
+    for row_idx, row in enumerate(worksheet.iter_rows(min_row=2, max_row=worksheet.max_row), start=2):
+        style = ALT_CELL_STYLE if row_idx % 2 == 0 else CELL_STYLE
+        for cell in row:
+            cell.style = style
+
+
+def session_pivot(df):
+    """
+    Subjects of df (with SubjectDisplay) per session and SubBranch: indexed by
+    (Exam Date, Time Slot), one column per SubBranch, '---' where a SubBranch has no exam.
+    Each row is one session, so every subject is published under its own time slot.
+    """
+    pivot_df = df.groupby(['Exam Date', 'Time Slot', 'SubBranch'], observed=True)['SubjectDisplay'].apply(
+        lambda x: ', '.join(sorted(x))
+    ).reset_index()
+    pivot_table = pivot_df.pivot(index=['Exam Date', 'Time Slot'], columns='SubBranch', values='SubjectDisplay')
+    pivot_table = pivot_table.fillna('---')
+    pivot_table.columns.name = None
+    return pivot_table
+
+
+def elective_sessions(df):
+    """Elective subjects of df (with SubjectDisplay) per session and OE basket: Exam Date, Time Slot, OE, SubjectDisplay"""
+    return df.groupby(['Exam Date', 'Time Slot', 'OE'], observed=True)['SubjectDisplay'].apply(
+        lambda x: ', '.join(sorted(x))
+    ).reset_index()
+
+
+def timetable_sheets(sem_dict):
+    """
+    Build the export tables shared by the Excel writers.
+
+    Yields:
+        tuple: (sheet name, DataFrame whose first column is 'Exam Date', column widths)
+    """
+    for sem, df in sem_dict.items():
+        # Get main branch and semester info
+        main_branch = df['MainBranch'].iloc[0] if not df.empty else 'B TECH'
+        semester_roman = int_to_roman(sem)
+        
+        # Separate non-electives and electives
+        oe_rows = is_open_elective(df)
+        df_non_elec = compact_categories(df[~oe_rows].copy())
+        df_elec = compact_categories(df[oe_rows].copy())
+        
+        # Process non-electives
+        if not df_non_elec.empty:
+            sheet_name = f"{main_branch}_Sem_{semester_roman}"
+            
+            # Format subjects
+            df_non_elec['SubjectDisplay'] = df_non_elec.apply(format_subject_for_excel, axis=1)
+            
+            # Drop unscheduled rows (NaT)
+            df_non_elec = df_non_elec.dropna(subset=['Exam Date'])
+            df_non_elec = df_non_elec.sort_values('Exam Date')
+            
+            # Create pivot table: one row per session (date and time slot)
+            pivot_table = session_pivot(df_non_elec)
+            table = pivot_table.reset_index()
+            
+            # Format dates back to DD-MM-YYYY
+            table['Exam Date'] = table['Exam Date'].dt.strftime('%d-%m-%Y')
+            
+            yield sheet_name, table, [15, 20] + [40] * len(pivot_table.columns)
+        
+        # Process electives
+        if not df_elec.empty:
+            sheet_name = f"{main_branch}_Sem_{semester_roman}_Electives"
+            
+            # Format subjects
+            df_elec['SubjectDisplay'] = df_elec.apply(format_elective_for_excel, axis=1)
+            
+            # Drop unscheduled rows (NaT)
+            df_elec = df_elec.dropna(subset=['Exam Date'])
+            df_elec = df_elec.sort_values('Exam Date')
+            
+            # Group by session and OE type
+            elec_grouped = elective_sessions(df_elec)
+            
+            # Format dates
+            elec_grouped['Exam Date'] = elec_grouped['Exam Date'].dt.strftime('%d-%m-%Y')
+            elec_grouped.columns = ['Exam Date', 'Time Slot', 'OE Type', 'Subjects']
+            
+            yield sheet_name, elec_grouped, [15, 20, 10, 80]
+
+
 def save_to_excel(sem_dict, college_name):
     """Generate main timetable Excel with EXACT formatting."""
     output = BytesIO()
     
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        for sem, df in sem_dict.items():
-            # Get main branch and semester info
-            main_branch = df['MainBranch'].iloc[0] if not df.empty else 'B TECH'
-            semester_roman = int_to_roman(sem)
-            
-            # Separate non-electives and electives
-            df_non_elec = df[~(df['OE'].notna() & (df['OE'].str.strip() != ''))].copy()
-            df_elec = df[df['OE'].notna() & (df['OE'].str.strip() != '')].copy()
-            
-            # Process non-electives
-            if not df_non_elec.empty:
-                sheet_name = f"{main_branch}_Sem_{semester_roman}"
-                
-                # Format subjects
-                df_non_elec['SubjectDisplay'] = df_non_elec.apply(format_subject_for_excel, axis=1)
-                
-                # Convert dates
-                df_non_elec['Exam Date'] = pd.to_datetime(df_non_elec['Exam Date'], format="%d-%m-%Y", errors='coerce')
-                df_non_elec = df_non_elec.dropna(subset=['Exam Date'])
-                df_non_elec = df_non_elec.sort_values('Exam Date')
-                
-                # Create pivot table
-                pivot_df = df_non_elec.groupby(['Exam Date', 'SubBranch'])['SubjectDisplay'].apply(
-                    lambda x: ', '.join(sorted(x))
-                ).reset_index()
-                
-                pivot_table = pivot_df.pivot(index='Exam Date', columns='SubBranch', values='SubjectDisplay')
-                pivot_table = pivot_table.fillna('---')
-                
-                # Format dates back to DD-MM-YYYY
-                pivot_table.index = pivot_table.index.strftime('%d-%m-%Y')
-                pivot_table.index.name = 'Exam Date'
-                
-                # Write to Excel
-                pivot_table.to_excel(writer, sheet_name=sheet_name)
-                
-                # Style the sheet
-                worksheet = writer.sheets[sheet_name]
-                
-                # Header row (row 1)
-                for col_num, col_name in enumerate(pivot_table.columns, 2):
-                    cell = worksheet.cell(row=1, column=col_num)
-                    cell.value = col_name
-                    cell.font = Font(name="Arial", size=11, bold=True)
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-                    cell.fill = PatternFill(start_color="951C1C", end_color="951C1C", fill_type="solid")
-                    cell.font = Font(name="Arial", size=11, bold=True, color="FFFFFF")
-                
-                # Exam Date header
-                cell = worksheet.cell(row=1, column=1)
-                cell.value = "Exam Date"
-                cell.font = Font(name="Arial", size=11, bold=True)
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                cell.fill = PatternFill(start_color="951C1C", end_color="951C1C", fill_type="solid")
-                cell.font = Font(name="Arial", size=11, bold=True, color="FFFFFF")
-                
-                # Column widths
-                worksheet.column_dimensions['A'].width = 15
-                for col in range(2, len(pivot_table.columns) + 2):
-                    worksheet.column_dimensions[get_column_letter(col)].width = 40
-                
-                # Data rows styling
-                thin_border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-                
-                for row_idx, row in enumerate(worksheet.iter_rows(min_row=2, max_row=worksheet.max_row), start=2):
-                    for cell in row:
-                        cell.font = Font(name="Arial", size=10)
-                        cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                        cell.border = thin_border
-                        
-                        # Alternating row colors
-                        if row_idx % 2 == 0:
-                            cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-            
-            # Process electives
-            if not df_elec.empty:
-                sheet_name = f"{main_branch}_Sem_{semester_roman}_Electives"
-                
-                # Format subjects
-                df_elec['SubjectDisplay'] = df_elec.apply(format_elective_for_excel, axis=1)
-                
-                # Convert dates
-                df_elec['Exam Date'] = pd.to_datetime(df_elec['Exam Date'], format="%d-%m-%Y", errors='coerce')
-                df_elec = df_elec.dropna(subset=['Exam Date'])
-                df_elec = df_elec.sort_values('Exam Date')
-                
-                # Group by date and OE type
-                elec_grouped = df_elec.groupby(['Exam Date', 'OE'])['SubjectDisplay'].apply(
-                    lambda x: ', '.join(sorted(x))
-                ).reset_index()
-                
-                # Format dates
-                elec_grouped['Exam Date'] = elec_grouped['Exam Date'].dt.strftime('%d-%m-%Y')
-                elec_grouped.columns = ['Exam Date', 'OE Type', 'Subjects']
-                
-                # Write to Excel
-                elec_grouped.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Style the sheet
-                worksheet = writer.sheets[sheet_name]
-                
-                # Header row styling
-                for col_num in range(1, 4):
-                    cell = worksheet.cell(row=1, column=col_num)
-                    cell.font = Font(name="Arial", size=11, bold=True, color="FFFFFF")
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-                    cell.fill = PatternFill(start_color="951C1C", end_color="951C1C", fill_type="solid")
-                
-                # Column widths
-                worksheet.column_dimensions['A'].width = 15
-                worksheet.column_dimensions['B'].width = 10
-                worksheet.column_dimensions['C'].width = 80
-                
-                # Data rows styling
-                for row_idx, row in enumerate(worksheet.iter_rows(min_row=2, max_row=worksheet.max_row), start=2):
-                    for cell in row:
-                        cell.font = Font(name="Arial", size=10)
-                        cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                        cell.border = thin_border
-                        
-                        if row_idx % 2 == 0:
-                            cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
+        register_named_styles(writer.book)
+        for sheet_name, table, widths in timetable_sheets(sem_dict):
+            # Write to Excel
+            table.to_excel(writer, sheet_name=sheet_name, index=False)
+            
+            # Style the sheet
+            worksheet = writer.sheets[sheet_name]
+            _style_sheet(worksheet, len(table.columns))
+            
+            # Column widths
+            for col, width in enumerate(widths, 1):
+                worksheet.column_dimensions[get_column_letter(col)].width = width
     
     output.seek(0)
     return output
 
 
-def save_verification_excel(sem_dict, college_name):
-    """Generate verification Excel (same format as main)."""
+def save_to_excel_streaming(sem_dict, college_name):
+    """
+    Same workbook as save_to_excel, written in one pass by openpyxl's write-only mode:
+    every row is appended once, already styled, and the zip is assembled in a spooled
+    temporary file, so memory stays flat for whole-university timetables.
+    Returns that spooled file, rewound (it rolls over to disk past STREAMING_SPOOL_BYTES);
+    the caller reads and closes it.
+    """
+    workbook = Workbook(write_only=True)
+    register_named_styles(workbook)
+    
+    def styled(worksheet, value, style):
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.style = style
+        return cell
+    
+    for sheet_name, table, widths in timetable_sheets(sem_dict):
+        worksheet = workbook.create_sheet(sheet_name)
+        # Column widths must be set before the first row in write-only mode
+        for col, width in enumerate(widths, 1):
+            worksheet.column_dimensions[get_column_letter(col)].width = width
+        
+        worksheet.append([styled(worksheet, name, HEADER_STYLE) for name in table.columns])
+        for row_idx, values in enumerate(table.itertuples(index=False, name=None), start=2):
+            style = ALT_CELL_STYLE if row_idx % 2 == 0 else CELL_STYLE
+            worksheet.append([styled(worksheet, value, style) for value in values])
+    
+    spool = SpooledTemporaryFile(max_size=STREAMING_SPOOL_BYTES)
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
+
+
+def export_excel(sem_dict, college_name):
+    """
+    Main workbook, through the streaming writer once the schedule has STREAMING_EXCEL_ROWS rows or more.
+    The verification workbook has the same format, so it is this workbook too.
+    Returns a rewound file-like object (BytesIO, or a spooled temporary file for large schedules).
+    """
+    total_rows = sum(len(df) for df in sem_dict.values())
+    if total_rows >= STREAMING_EXCEL_ROWS:
+        return save_to_excel_streaming(sem_dict, college_name)
     return save_to_excel(sem_dict, college_name)
 
 
+class TextMetrics:
+    """
+    Text measurement for the PDF tables. Glyph widths of each font (family, style,
+    size) are measured once with get_string_width into a lookup table, so a line's
+    width is a running sum instead of a re-measured string, and wrapped results are
+    cached per (text, width, font).
+    """
+    
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self._glyphs = {}
+        self._wrapped = {}
+    
+    def _font_key(self):
+        return (self.pdf.font_family, self.pdf.font_style, self.pdf.font_size_pt)
+    
+    def _glyph_table(self, font_key):
+        table = self._glyphs.get(font_key)
+        if table is None:
+            # Printable ASCII up front; anything else is measured on first use
+            table = {chr(code): self.pdf.get_string_width(chr(code)) for code in range(32, 127)}
+            self._glyphs[font_key] = table
+        return table
+    
+    def string_width(self, text, table=None):
+        if table is None:
+            table = self._glyph_table(self._font_key())
+        width = 0.0
+        for char in text:
+            glyph = table.get(char)
+            if glyph is None:
+                glyph = table[char] = self.pdf.get_string_width(char)
+            width += glyph
+        return width
+    
+    def wrap(self, text, max_width):
+        """Wrap text to fit within max_width (greedy, word by word)"""
+        text = str(text)
+        font_key = self._font_key()
+        key = (text, max_width, font_key)
+        cached = self._wrapped.get(key)
+        if cached is not None:
+            return cached
+        
+        table = self._glyph_table(font_key)
+        space = table[" "]
+        lines = []
+        current, current_width = [], 0.0
+        for word in text.split():
+            word_width = self.string_width(word, table)
+            test_width = word_width if not current else current_width + space + word_width
+            if test_width <= max_width:
+                current.append(word)
+                current_width = test_width
+            else:
+                if current:
+                    lines.append(" ".join(current))
+                current, current_width = [word], word_width
+        if current:
+            lines.append(" ".join(current))
+        
+        result = lines if lines else [text]
+        self._wrapped[key] = result
+        return result
+
+
 def generate_pdf_timetable(sem_dict, college_name):
     """Generate PDF timetable with EXACT layout."""
     
@@ -230,7 +355,6 @@ def generate_pdf_timetable(sem_dict, college_name):
             self.alias_nb_pages()
             self.header_content = None
             self.branches = []
-            self.time_slot = None
             self.logo_path = None
             
         def header(self):
@@ -263,13 +387,6 @@ def generate_pdf_timetable(sem_dict, college_name):
                 
                 y_start += 8
                 
-                # Time slot
-                if self.time_slot:
-                    self.set_font("Arial", 'B', 14)
-                    self.set_xy(10, y_start)
-                    self.cell(self.w - 20, 6, f"Exam Time: {self.time_slot}", 0, 1, 'C')
-                    y_start += 6
-                
                 # Check time note
                 self.set_font("Arial", 'I', 10)
                 self.set_xy(10, y_start)
@@ -296,45 +413,13 @@ def generate_pdf_timetable(sem_dict, college_name):
             page_text = f"Page {self.page_no()} of {{nb}}"
             self.cell(0, 5, page_text, 0, 0, 'R')
     
-    def get_preferred_slot(semester):
-        """Get preferred time slot based on semester"""
-        if semester % 2 != 0:  # Odd semester
-            odd_sem_position = (semester + 1) // 2
-            return "10:00 AM - 1:00 PM" if odd_sem_position % 2 == 1 else "2:00 PM - 5:00 PM"
-        else:  # Even semester
-            even_sem_position = semester // 2
-            return "10:00 AM - 1:00 PM" if even_sem_position % 2 == 1 else "2:00 PM - 5:00 PM"
-    
-    def format_date_long(date_str):
-        """Convert DD-MM-YYYY to 'Monday, 1 April, 2025'"""
-        try:
-            date_obj = datetime.strptime(date_str, "%d-%m-%Y")
-            return date_obj.strftime("%A, %d %B, %Y")
-        except:
-            return date_str
-    
-    def wrap_text(pdf, text, max_width):
-        """Wrap text to fit within max_width"""
-        words = str(text).split()
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            test_line = word if not current_line else current_line + " " + word
-            if pdf.get_string_width(test_line) <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        
-        if current_line:
-            lines.append(current_line)
-        
-        return lines if lines else [str(text)]
+    def format_date_long(exam_date):
+        """Format an exam date as 'Monday, 1 April, 2025'"""
+        return exam_date.strftime("%A, %d %B, %Y")
     
     pdf = PDF(orientation='L')
     pdf.set_auto_page_break(auto=True, margin=25)
+    metrics = TextMetrics(pdf)
     
     for sem, df in sem_dict.items():
         if df.empty:
@@ -342,11 +427,11 @@ def generate_pdf_timetable(sem_dict, college_name):
         
         main_branch = df['MainBranch'].iloc[0]
         semester_roman = int_to_roman(sem)
-        time_slot = get_preferred_slot(sem)
         
         # Separate non-electives and electives
-        df_non_elec = df[~(df['OE'].notna() & (df['OE'].str.strip() != ''))].copy()
-        df_elec = df[df['OE'].notna() & (df['OE'].str.strip() != '')].copy()
+        oe_rows = is_open_elective(df)
+        df_non_elec = compact_categories(df[~oe_rows].copy())
+        df_elec = compact_categories(df[oe_rows].copy())
         
         # Process non-electives
         if not df_non_elec.empty:
@@ -355,31 +440,26 @@ def generate_pdf_timetable(sem_dict, college_name):
                 'semester_roman': semester_roman
             }
             pdf.branches = sorted(df_non_elec['SubBranch'].unique().tolist())
-            pdf.time_slot = time_slot
             
             pdf.add_page()
             
             # Format subjects
             df_non_elec['SubjectDisplay'] = df_non_elec.apply(format_subject_for_excel, axis=1)
-            df_non_elec['Exam Date'] = pd.to_datetime(df_non_elec['Exam Date'], format="%d-%m-%Y", errors='coerce')
             df_non_elec = df_non_elec.dropna(subset=['Exam Date'])
             df_non_elec = df_non_elec.sort_values('Exam Date')
             
-            # Create pivot
-            pivot_df = df_non_elec.groupby(['Exam Date', 'SubBranch'])['SubjectDisplay'].apply(
-                lambda x: ', '.join(sorted(x))
-            ).reset_index()
-            
-            pivot_table = pivot_df.pivot(index='Exam Date', columns='SubBranch', values='SubjectDisplay')
-            pivot_table = pivot_table.fillna('---')
+            # Create pivot: one row per session
+            pivot_table = session_pivot(df_non_elec)
             
             # Calculate column widths
             date_col_width = 60
+            time_col_width = 40
             num_branches = len(pivot_table.columns)
-            remaining_width = pdf.w - 20 - date_col_width
+            remaining_width = pdf.w - 20 - date_col_width - time_col_width
             branch_col_width = remaining_width / num_branches
             
-            col_widths = [date_col_width] + [branch_col_width] * num_branches
+            col_widths = [date_col_width, time_col_width] + [branch_col_width] * num_branches
+            col_offsets = list(accumulate(col_widths, initial=0))
             
             # Table header
             pdf.set_fill_color(149, 33, 28)
@@ -387,7 +467,8 @@ def generate_pdf_timetable(sem_dict, college_name):
             pdf.set_font("Arial", 'B', 10)
             
             pdf.cell(col_widths[0], 10, "Exam Date", 1, 0, 'C', True)
-            for idx, branch in enumerate(pivot_table.columns, 1):
+            pdf.cell(col_widths[1], 10, "Exam Time", 1, 0, 'C', True)
+            for idx, branch in enumerate(pivot_table.columns, 2):
                 pdf.cell(col_widths[idx], 10, str(branch), 1, 0, 'C', True)
             pdf.ln()
             
@@ -396,12 +477,12 @@ def generate_pdf_timetable(sem_dict, college_name):
             pdf.set_font("Arial", '', 10)
             
             row_num = 0
-            for date_idx, row in pivot_table.iterrows():
-                date_str = date_idx.strftime('%d-%m-%Y')
-                date_long = format_date_long(date_str)
+            for (date_idx, time_slot), row in pivot_table.iterrows():
+                date_long = format_date_long(date_idx)
+                time_slot = str(time_slot)
                 
                 # Wrap date text
-                date_lines = wrap_text(pdf, date_long, col_widths[0] - 4)
+                date_lines = metrics.wrap(date_long, col_widths[0] - 4)
                 
                 # Wrap subject texts
                 subject_lines = []
@@ -409,7 +490,7 @@ def generate_pdf_timetable(sem_dict, college_name):
                 
                 for branch in pivot_table.columns:
                     subject_text = row[branch]
-                    lines = wrap_text(pdf, subject_text, col_widths[1] - 4)
+                    lines = metrics.wrap(subject_text, col_widths[2] - 4)
                     subject_lines.append(lines)
                     max_lines = max(max_lines, len(lines))
                 
@@ -434,9 +515,14 @@ def generate_pdf_timetable(sem_dict, college_name):
                 
                 pdf.rect(x_start, y_start, col_widths[0], row_height)
                 
+                # Time cell
+                pdf.set_xy(x_start + col_offsets[1], y_start)
+                pdf.cell(col_widths[1], row_height, time_slot, 0, 0, 'C', True)
+                pdf.rect(x_start + col_offsets[1], y_start, col_widths[1], row_height)
+                
                 # Subject cells
-                for col_idx, lines in enumerate(subject_lines, 1):
-                    x_pos = x_start + sum(col_widths[:col_idx])
+                for col_idx, lines in enumerate(subject_lines, 2):
+                    x_pos = x_start + col_offsets[col_idx]
                     for line_idx, line in enumerate(lines):
                         pdf.set_xy(x_pos, y_start + line_idx * line_height)
                         pdf.cell(col_widths[col_idx], line_height, line, 0, 0, 'C', True)
@@ -454,27 +540,25 @@ def generate_pdf_timetable(sem_dict, college_name):
                 'semester_roman': semester_roman
             }
             pdf.branches = ["Open Electives"]
-            pdf.time_slot = time_slot
             
             pdf.add_page()
             
             # Format subjects
             df_elec['SubjectDisplay'] = df_elec.apply(format_elective_for_excel, axis=1)
-            df_elec['Exam Date'] = pd.to_datetime(df_elec['Exam Date'], format="%d-%m-%Y", errors='coerce')
             df_elec = df_elec.dropna(subset=['Exam Date'])
             df_elec = df_elec.sort_values('Exam Date')
             
-            # Group by date and OE
-            elec_grouped = df_elec.groupby(['Exam Date', 'OE'])['SubjectDisplay'].apply(
-                lambda x: ', '.join(sorted(x))
-            ).reset_index()
+            # Group by session and OE
+            elec_grouped = elective_sessions(df_elec)
             
             # Column widths
             date_col_width = 60
+            time_col_width = 40
             oe_col_width = 30
-            subject_col_width = pdf.w - 20 - date_col_width - oe_col_width
+            subject_col_width = pdf.w - 20 - date_col_width - time_col_width - oe_col_width
             
-            col_widths = [date_col_width, oe_col_width, subject_col_width]
+            col_widths = [date_col_width, time_col_width, oe_col_width, subject_col_width]
+            col_offsets = list(accumulate(col_widths, initial=0))
             
             # Table header
             pdf.set_fill_color(149, 33, 28)
@@ -482,8 +566,9 @@ def generate_pdf_timetable(sem_dict, college_name):
             pdf.set_font("Arial", 'B', 10)
             
             pdf.cell(col_widths[0], 10, "Exam Date", 1, 0, 'C', True)
-            pdf.cell(col_widths[1], 10, "OE Type", 1, 0, 'C', True)
-            pdf.cell(col_widths[2], 10, "Subjects", 1, 0, 'C', True)
+            pdf.cell(col_widths[1], 10, "Exam Time", 1, 0, 'C', True)
+            pdf.cell(col_widths[2], 10, "OE Type", 1, 0, 'C', True)
+            pdf.cell(col_widths[3], 10, "Subjects", 1, 0, 'C', True)
             pdf.ln()
             
             # Table data
@@ -492,15 +577,15 @@ def generate_pdf_timetable(sem_dict, college_name):
             
             row_num = 0
             for _, row in elec_grouped.iterrows():
-                date_str = row['Exam Date'].strftime('%d-%m-%Y')
-                date_long = format_date_long(date_str)
+                date_long = format_date_long(row['Exam Date'])
+                time_slot = str(row['Time Slot'])
                 oe_type = row['OE']
                 subjects = row['SubjectDisplay']
                 
                 # Wrap texts
-                date_lines = wrap_text(pdf, date_long, col_widths[0] - 4)
+                date_lines = metrics.wrap(date_long, col_widths[0] - 4)
                 oe_lines = [oe_type]
-                subject_lines = wrap_text(pdf, subjects, col_widths[2] - 4)
+                subject_lines = metrics.wrap(subjects, col_widths[3] - 4)
                 
                 max_lines = max(len(date_lines), len(oe_lines), len(subject_lines))
                 line_height = 5
@@ -522,16 +607,21 @@ def generate_pdf_timetable(sem_dict, college_name):
                     pdf.cell(col_widths[0], line_height, line, 0, 0, 'C', True)
                 pdf.rect(x_start, y_start, col_widths[0], row_height)
                 
+                # Time cell
+                pdf.set_xy(x_start + col_offsets[1], y_start)
+                pdf.cell(col_widths[1], row_height, time_slot, 0, 0, 'C', True)
+                pdf.rect(x_start + col_offsets[1], y_start, col_widths[1], row_height)
+                
                 # OE Type cell
-                pdf.set_xy(x_start + col_widths[0], y_start)
-                pdf.cell(col_widths[1], row_height, oe_type, 0, 0, 'C', True)
-                pdf.rect(x_start + col_widths[0], y_start, col_widths[1], row_height)
+                pdf.set_xy(x_start + col_offsets[2], y_start)
+                pdf.cell(col_widths[2], row_height, oe_type, 0, 0, 'C', True)
+                pdf.rect(x_start + col_offsets[2], y_start, col_widths[2], row_height)
                 
                 # Subjects cell
                 for line_idx, line in enumerate(subject_lines):
-                    pdf.set_xy(x_start + col_widths[0] + col_widths[1], y_start + line_idx * line_height)
-                    pdf.cell(col_widths[2], line_height, line, 0, 0, 'C', True)
-                pdf.rect(x_start + col_widths[0] + col_widths[1], y_start, col_widths[2], row_height)
+                    pdf.set_xy(x_start + col_offsets[3], y_start + line_idx * line_height)
+                    pdf.cell(col_widths[3], line_height, line, 0, 0, 'C', True)
+                pdf.rect(x_start + col_offsets[3], y_start, col_widths[3], row_height)
                 
                 pdf.set_xy(x_start, y_start + row_height)
                 pdf.ln()
@@ -551,6 +641,69 @@ def generate_pdf_timetable(sem_dict, college_name):
     return pdf_output
 
 
+def schedule_fingerprint(sem_dict, college_name):
+    """Content hash of a schedule (every semester frame) plus the college, for memoizing artifacts"""
+    digest = hashlib.sha256(str(college_name).encode())
+    for sem in sorted(sem_dict):
+        df = sem_dict[sem]
+        digest.update(f"{sem}|{list(df.columns)}".encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def build_artifact(name, sem_dict, college_name):
+    """
+    Bytes of one download artifact: 'excel', 'verification' or 'pdf' (None when nothing was produced).
+    The verification workbook is the main workbook (see export_excel).
+    """
+    builder = {'excel': export_excel, 'verification': export_excel, 'pdf': generate_pdf_timetable}[name]
+    buffer = builder(sem_dict, college_name)
+    if not buffer:
+        return None
+    # One copy out of the (possibly disk-backed) buffer, which is closed right after
+    with buffer:
+        buffer.seek(0)
+        return buffer.read()
+
+
+def _build_artifact(args):
+    """Worker entry point (top level so it can be pickled): (name, bytes or None, error or None, seconds)"""
+    name, sem_dict, college_name = args
+    t_start = time.perf_counter()
+    try:
+        return name, build_artifact(name, sem_dict, college_name), None, time.perf_counter() - t_start
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}", time.perf_counter() - t_start
+
+
+def build_artifacts(sem_dict, college_name, max_workers=None, sink=None):
+    """
+    Build the Excel workbook and the PDF concurrently in worker processes.
+    The verification workbook has the same format as the main one (see
+    export_excel), so it reuses the main workbook's bytes.
+
+    Returns:
+        dict: {'excel', 'verification', 'pdf': bytes or None,
+               'timings': {artifact: seconds}, 'errors': {artifact: message}}
+    """
+    jobs = [('excel', sem_dict, college_name)]
+    if sem_dict:
+        jobs.append(('pdf', sem_dict, college_name))
+
+    artifacts = {'excel': None, 'verification': None, 'pdf': None, 'timings': {}, 'errors': {}}
+    for name, data, error, seconds in run_in_processes(_build_artifact, jobs, max_workers=max_workers, sink=sink):
+        artifacts[name] = data
+        artifacts['timings'][name] = seconds
+        if error:
+            artifacts['errors'][name] = error
+
+    artifacts['verification'] = artifacts['excel']
+    artifacts['timings']['verification'] = 0.0
+    if 'excel' in artifacts['errors']:
+        artifacts['errors']['verification'] = artifacts['errors']['excel']
+    return artifacts
+
+
 def create_download_link(file_data, filename, file_type):
     """Create styled download button."""
     b64 = base64.b64encode(file_data.read()).decode()
@@ -0,0 +1,300 @@
+"""
+Incremental repair of a published timetable.
+
+Given a previous schedule and a delta (holidays added/removed, rows added,
+removed or edited), only the affected atomic units are re-placed; every other
+row keeps its date and slot. A unit is affected when one of its rows sits on a
+newly added holiday, when rows were added to or edited in it, or when it was
+left unscheduled. Affected units first try to keep their current session, then
+take the earliest feasible day on or after their old date, then any earlier day.
+With the original run's enrollment list, units sharing a student never share a
+session; with its venue inventory, every campus stays within its own seats.
+
+Rows are identified by (ModuleCode, Branch, Semester). Elective baskets follow
+the rules of schedule_electives_globally instead: OE1/OE5 share one day, OE2
+sits on the next valid day, both days are free of other exams and no session
+capacity applies. When any elective row is affected the baskets are re-placed
+together, searching from their old day as above.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from atomic_units import compile_atomic_units, assign_priority_tiers, tiered_queue
+from campus_partition import _campus_labels
+from progress import get_sink
+from data_processing import apply_schema
+from exam_calendar import get_calendar
+from sessions import SessionModel
+from scheduling import ELECTIVE_DAYS, _eligible_mask, _elective_mask
+from utils import to_exam_dates
+
+ROW_KEY = ['ModuleCode', 'Branch', 'Semester']
+
+
+def _row_keys(df):
+    return pd.MultiIndex.from_frame(df[ROW_KEY].astype(str))
+
+
+def reschedule_incrementally(previous_df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=2000,
+                             added_holidays=(), removed_holidays=(), added_rows=None, removed_rows=None,
+                             edited_rows=None, sink=None, sessions=None, enrollment=None, inventory=None):
+    """
+    Repair `previous_df` for a delta instead of rescheduling from scratch.
+
+    Args:
+        previous_df (DataFrame): scheduled rows (all semesters, electives included); not modified
+        holidays (set): the NEW holiday set (dates)
+        base_date, end_date (datetime): examination period
+        added_holidays, removed_holidays (iterable): holiday dates that changed
+        added_rows (DataFrame): new rows in read_timetable format (Exam Date may be empty)
+        removed_rows (DataFrame): rows to drop, matched on ROW_KEY
+        edited_rows (DataFrame): ROW_KEY plus the columns to overwrite (e.g. StudentCount)
+        sessions (SessionModel): sessions of the day (None = the standard two sessions)
+        enrollment (EnrollmentMatrix): student lists; re-placed units avoid sessions holding
+            a unit they share a student with
+        inventory (VenueInventory): rooms; sessions are capped at the seats and each campus
+            at its own seats, as in venues.schedule_with_venues
+
+    Returns:
+        tuple: (repaired DataFrame, report dict with 'dirty_units', 'kept', 'moved',
+                'unplaced', 'rows_added', 'rows_removed', 'rows_edited', 'seconds')
+    """
+    sink = get_sink(sink)
+    if sessions is None:
+        sessions = SessionModel.from_preset(default_capacity=MAX_STUDENTS_PER_SESSION)
+    slot_labels, slot_capacity = sessions.labels, sessions.capacities
+    t_start = time.perf_counter()
+    df = previous_df.copy().reset_index(drop=True)
+    df['Exam Date'] = to_exam_dates(df['Exam Date'])
+    changed_keys = set()
+
+    # Apply the row delta
+    rows_removed = 0
+    if removed_rows is not None and not removed_rows.empty:
+        drop = _row_keys(df).isin(_row_keys(removed_rows))
+        rows_removed = int(drop.sum())
+        df = df[~drop].reset_index(drop=True)
+
+    rows_edited = 0
+    if edited_rows is not None and not edited_rows.empty:
+        edits = edited_rows.set_index(_row_keys(edited_rows)).drop(columns=ROW_KEY)
+        keys = _row_keys(df)
+        hit = keys.isin(edits.index)
+        rows_edited = int(hit.sum())
+        for column in edits.columns:
+            df.loc[hit, column] = edits[column].reindex(keys[hit]).to_numpy()
+        changed_keys.update(df.loc[hit, 'ModuleCode'].astype(str))
+
+    rows_added = 0
+    if added_rows is not None and not added_rows.empty:
+        new_rows = added_rows.copy()
+        new_rows['Exam Date'] = pd.NaT
+        new_rows['Time Slot'] = ""
+        rows_added = len(new_rows)
+        changed_keys.update(new_rows['ModuleCode'].astype(str))
+        df = pd.concat([df, new_rows], ignore_index=True)
+
+    # Units: one per ModuleCode over the rows the comprehensive scheduler places;
+    # elective baskets are re-placed separately, everything else is left alone
+    schedulable = _eligible_mask(df).to_numpy()
+    elective = _elective_mask(df).to_numpy()
+    units = compile_atomic_units(df, np.flatnonzero(schedulable))
+    n_units = len(units)
+
+    # Row -> unit id
+    row_unit = np.full(len(df), -1, dtype=np.int64)
+    row_unit[units.row_positions] = np.repeat(np.arange(n_units), units.row_counts)
+
+    # Which units must be re-placed
+    new_holidays = pd.to_datetime(list(added_holidays)).to_numpy(dtype='datetime64[ns]')
+    dates = df['Exam Date'].to_numpy(dtype='datetime64[ns]')
+    unplaced_row = np.isnat(dates)
+    affected_row = (np.isin(dates, new_holidays) | unplaced_row
+                    | np.isin(df['ModuleCode'].astype(str).to_numpy(), list(changed_keys)))
+    dirty_row = schedulable & affected_row
+    dirty = np.zeros(n_units, dtype=bool)
+    dirty[row_unit[dirty_row & (row_unit >= 0)]] = True
+    electives_dirty = bool((elective & affected_row).any())
+
+    # Candidate days: the new calendar, stretched to cover dates already pinned past end_date
+    pinned = schedulable & ~unplaced_row & ~np.isin(row_unit, np.flatnonzero(dirty))
+    pinned_electives = elective & ~unplaced_row & (not electives_dirty)
+    horizon = end_date
+    if (pinned | pinned_electives).any():
+        horizon = max(end_date, pd.Timestamp(dates[pinned | pinned_electives].max()).to_pydatetime())
+    valid_days = get_calendar(base_date, horizon, holidays).valid_days
+    day_index = {day: d for d, day in enumerate(valid_days)}
+    if removed_holidays:
+        sink.write(f"{len(removed_holidays)} holiday(s) removed - those days are available again")
+
+    # Student-level clashes: unit -> bitmask of units sharing a student
+    unit_clash = None if enrollment is None else enrollment.clash_masks(units.module_codes)
+
+    # Seats: every session capped at the inventory, each campus at its own rooms
+    row_campus = _campus_labels(df).to_numpy()
+    students = pd.to_numeric(df['StudentCount'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    campus_seats = {}
+    unit_campus_students = [{} for _ in range(n_units)]
+    if inventory is not None:
+        campuses = list(pd.unique(row_campus))
+        campus_seats = {campus: inventory.seats_for([campus]) for campus in campuses}
+        sessions = inventory.cap_sessions(sessions, campuses)
+        slot_labels, slot_capacity = sessions.labels, sessions.capacities
+        in_unit = row_unit >= 0
+        per_campus = pd.Series(students[in_unit]).groupby([row_unit[in_unit], row_campus[in_unit]]).sum()
+        for (u, campus), count in per_campus.items():
+            unit_campus_students[u][campus] = int(count)
+
+    # Pinned occupancy is built row by row so partially moved units stay exactly as published
+    bs_ids = units.branch_sem_index.ids
+    row_bs = (df['Branch'].astype(str) + "_" + df['Semester'].astype(str)).map(bs_ids)
+    slot_ids = df['Time Slot'].astype(str).map({label: s for s, label in enumerate(slot_labels)})
+    occupied = {}
+    load = {}
+    campus_load = {}
+    session_units = {}
+    for pos in np.flatnonzero(pinned):
+        day = dates[pos]
+        if pd.notna(row_bs.iat[pos]):
+            occupied[day] = occupied.get(day, 0) | (1 << int(row_bs.iat[pos]))
+        if pd.notna(slot_ids.iat[pos]):
+            session = (day, int(slot_ids.iat[pos]))
+            load[session] = load.get(session, 0) + int(students[pos])
+            campus_session = (*session, row_campus[pos])
+            campus_load[campus_session] = campus_load.get(campus_session, 0) + int(students[pos])
+            session_units[session] = session_units.get(session, 0) | (1 << int(row_unit[pos]))
+
+    # Days held by electives that stay put take no other exam
+    elective_days = set(dates[pinned_electives])
+
+    def fits(u, day, slot):
+        return (day not in elective_days
+                and not units.branch_sem_mask[u] & occupied.get(day, 0)
+                and load.get((day, slot), 0) + int(units.students[u]) <= slot_capacity[slot]
+                and (unit_clash is None or not unit_clash[u] & session_units.get((day, slot), 0))
+                and all(campus_load.get((day, slot, campus), 0) + count <= campus_seats[campus]
+                        for campus, count in unit_campus_students[u].items() if campus in campus_seats))
+
+    def pick_slot(u, day, preferred):
+        for slot in sessions.slot_order(preferred):
+            if fits(u, day, slot):
+                return slot
+        return None
+
+    # Re-place dirty units in the scheduler's tier/priority order
+    queue = [u for u in tiered_queue(units, assign_priority_tiers(units)).tolist() if dirty[u]]
+    report = {'dirty_units': len(queue), 'kept': [], 'moved': [], 'unplaced': []}
+    date_col, slot_col = df.columns.get_loc('Exam Date'), df.columns.get_loc('Time Slot')
+
+    for u in queue:
+        rows = units.rows_of(u)
+        label = units.subject_names[u]
+        old_dates = np.unique(dates[rows][~np.isnat(dates[rows])])
+        old_date = old_dates[0] if len(old_dates) == 1 else None
+        old_slots = slot_ids.iloc[rows].dropna().unique()
+        if len(old_slots) == 1:
+            preferred = int(old_slots[0])
+        else:
+            preferred = sessions.preferred_slot(max(units.unique_semesters[u]))
+
+        # 1) keep the current session when it is still legal
+        choice = None
+        if old_date in day_index:
+            slot = pick_slot(u, old_date, preferred)
+            if slot is not None:
+                choice = (old_date, slot)
+
+        # 2) earliest day on/after the old date, then anything earlier
+        if choice is None:
+            start = 0
+            if old_date is not None:
+                start = int(np.searchsorted(valid_days, old_date))
+            for d in list(range(start, len(valid_days))) + list(range(start)):
+                slot = pick_slot(u, valid_days[d], preferred)
+                if slot is not None:
+                    choice = (valid_days[d], slot)
+                    break
+
+        if choice is None:
+            df.iloc[rows, date_col] = pd.NaT
+            report['unplaced'].append(label)
+            continue
+
+        day, slot = choice
+        occupied[day] = occupied.get(day, 0) | units.branch_sem_mask[u]
+        load[(day, slot)] = load.get((day, slot), 0) + int(units.students[u])
+        session_units[(day, slot)] = session_units.get((day, slot), 0) | (1 << u)
+        for campus, count in unit_campus_students[u].items():
+            campus_load[(day, slot, campus)] = campus_load.get((day, slot, campus), 0) + count
+        df.iloc[rows, date_col] = day
+        df.iloc[rows, slot_col] = slot_labels[slot]
+        if day == old_date:
+            report['kept'].append(label)
+        else:
+            report['moved'].append((label, None if old_date is None else pd.Timestamp(old_date),
+                                    pd.Timestamp(day), slot_labels[slot]))
+
+    if electives_dirty:
+        _replace_electives(df, elective, valid_days, report)
+
+    report.update(rows_added=rows_added, rows_removed=rows_removed, rows_edited=rows_edited,
+                  seconds=time.perf_counter() - t_start)
+
+    sink.info(f"Incremental repair: {report['dirty_units']} affected units, "
+              f"{len(report['moved'])} moved, {len(report['kept'])} kept in place, "
+              f"{len(report['unplaced'])} unplaced ({report['seconds'] * 1000:.0f} ms)")
+    if report['moved']:
+        sink.write("Moved units:", details=[f"{label}: {'unscheduled' if old is None else f'{old:%d-%m-%Y}'} → {new:%d-%m-%Y} ({slot})"
+                                            for label, old, new, slot in report['moved']],
+                   details_title="Moved units")
+    if report['unplaced']:
+        sink.warning(f"{len(report['unplaced'])} units could not be placed: {', '.join(report['unplaced'])}")
+    return apply_schema(df), report
+
+
+def _replace_electives(df, elective, valid_days, report):
+    """
+    Re-place the elective baskets of df in place: the ELECTIVE_DAYS baskets go on
+    consecutive valid days that hold no other exam, the first pair on or after
+    their old day (then any earlier pair). Session capacity is not checked.
+    """
+    basket = df['OE'].astype(str).to_numpy()
+    days_used = [(baskets, time_slot, np.flatnonzero(elective & np.isin(basket, baskets)))
+                 for baskets, time_slot in ELECTIVE_DAYS]
+    days_used = [day for day in days_used if len(day[2])]
+    report['dirty_units'] += sum(len(np.unique(basket[rows])) for _, _, rows in days_used)
+
+    dates = df['Exam Date'].to_numpy(dtype='datetime64[ns]')
+    busy = set(dates[~elective & ~np.isnat(dates)])
+    first_rows = days_used[0][2]
+    old_dates = np.unique(dates[first_rows][~np.isnat(dates[first_rows])])
+    old_date = old_dates[0] if len(old_dates) == 1 else None
+
+    start = 0 if old_date is None else int(np.searchsorted(valid_days, old_date))
+    span = len(days_used)
+    choice = None
+    for d in list(range(start, len(valid_days) - span + 1)) + list(range(min(start, len(valid_days) - span + 1))):
+        days = valid_days[d:d + span]
+        if not any(day in busy for day in days):
+            choice = days
+            break
+
+    date_col, slot_col = df.columns.get_loc('Exam Date'), df.columns.get_loc('Time Slot')
+    for k, (baskets, time_slot, rows) in enumerate(days_used):
+        for name in sorted(set(basket[rows])):
+            basket_rows = rows[basket[rows] == name]
+            if choice is None:
+                df.iloc[basket_rows, date_col] = pd.NaT
+                report['unplaced'].append(name)
+                continue
+            old_days = np.unique(dates[basket_rows][~np.isnat(dates[basket_rows])])
+            old_day = old_days[0] if len(old_days) == 1 else None
+            df.iloc[basket_rows, date_col] = choice[k]
+            df.iloc[basket_rows, slot_col] = time_slot
+            if old_day == choice[k]:
+                report['kept'].append(name)
+            else:
+                report['moved'].append((name, None if old_day is None else pd.Timestamp(old_day),
+                                        pd.Timestamp(choice[k]), time_slot))
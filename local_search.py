@@ -0,0 +1,233 @@
+"""
+Local-search improvement stage for a placed timetable.
+
+Simulated annealing over unit -> (day, slot) relocations and day swaps,
+working on the integer-coded state of compiled atomic units. Every move is
+applied incrementally (branch-semester bitmasks per day, student load per
+session, units per day), so evaluating a move costs O(1) big-int operations
+instead of rebuilding the schedule.
+
+Cost (lower is better), in priority order by weight:
+    unplaced units  >  exam span (days)  >  capacity overflow (students)
+    >  back-to-back exams for a branch-semester  >  units off their preferred slot
+Branch-semester clashes (and, with enrollment data, students sitting two exams
+in one session) are never allowed; capacity overflow may appear
+transiently, but only overflow-free states are kept as the best result.
+"""
+import math
+import random
+import time
+
+import numpy as np
+
+from atomic_units import popcount
+
+WEIGHTS = {
+    'unplaced': 10000,
+    'span': 1000,
+    'overflow': 20,
+    'back_to_back': 5,
+    'off_preferred': 1,
+}
+
+
+class _State:
+    """Incrementally maintained schedule state and cost components"""
+
+    def __init__(self, units, unit_day, unit_slot, n_days, slot_capacity, preferred_slot, day_capacity=None,
+                 clash_masks=None):
+        self.masks = units.branch_sem_mask
+        self.students = units.students.tolist()
+        self.preferred = list(preferred_slot)
+        self.capacity = day_capacity if day_capacity is not None else [list(slot_capacity)] * n_days
+        self.n_days = n_days
+        self.n_slots = len(slot_capacity)
+
+        self.day = [int(d) for d in unit_day]
+        self.slot = [int(s) for s in unit_slot]
+        self.day_mask = [0] * (n_days + 2)  # padded so d-1 / d+1 are always valid
+        self.load = [[0] * self.n_slots for _ in range(n_days)]
+        self.day_units = [set() for _ in range(n_days)]
+        self.clash = clash_masks
+        self.session_units = [[0] * self.n_slots for _ in range(n_days)]  # unit bitmask per (day, slot)
+
+        self.unplaced = 0
+        self.span = 0
+        self.overflow = 0
+        self.back_to_back = 0
+        self.off_preferred = 0
+
+        placed = [(u, self.day[u], self.slot[u]) for u in range(len(self.day))]
+        for u in range(len(self.day)):
+            self.day[u], self.slot[u] = -1, -1
+            self.unplaced += 1
+        for u, d, s in placed:
+            if 0 <= d < n_days:
+                self.add(u, d, s)
+
+    def cost(self):
+        return (WEIGHTS['unplaced'] * self.unplaced
+                + WEIGHTS['span'] * self.span
+                + WEIGHTS['overflow'] * self.overflow
+                + WEIGHTS['back_to_back'] * self.back_to_back
+                + WEIGHTS['off_preferred'] * self.off_preferred)
+
+    def fits(self, u, d, s):
+        """True when unit u can sit in (d, s) without a branch-semester or student clash"""
+        other = self.day_mask[d + 1]
+        if self.day[u] == d:
+            other &= ~self.masks[u]
+        if self.masks[u] & other:
+            return False
+        return not (self.clash and self.clash[u] & self.session_units[d][s] & ~(1 << u))
+
+    def _overflow_delta(self, d, s, change):
+        before = max(0, self.load[d][s] - self.capacity[d][s])
+        self.load[d][s] += change
+        return max(0, self.load[d][s] - self.capacity[d][s]) - before
+
+    def remove(self, u):
+        d, s = self.day[u], self.slot[u]
+        m = self.masks[u]
+        self.day_mask[d + 1] &= ~m
+        self.back_to_back -= popcount(m & self.day_mask[d]) + popcount(m & self.day_mask[d + 2])
+        self.overflow += self._overflow_delta(d, s, -self.students[u])
+        self.off_preferred -= s != self.preferred[u]
+        self.day_units[d].discard(u)
+        self.session_units[d][s] &= ~(1 << u)
+        while self.span > 0 and not self.day_units[self.span - 1]:
+            self.span -= 1
+        self.day[u], self.slot[u] = -1, -1
+        self.unplaced += 1
+
+    def add(self, u, d, s):
+        m = self.masks[u]
+        self.back_to_back += popcount(m & self.day_mask[d]) + popcount(m & self.day_mask[d + 2])
+        self.day_mask[d + 1] |= m
+        self.overflow += self._overflow_delta(d, s, self.students[u])
+        self.off_preferred += s != self.preferred[u]
+        self.day_units[d].add(u)
+        self.session_units[d][s] |= 1 << u
+        self.span = max(self.span, d + 1)
+        self.day[u], self.slot[u] = d, s
+        self.unplaced -= 1
+
+    def move(self, u, d, s):
+        """Relocate u to (d, s); returns the previous (day, slot) for undo"""
+        previous = (self.day[u], self.slot[u])
+        if previous[0] >= 0:
+            self.remove(u)
+        self.add(u, d, s)
+        return previous
+
+    def undo(self, u, previous):
+        self.remove(u)
+        if previous[0] >= 0:
+            self.add(u, *previous)
+
+
+def improve_assignment(units, unit_day, unit_slot, n_days, slot_capacity, preferred_slot,
+                       time_budget=5.0, seed=0, day_capacity=None, clash_masks=None):
+    """
+    Improve a unit assignment by simulated annealing under a wall-clock budget.
+
+    Args:
+        units (AtomicUnits): compiled units
+        unit_day, unit_slot (ndarray): starting assignment (-1 = unplaced); not modified
+        n_days (int): number of valid exam days the schedule may use
+        slot_capacity (list[int]): maximum students per slot
+        preferred_slot (array-like): preferred slot id per unit
+        time_budget (float): seconds to search
+        seed (int): random seed
+        day_capacity (list[list[int]]): optional per-day slot capacities (n_days x slots), overriding slot_capacity
+        clash_masks (list[int]): optional per-unit bitmask of units sharing students (never in one session)
+
+    Returns:
+        dict: {'unit_day', 'unit_slot', 'cost_before', 'cost_after', 'span_before',
+               'span_after', 'iterations', 'improved'}
+    """
+    n_units = len(units)
+    state = _State(units, unit_day, unit_slot, n_days, slot_capacity, preferred_slot, day_capacity, clash_masks)
+    rng = random.Random(seed)
+
+    cost_before, span_before = state.cost(), state.span
+    initial = (list(state.day), list(state.slot), state.span)
+    best_cost = cost_before if state.overflow == 0 else math.inf
+    best = initial
+    max_capacity = max(slot_capacity)
+
+    if n_units == 0 or n_days == 0 or time_budget <= 0:
+        return _result(initial, cost_before, cost_before, 0)
+
+    t_start = time.perf_counter()
+    t_high, t_low = WEIGHTS['span'] * 0.5, 0.5
+    temperature = t_high
+    iterations = 0
+
+    while True:
+        if iterations % 256 == 0:
+            progress = (time.perf_counter() - t_start) / time_budget
+            if progress >= 1.0:
+                break
+            temperature = t_high * (t_low / t_high) ** progress
+        iterations += 1
+
+        current = state.cost()
+        if rng.random() < 0.8:
+            # Relocation; half the time pull a unit off the last day to attack the span
+            if state.span > 0 and rng.random() < 0.5:
+                u = rng.choice(tuple(state.day_units[state.span - 1]))
+            else:
+                u = rng.randrange(n_units)
+            if state.students[u] > max_capacity:
+                continue
+            d = rng.randrange(min(n_days, state.span + 1))
+            s = rng.randrange(state.n_slots)
+            if (d, s) == (state.day[u], state.slot[u]) or not state.fits(u, d, s):
+                continue
+            previous = state.move(u, d, s)
+            delta = state.cost() - current
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                state.undo(u, previous)
+                continue
+        else:
+            # Swap the days of two placed units
+            u, v = rng.randrange(n_units), rng.randrange(n_units)
+            du, dv = state.day[u], state.day[v]
+            if u == v or du < 0 or dv < 0 or du == dv:
+                continue
+            su, sv = state.slot[u], state.slot[v]
+            prev_u = state.move(u, dv, su) if state.fits(u, dv, su) else None
+            if prev_u is None:
+                continue
+            if not state.fits(v, du, sv):
+                state.undo(u, prev_u)
+                continue
+            prev_v = state.move(v, du, sv)
+            delta = state.cost() - current
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                state.undo(v, prev_v)
+                state.undo(u, prev_u)
+                continue
+
+        if state.overflow == 0 and state.cost() < best_cost:
+            best_cost = state.cost()
+            best = (list(state.day), list(state.slot), state.span)
+
+    if best_cost < cost_before:
+        return _result(best, cost_before, best_cost, iterations, span_before=span_before)
+    return _result(initial, cost_before, cost_before, iterations)
+
+
+def _result(assignment, cost_before, cost_after, iterations, span_before=None):
+    day, slot, span = assignment
+    return {
+        'unit_day': np.asarray(day, dtype=np.int64),
+        'unit_slot': np.asarray(slot, dtype=np.int64),
+        'cost_before': cost_before,
+        'cost_after': cost_after,
+        'span_before': span if span_before is None else span_before,
+        'span_after': span,
+        'iterations': iterations,
+        'improved': cost_after < cost_before,
+    }
@@ -0,0 +1,90 @@
+"""
+Multi-start parallel scheduling.
+
+The greedy engine is deterministic for a given priority ordering. This module
+runs several perturbed orderings of schedule_all_subjects_comprehensively in a
+process pool, scores every result and keeps the best one. Start 0 always uses
+the unperturbed ordering, so multi-start is never worse than a single run.
+"""
+import os
+
+from parallel import run_in_processes
+from progress import get_sink
+from scheduling import schedule_all_subjects_comprehensively, _eligible_mask
+
+
+def score_schedule(df, max_students_per_session, sessions=None):
+    """
+    Score a scheduled frame; lower tuples are better. With a SessionModel the
+    headroom of each slot is measured against that slot's own capacity.
+
+    Returns:
+        tuple: (unscheduled rows, span in days, days used, -min capacity headroom)
+    """
+    metrics = df.attrs.get('schedule_metrics', {})
+    eligible = df[_eligible_mask(df)]
+    unscheduled = int(eligible['Exam Date'].isna().sum())
+
+    scheduled = eligible[eligible['Exam Date'].notna()]
+    if scheduled.empty:
+        headroom = 0
+    else:
+        session_load = scheduled.groupby(['Exam Date', 'Time Slot'], observed=True)['StudentCount'].sum()
+        if sessions is None:
+            capacity = max_students_per_session
+        else:
+            slots = session_load.index.get_level_values('Time Slot').astype(str)
+            capacity = slots.map(lambda label: sessions.capacity_of_label(label, max_students_per_session)).to_numpy()
+        headroom = int((capacity - session_load.to_numpy()).min())
+
+    return (unscheduled, metrics.get('span_days', 0), metrics.get('days_used', 0), -headroom)
+
+
+def _run_single_start(args):
+    """Worker entry point (top level so it can be pickled)"""
+    df, holidays, base_date, end_date, max_students, seed, schedule_kwargs = args
+    scheduled = schedule_all_subjects_comprehensively(
+        df.copy(), holidays, base_date, end_date,
+        MAX_STUDENTS_PER_SESSION=max_students, ordering_seed=seed, **schedule_kwargs
+    )
+    return seed, score_schedule(scheduled, max_students, schedule_kwargs.get('sessions')), scheduled
+
+
+def schedule_multistart(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=2000,
+                        n_starts=8, max_workers=None, seed=0, sink=None, **schedule_kwargs):
+    """
+    Run `n_starts` orderings of the scheduler across a process pool and return the best frame.
+
+    Args:
+        df (DataFrame): frame to schedule (not modified)
+        n_starts (int): number of orderings; start 0 is the deterministic ordering
+        max_workers (int): pool size (default: all cores)
+        seed (int): base seed for the perturbed orderings
+        **schedule_kwargs: forwarded to schedule_all_subjects_comprehensively (backend, improve_seconds, ...)
+
+    Returns:
+        DataFrame: best scheduled frame; df.attrs['schedule_metrics'] also carries
+        'multistart_score' and 'multistart_seed'
+    """
+    sink = get_sink(sink)
+    seeds = [None] + [seed + i for i in range(1, max(1, n_starts))]
+    jobs = [(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION, s, schedule_kwargs) for s in seeds]
+    workers = max_workers or os.cpu_count() or 1
+
+    sink.info(f"Multi-start: running {len(seeds)} orderings on {min(workers, len(seeds))} processes...")
+    results = run_in_processes(_run_single_start, jobs, max_workers=workers, sink=sink)
+
+    for run_seed, score, _ in results:
+        label = "baseline" if run_seed is None else f"seed {run_seed}"
+        sink.write(f"  {label}: unscheduled {score[0]}, span {score[1]} days, "
+                   f"days used {score[2]}, headroom {-score[3]} students")
+
+    best_seed, best_score, best_df = min(results, key=lambda result: result[1])
+    sink.success(f"Multi-start: best ordering is {'baseline' if best_seed is None else f'seed {best_seed}'} "
+                 f"(span {best_score[1]} days, {best_score[0]} unscheduled)")
+
+    metrics = dict(best_df.attrs.get('schedule_metrics', {}))
+    metrics['multistart_score'] = best_score
+    metrics['multistart_seed'] = best_seed
+    best_df.attrs['schedule_metrics'] = metrics
+    return best_df
@@ -0,0 +1,48 @@
+"""
+Process-pool helper shared by the scheduling and export stages.
+
+CPU-bound jobs (scheduler runs, campus partitions, Excel/PDF builds) are mapped
+over a process pool. When no pool can be used (sandboxed hosts, unpicklable
+inputs) the jobs run in-process instead, so callers never need a second path.
+"""
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from progress import get_sink
+
+
+def _run_pickled(payload):
+    """Worker-side half of run_in_processes: unpickle (worker, job) and run it."""
+    worker, job = pickle.loads(payload)
+    return worker(job)
+
+
+def run_in_processes(worker, jobs, max_workers=None, sink=None):
+    """
+    Map a top-level `worker` over `jobs` in a process pool, in job order.
+    Falls back to running the jobs in-process when no pool can be used; errors
+    raised by the jobs themselves propagate unchanged.
+    """
+    sink = get_sink(sink)
+    workers = min(max_workers or os.cpu_count() or 1, max(1, len(jobs)))
+    try:
+        # Pickle up front so unpicklable inputs (PicklingError, or TypeError/AttributeError
+        # for locals and lambdas) surface here rather than from a job's result
+        payloads = [pickle.dumps((worker, job), protocol=pickle.HIGHEST_PROTOCOL) for job in jobs]
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(_run_pickled, payload) for payload in payloads]
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    except (OSError, NotImplementedError, BrokenProcessPool,
+            pickle.PicklingError, TypeError, AttributeError) as e:
+        # Pools can be unavailable (sandboxed hosts, unpicklable inputs); run in-process instead
+        sink.warning(f"Process pool unavailable ({type(e).__name__}: {e}) - running jobs sequentially")
+        return [worker(job) for job in jobs]
+
+    # Only pool setup falls back; a job's own exception is re-raised from its result
+    with pool:
+        return [future.result() for future in futures]
@@ -0,0 +1,117 @@
+"""
+Progress/event sinks for the scheduling pipeline.
+
+The scheduling, optimization and ingestion functions never talk to Streamlit
+directly. They report what they are doing to a sink, and the caller decides
+what happens with those events:
+
+    NullSink       - drops everything (batch runs, worker processes)
+    BufferedSink   - keeps events in memory so the app can render one log at the end
+    StreamlitSink  - forwards every event to Streamlit as it happens
+    JsonSink       - writes one JSON object per line to a stream (CLI / server logs)
+"""
+import json
+import sys
+import time
+
+LEVELS = ("write", "info", "success", "warning", "error")
+
+
+class NullSink:
+    """Sink that ignores every event. Also the base class for all sinks."""
+
+    def emit(self, level, message, **data):
+        pass
+
+    def write(self, message, **data):
+        self.emit("write", message, **data)
+
+    def info(self, message, **data):
+        self.emit("info", message, **data)
+
+    def success(self, message, **data):
+        self.emit("success", message, **data)
+
+    def warning(self, message, **data):
+        self.emit("warning", message, **data)
+
+    def error(self, message, **data):
+        self.emit("error", message, **data)
+
+
+class BufferedSink(NullSink):
+    """Collects events in memory as dicts: {'level', 'message', 'time', **data}"""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, level, message, **data):
+        event = {'level': level, 'message': str(message), 'time': time.time()}
+        event.update(data)
+        self.events.append(event)
+
+    def by_level(self, *levels):
+        return [event for event in self.events if event['level'] in levels]
+
+    def counts(self):
+        counts = {level: 0 for level in LEVELS}
+        for event in self.events:
+            counts[event['level']] = counts.get(event['level'], 0) + 1
+        return counts
+
+    def as_text(self):
+        """Plain-text rendering of the whole log, one event per line"""
+        lines = []
+        for event in self.events:
+            prefix = "" if event['level'] in ("write", "info") else f"[{event['level'].upper()}] "
+            lines.append(prefix + event['message'])
+            for detail in event.get('details', []):
+                lines.append(f"    • {detail}")
+        return "\n".join(lines)
+
+    def clear(self):
+        self.events = []
+
+
+class StreamlitSink(NullSink):
+    """Forwards every event to Streamlit immediately (the pre-sink behaviour)."""
+
+    def __init__(self):
+        import streamlit as st
+        self._st = st
+
+    def emit(self, level, message, **data):
+        st = self._st
+        render = {
+            "write": st.write,
+            "info": st.info,
+            "success": st.success,
+            "warning": st.warning,
+            "error": st.error,
+        }.get(level, st.write)
+        render(message)
+
+        details = data.get('details')
+        if details:
+            with st.expander(data.get('details_title', "Details")):
+                for detail in details:
+                    st.write(f"• {detail}")
+        if data.get('celebrate'):
+            st.balloons()
+
+
+class JsonSink(NullSink):
+    """Writes each event as a JSON line: {"ts", "level", "message", ...data}"""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def emit(self, level, message, **data):
+        record = {'ts': round(time.time(), 3), 'level': level, 'message': str(message)}
+        record.update(data)
+        self.stream.write(json.dumps(record, default=str) + "\n")
+
+
+def get_sink(sink):
+    """Return the given sink, or a NullSink when none was supplied"""
+    return sink if sink is not None else NullSink()
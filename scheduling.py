@@ -1,434 +1,433 @@
-import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import timedelta, datetime
-from utils import get_valid_dates_in_range, find_next_valid_day_in_range, get_preferred_slot, normalize_date_to_ddmmyyyy
+from utils import is_open_elective, to_exam_dates, find_next_valid_day_for_electives
+from exam_calendar import ExamCalendar, get_calendar
+from sessions import SessionModel
+from progress import get_sink
+from cp_scheduler import cp_backend_available, solve_exam_schedule_cp
+from conflict_graph import estimate_day_bounds
+from local_search import improve_assignment
+from atomic_units import (
+    compile_atomic_units,
+    write_back_assignments,
+    assign_priority_tiers,
+    tiered_queue,
+    popcount,
+    PRIORITY_TIERS,
+)
 
+# Elective exam days, in order: (OE baskets, session label). Every basket of a day sits in
+# that day's session, and each day is the valid day right after the previous one.
+ELECTIVE_DAYS = [
+    (('OE1', 'OE5'), "10:00 AM - 1:00 PM"),
+    (('OE2',), "2:00 PM - 5:00 PM"),
+]
 
-def schedule_all_subjects_comprehensively(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=2000):
+def schedule_all_subjects_comprehensively(df, holidays, base_date, end_date, MAX_STUDENTS_PER_SESSION=2000, sink=None,
+                                          backend="greedy", time_budget=30.0, improve_seconds=0.0,
+                                          ordering_seed=None, sessions=None, session_capacity_overrides=None,
+                                          enrollment=None):
     """
     FIXED ZERO-UNSCHEDULED SUPER SCHEDULING WITH CAPACITY CONSTRAINTS
-    Now enforces maximum student capacity per time slot (morning/afternoon)
+    Now enforces maximum student capacity per session of the day. `sessions` is a
+    sessions.SessionModel (N slots with their own capacities); None = the standard
+    two sessions at MAX_STUDENTS_PER_SESSION each. session_capacity_overrides maps
+    (date, slot label) -> capacity for individual sessions (venues.py feeds room
+    shortfalls back through it). enrollment (enrollment.EnrollmentMatrix) adds the
+    student-level rule that units sharing a student never share a session.
+    Progress is reported to `sink` (see progress.py); nothing is rendered when it is None.
+    
+    backend="cp" additionally re-solves the greedy result with the CP-SAT model in
+    cp_scheduler.py for up to `time_budget` seconds and keeps it only if it is better.
+    improve_seconds > 0 runs the local-search stage (local_search.py) on the result for that long.
+    ordering_seed perturbs the priority ordering (used by multistart.py); None keeps it deterministic.
     """
-    st.info(f"SCHEDULING with {MAX_STUDENTS_PER_SESSION} students max per session...")
+    sink = get_sink(sink)
+    sink.info(f"SCHEDULING with {MAX_STUDENTS_PER_SESSION} students max per session...")
     
     # STEP 1: COMPREHENSIVE SUBJECT ANALYSIS
-    total_subjects_count = len(df)
+    df['Exam Date'] = to_exam_dates(df['Exam Date'])
     
     # Filter eligible subjects (exclude INTD and OE)
-    eligible_subjects = df[
-        (df['Category'] != 'INTD') & 
-        (~(df['OE'].notna() & (df['OE'].str.strip() != "")))
-    ].copy()
+    eligible_mask = _eligible_mask(df)
+    eligible_subjects = df[eligible_mask]
     
     if eligible_subjects.empty:
-        st.info("No eligible subjects to schedule")
+        sink.info("No eligible subjects to schedule")
         return df
     
-    # Helper functions
-    def find_next_valid_day(start_date, holidays_set):
-        return find_next_valid_day_in_range(start_date, end_date, holidays_set)
-    
-    # NEW: Track student counts per date and time slot
-    session_capacity = {}  # Format: {date_str: {'morning': count, 'afternoon': count}}
-    
-    def get_session_capacity(date_str, time_slot):
-        """Get current student count for a session"""
-        if date_str not in session_capacity:
-            session_capacity[date_str] = {'morning': 0, 'afternoon': 0}
-        
-        session_type = 'morning' if '10:00 AM' in time_slot else 'afternoon'
-        return session_capacity[date_str][session_type]
-    
-    def add_to_session_capacity(date_str, time_slot, student_count):
-        """Add students to a session's capacity"""
-        if date_str not in session_capacity:
-            session_capacity[date_str] = {'morning': 0, 'afternoon': 0}
-        
-        session_type = 'morning' if '10:00 AM' in time_slot else 'afternoon'
-        session_capacity[date_str][session_type] += student_count
-    
-    def can_fit_in_session(date_str, time_slot, student_count):
-        """Check if adding these students would exceed capacity"""
-        current_capacity = get_session_capacity(date_str, time_slot)
-        return (current_capacity + student_count) <= MAX_STUDENTS_PER_SESSION
-    
-    # STEP 2: CREATE ATOMIC SUBJECT UNITS
-    all_branch_sem_combinations = set()
-    branch_sem_details = {}
-    
-    for _, row in eligible_subjects.iterrows():
-        branch_sem = f"{row['Branch']}_{row['Semester']}"
-        all_branch_sem_combinations.add(branch_sem)
-        branch_sem_details[branch_sem] = {
-            'branch': row['Branch'],
-            'semester': row['Semester'],
-            'subbranch': row['SubBranch']
-        }
-    
-    st.write(f"Coverage target: {len(all_branch_sem_combinations)} branch-semester combinations")
-    
-    # Create ATOMIC SUBJECT UNITS
-    atomic_subject_units = {}
-    
-    for module_code, group in eligible_subjects.groupby('ModuleCode'):
-        branch_sem_combinations = []
-        unique_branches = set()
-        unique_semesters = set()
-        
-        for _, row in group.iterrows():
-            branch_sem = f"{row['Branch']}_{row['Semester']}"
-            branch_sem_combinations.append(branch_sem)
-            unique_branches.add(row['Branch'])
-            unique_semesters.add(row['Semester'])
-        
-        frequency = len(set(branch_sem_combinations))
-        
-        is_common_across = group['CommonAcrossSems'].iloc[0] if 'CommonAcrossSems' in group.columns else False
-        is_common_within = group['IsCommon'].iloc[0] == 'YES' if 'IsCommon' in group.columns else False
-        is_common = is_common_across or is_common_within or frequency > 1
-        
-        atomic_unit = {
-            'module_code': module_code,
-            'subject_name': group['Subject'].iloc[0],
-            'frequency': frequency,
-            'is_common': is_common,
-            'is_common_across': is_common_across,
-            'is_common_within': is_common_within,
-            'branch_sem_combinations': list(set(branch_sem_combinations)),
-            'all_rows': list(group.index),
-            'group_data': group,
-            'scheduled': False,
-            'scheduled_date': None,
-            'scheduled_slot': None,
-            'category': group['Category'].iloc[0] if 'Category' in group.columns else 'UNKNOWN',
-            'cross_semester_span': len(unique_semesters) > 1,
-            'cross_branch_span': len(unique_branches) > 1,
-            'unique_semesters': list(unique_semesters),
-            'unique_branches': list(unique_branches)
-        }
-        
-        priority_score = frequency * 10
-        
-        if is_common_across:
-            priority_score += 50
-        elif is_common_within:
-            priority_score += 25
-        elif frequency > 1:
-            priority_score += 15
-        
-        if atomic_unit['cross_semester_span']:
-            priority_score += 15
-        if atomic_unit['cross_branch_span']:
-            priority_score += 10
-        
-        atomic_unit['priority_score'] = priority_score
-        atomic_subject_units[module_code] = atomic_unit
-    
-    sorted_atomic_units = sorted(atomic_subject_units.values(), key=lambda x: x['priority_score'], reverse=True)
-    
-    very_high_priority = [unit for unit in sorted_atomic_units if unit['is_common_across'] or unit['frequency'] >= 8]
-    high_priority = [unit for unit in sorted_atomic_units if unit['is_common_within'] and unit not in very_high_priority]
-    medium_priority = [unit for unit in sorted_atomic_units if unit['frequency'] >= 2 and unit not in very_high_priority and unit not in high_priority]
-    low_priority = [unit for unit in sorted_atomic_units if unit not in very_high_priority and unit not in high_priority and unit not in medium_priority]
-    
-    st.write(f"Atomic unit classification:")
-    st.write(f"   Very High Priority: {len(very_high_priority)} units")
-    st.write(f"   High Priority: {len(high_priority)} units")
-    st.write(f"   Medium Priority: {len(medium_priority)} units")
-    st.write(f"   Low Priority: {len(low_priority)} units")
+    # Valid exam days of the period, computed once; next-day lookups are binary searches
+    calendar = get_calendar(base_date, end_date, holidays)
+    
+    # Session model: slot id -> label and capacity
+    if sessions is None:
+        sessions = SessionModel.from_preset(default_capacity=MAX_STUDENTS_PER_SESSION)
+    slot_labels = sessions.labels
+    slot_capacity = sessions.capacities
+    
+    overrides = {(pd.Timestamp(day).normalize(), label): capacity
+                 for (day, label), capacity in (session_capacity_overrides or {}).items()}
+    
+    def capacities_on(day):
+        """Slot capacities of one day, with any per-session overrides applied"""
+        day = pd.Timestamp(day)
+        return [overrides.get((day, label), capacity) for label, capacity in zip(slot_labels, slot_capacity)]
+    
+    # NEW: Track student counts per day and slot (day index -> [students per slot])
+    day_loads = []
+    day_caps = []
+    # Units placed per day and slot (bitmask over unit ids), for student clash checks
+    session_units = []
+    
+    def can_fit_in_session(u, slot):
+        """Check if unit u fits today's slot: capacity, and no shared students with units already there"""
+        if day_loads[-1][slot] + int(units.students[u]) > day_caps[-1][slot]:
+            return False
+        return unit_clash is None or not unit_clash[u] & session_units[-1][slot]
+    
+    # STEP 2: COMPILE ATOMIC SUBJECT UNITS (one per ModuleCode, integer-coded arrays)
+    eligible_positions = np.flatnonzero(eligible_mask.to_numpy())
+    units = compile_atomic_units(df, eligible_positions)
+    n_units = len(units)
+    
+    # Student-level clashes from the enrollment list: unit -> bitmask of units sharing a student
+    unit_clash = None
+    if enrollment is not None:
+        unit_clash = enrollment.clash_masks(units.module_codes)
+        clashing_pairs = sum(popcount(mask) for mask in unit_clash) // 2
+        sink.write(f"Enrollment: {len(enrollment)} students, {clashing_pairs} subject pairs share students")
+    
+    # Branch-semesters are interned to bit ids; each unit and each day is a bitmask
+    branch_sem_index = units.branch_sem_index
+    all_branch_sems_mask = branch_sem_index.full_mask
+    total_branch_sems = len(branch_sem_index)
+    sink.write(f"Coverage target: {total_branch_sems} branch-semester combinations")
+    
+    # Assignments are accumulated here and written back to df once at the end
+    unit_day = np.full(n_units, -1, dtype=np.int64)
+    unit_slot = np.full(n_units, -1, dtype=np.int64)
+    day_labels = []
+    
+    # Conflict-graph pre-pass: how many days does any valid timetable need?
+    bounds = estimate_day_bounds(units, MAX_STUDENTS_PER_SESSION, slot_capacity=slot_capacity)
+    sink.write(f"Exam-day bounds: at least {bounds['lower_bound']} days "
+               f"(clique {bounds['clique_bound']}, capacity {bounds['capacity_bound']}), "
+               f"greedy colouring needs {bounds['colouring_days']}")
+    if bounds['unplaceable']:
+        sink.warning(f"{bounds['unplaceable']} units exceed {max(slot_capacity)} students and cannot be seated in one session")
+    
+    # Single-pass tiering: every unit gets a tier id, the queue is (tier, priority) order
+    unit_tier = assign_priority_tiers(units)
+    tier_sizes = np.bincount(unit_tier, minlength=len(PRIORITY_TIERS))
+    
+    sink.write(f"Atomic unit classification:")
+    for tier_name, tier_size in zip(PRIORITY_TIERS, tier_sizes):
+        sink.write(f"   {tier_name} Priority: {tier_size} units")
+    
+    def place_unit(u, slot):
+        """Record an assignment of unit u to today's slot (all of its rows move together)"""
+        day = len(day_labels) - 1
+        unit_day[u] = day
+        unit_slot[u] = slot
+        day_masks[day] |= units.branch_sem_mask[u]
+        day_loads[day][slot] += int(units.students[u])
+        session_units[day][slot] |= 1 << u
+    
+    def pick_slot(u, preferred_semester):
+        """Preferred slot for the semester, else the nearest slot unit u fits in, else None"""
+        for slot in sessions.slot_order(sessions.preferred_slot(preferred_semester)):
+            if can_fit_in_session(u, slot):
+                return slot
+        return None
     
     # STEP 3: ATOMIC SCHEDULING ENGINE WITH CAPACITY CONSTRAINTS
-    daily_scheduled_branch_sem = {}
+    day_masks = []  # day index -> bitmask of branch-semesters already examined that day
     scheduled_count = 0
     current_date = base_date
     scheduling_day = 0
-    target_days = 15
+    # Day budget for the main phase: what the conflict graph says is achievable
+    target_days = max(bounds['lower_bound'], bounds['colouring_days'])
     
-    master_queue = very_high_priority + high_priority + medium_priority + low_priority
+    # Placed units are dropped by filtering on unit_day, never by list.remove()
+    master_queue = tiered_queue(units, unit_tier, seed=ordering_seed).tolist()
     unscheduled_units = master_queue.copy()
     
     while scheduling_day < target_days and unscheduled_units:
-        exam_date = find_next_valid_day(current_date, holidays)
+        exam_date = calendar.next_valid(current_date)
         if exam_date is None:
-            st.warning("No more valid exam days available in main scheduling")
+            sink.warning("No more valid exam days available in main scheduling")
             break
         
         date_str = exam_date.strftime("%d-%m-%Y")
+        day_labels.append(exam_date)
+        day_masks.append(0)
+        day_loads.append([0] * len(sessions))
+        day_caps.append(capacities_on(exam_date))
+        session_units.append([0] * len(sessions))
         scheduling_day += 1
         
-        st.write(f"Day {scheduling_day} ({date_str})")
-        
-        if date_str not in daily_scheduled_branch_sem:
-            daily_scheduled_branch_sem[date_str] = set()
+        sink.write(f"Day {scheduling_day} ({date_str})")
         
         day_scheduled_units = []
         units_to_remove = []
         
         # PHASE A: Schedule atomic units with capacity constraints
-        for atomic_unit in unscheduled_units:
-            conflicts = False
-            available_branch_sems = []
+        for u in unscheduled_units:
+            if units.branch_sem_mask[u] & day_masks[-1]:
+                continue
             
-            for branch_sem in atomic_unit['branch_sem_combinations']:
-                if branch_sem in daily_scheduled_branch_sem[date_str]:
-                    conflicts = True
-                    break
-                else:
-                    available_branch_sems.append(branch_sem)
+            # Time slot follows the highest semester in the unit
+            total_students = int(units.students[u])
+            preferred_semester = max(units.unique_semesters[u])
+            slot = pick_slot(u, preferred_semester)
+            if slot is None:
+                # Cannot fit today, skip to next unit
+                continue
+            if slot != sessions.preferred_slot(preferred_semester):
+                sink.write(f"  Moved to alternate slot due to capacity: {units.subject_names[u]}")
             
-            if not conflicts and available_branch_sems:
-                # Determine time slot
-                semester_counts = {}
-                for sem in atomic_unit['unique_semesters']:
-                    semester_counts[sem] = semester_counts.get(sem, 0) + 1
-                
-                preferred_semester = max(semester_counts.keys()) if semester_counts else atomic_unit['unique_semesters'][0]
-                time_slot = get_preferred_slot(preferred_semester)
-                
-                # NEW: Calculate total student count for this unit
-                total_students = 0
-                for row_idx in atomic_unit['all_rows']:
-                    student_count = df.loc[row_idx, 'StudentCount']
-                    total_students += int(student_count) if pd.notna(student_count) else 0
-                
-                # NEW: Check if this unit fits in the session capacity
-                if not can_fit_in_session(date_str, time_slot, total_students):
-                    # Try alternate time slot
-                    alternate_slot = "2:00 PM - 5:00 PM" if time_slot == "10:00 AM - 1:00 PM" else "10:00 AM - 1:00 PM"
-                    
-                    if can_fit_in_session(date_str, alternate_slot, total_students):
-                        time_slot = alternate_slot
-                        st.write(f"  Moved to alternate slot due to capacity: {atomic_unit['subject_name']}")
-                    else:
-                        # Cannot fit today, skip to next unit
-                        continue
-                
-                # Schedule ALL instances of this subject
-                unit_scheduled_count = 0
-                for row_idx in atomic_unit['all_rows']:
-                    df.loc[row_idx, 'Exam Date'] = date_str
-                    df.loc[row_idx, 'Time Slot'] = time_slot
-                    unit_scheduled_count += 1
-                
-                # Update tracking
-                for branch_sem in atomic_unit['branch_sem_combinations']:
-                    daily_scheduled_branch_sem[date_str].add(branch_sem)
-                
-                # NEW: Update capacity tracking
-                add_to_session_capacity(date_str, time_slot, total_students)
-                
-                atomic_unit['scheduled'] = True
-                atomic_unit['scheduled_date'] = date_str
-                atomic_unit['scheduled_slot'] = time_slot
-                scheduled_count += unit_scheduled_count
-                
-                day_scheduled_units.append(atomic_unit)
-                units_to_remove.append(atomic_unit)
-                
-                unit_type = "COMMON" if atomic_unit['is_common'] else "INDIVIDUAL"
-                st.write(f"  {unit_type} ATOMIC: {atomic_unit['subject_name']} → "
-                         f"{len(atomic_unit['branch_sem_combinations'])} branches, "
-                         f"{total_students} students at {time_slot}")
-                
-                # Verify no splitting for common subjects
-                if atomic_unit['is_common']:
-                    dates_used = set()
-                    for row_idx in atomic_unit['all_rows']:
-                        exam_date_value = df.loc[row_idx, 'Exam Date']
-                        if pd.notna(exam_date_value) and exam_date_value != "":
-                            dates_used.add(exam_date_value)
-                    
-                    if len(dates_used) > 1:
-                        st.error(f"CRITICAL ERROR: {atomic_unit['subject_name']} scheduled across {len(dates_used)} dates!")
-                    else:
-                        st.write(f"    Common subject integrity verified for {atomic_unit['subject_name']}")
+            # Schedule ALL instances of this subject
+            place_unit(u, slot)
+            scheduled_count += int(units.row_counts[u])
+            
+            day_scheduled_units.append(u)
+            units_to_remove.append(u)
+            
+            unit_type = "COMMON" if units.is_common[u] else "INDIVIDUAL"
+            sink.write(f"  {unit_type} ATOMIC: {units.subject_names[u]} → "
+                       f"{units.frequency[u]} branches, "
+                       f"{total_students} students at {slot_labels[slot]}")
         
-        for unit in units_to_remove:
-            unscheduled_units.remove(unit)
+        if units_to_remove:
+            unscheduled_units = [u for u in unscheduled_units if unit_day[u] < 0]
         
         # PHASE B: Fill gaps with capacity awareness
-        remaining_branch_sems = list(all_branch_sem_combinations - daily_scheduled_branch_sem[date_str])
+        remaining_branch_sems = all_branch_sems_mask & ~day_masks[-1]
+        additional_fills = []
         
         if remaining_branch_sems:
-            st.write(f"  FILLING GAPS: {len(remaining_branch_sems)} remaining slots...")
+            sink.write(f"  FILLING GAPS: {popcount(remaining_branch_sems)} remaining slots...")
             
-            additional_fills = []
-            for atomic_unit in unscheduled_units.copy():
-                if atomic_unit['frequency'] == 1:
-                    unit_branch_sem = atomic_unit['branch_sem_combinations'][0]
-                    
-                    if unit_branch_sem in remaining_branch_sems:
-                        preferred_semester = atomic_unit['unique_semesters'][0]
-                        time_slot = get_preferred_slot(preferred_semester)
-                        
-                        # Check capacity for gap filling
-                        total_students = 0
-                        for row_idx in atomic_unit['all_rows']:
-                            student_count = df.loc[row_idx, 'StudentCount']
-                            total_students += int(student_count) if pd.notna(student_count) else 0
-                        
-                        if not can_fit_in_session(date_str, time_slot, total_students):
-                            alternate_slot = "2:00 PM - 5:00 PM" if time_slot == "10:00 AM - 1:00 PM" else "10:00 AM - 1:00 PM"
-                            if can_fit_in_session(date_str, alternate_slot, total_students):
-                                time_slot = alternate_slot
-                            else:
-                                continue
-                        
-                        for row_idx in atomic_unit['all_rows']:
-                            df.loc[row_idx, 'Exam Date'] = date_str
-                            df.loc[row_idx, 'Time Slot'] = time_slot
-                        
-                        daily_scheduled_branch_sem[date_str].add(unit_branch_sem)
-                        remaining_branch_sems.remove(unit_branch_sem)
-                        add_to_session_capacity(date_str, time_slot, total_students)
-                        
-                        atomic_unit['scheduled'] = True
-                        atomic_unit['scheduled_date'] = date_str
-                        atomic_unit['scheduled_slot'] = time_slot
-                        scheduled_count += len(atomic_unit['all_rows'])
-                        
-                        additional_fills.append(atomic_unit)
-                        st.write(f"    GAP FILL: {atomic_unit['subject_name']} ({total_students} students) at {time_slot}")
+            # One vectorized AND over all units narrows the scan to single-branch units that still fit today
+            gap_candidates = (units.frequency == 1) & ~units.conflicting(day_masks[-1])
+            for u in unscheduled_units:
+                if not gap_candidates[u] or units.branch_sem_mask[u] & day_masks[-1]:
+                    continue
+                
+                total_students = int(units.students[u])
+                slot = pick_slot(u, units.unique_semesters[u][0])
+                if slot is None:
+                    continue
+                
+                place_unit(u, slot)
+                scheduled_count += int(units.row_counts[u])
+                
+                additional_fills.append(u)
+                sink.write(f"    GAP FILL: {units.subject_names[u]} ({total_students} students) at {slot_labels[slot]}")
             
-            for unit in additional_fills:
-                unscheduled_units.remove(unit)
+            if additional_fills:
+                unscheduled_units = [u for u in unscheduled_units if unit_day[u] < 0]
         
         # Display capacity usage
-        morning_capacity = get_session_capacity(date_str, "10:00 AM - 1:00 PM")
-        afternoon_capacity = get_session_capacity(date_str, "2:00 PM - 5:00 PM")
-        
-        st.write(f"  Session Capacity Usage:")
-        st.write(f"   tpl Morning: {morning_capacity}/{MAX_STUDENTS_PER_SESSION} students ({morning_capacity/MAX_STUDENTS_PER_SESSION*100:.1f}%)")
-        st.write(f"    Afternoon: {afternoon_capacity}/{MAX_STUDENTS_PER_SESSION} students ({afternoon_capacity/MAX_STUDENTS_PER_SESSION*100:.1f}%)")
+        sink.write(f"  Session Capacity Usage:")
+        for label, used, capacity in zip(slot_labels, day_loads[-1], day_caps[-1]):
+            sink.write(f"    {label}: {used}/{capacity} students ({used/capacity*100 if capacity else 0:.1f}%)")
         
         # Daily verification
-        final_coverage = len(daily_scheduled_branch_sem[date_str])
-        coverage_percent = (final_coverage / len(all_branch_sem_combinations)) * 100
+        final_coverage = popcount(day_masks[-1])
+        coverage_percent = (final_coverage / total_branch_sems) * 100
         
-        st.write(f"  Daily Summary: {len(day_scheduled_units) + len(additional_fills) if 'additional_fills' in locals() else len(day_scheduled_units)} units scheduled, "
-                 f"{final_coverage}/{len(all_branch_sem_combinations)} branches covered ({coverage_percent:.1f}%)")
+        sink.write(f"  Daily Summary: {len(day_scheduled_units) + len(additional_fills)} units scheduled, "
+                   f"{final_coverage}/{total_branch_sems} branches covered ({coverage_percent:.1f}%)")
         
         progress_percent = (scheduled_count / len(eligible_subjects)) * 100
-        st.write(f"  Overall progress: {scheduled_count}/{len(eligible_subjects)} subjects ({progress_percent:.1f}%)")
+        sink.write(f"  Overall progress: {scheduled_count}/{len(eligible_subjects)} subjects ({progress_percent:.1f}%)")
         
         if not unscheduled_units:
-            st.success(f"ALL UNITS SCHEDULED IN TARGET PERIOD! Completed in {scheduling_day} days")
+            sink.success(f"ALL UNITS SCHEDULED IN TARGET PERIOD! Completed in {scheduling_day} days")
             break
         
         current_date = exam_date + timedelta(days=1)
     
     # STEP 4: EXTENDED SCHEDULING FOR REMAINING UNITS
     if unscheduled_units:
-        st.warning(f"{len(unscheduled_units)} units still need scheduling - entering extended mode")
+        sink.warning(f"{len(unscheduled_units)} units still need scheduling - entering extended mode")
         
         extended_day = scheduling_day
         
-        while unscheduled_units and extended_day < 25:
-            exam_date = find_next_valid_day(current_date, holidays)
+        while unscheduled_units:
+            exam_date = calendar.next_valid(current_date)
             if exam_date is None:
-                st.error("No more valid days available")
+                sink.error("No more valid days available")
                 break
             
             date_str = exam_date.strftime("%d-%m-%Y")
+            day_labels.append(exam_date)
+            day_masks.append(0)
+            day_loads.append([0] * len(sessions))
+            day_caps.append(capacities_on(exam_date))
+            session_units.append([0] * len(sessions))
             extended_day += 1
             
-            st.write(f"  Extended Day {extended_day} ({date_str})")
-            
-            if date_str not in daily_scheduled_branch_sem:
-                daily_scheduled_branch_sem[date_str] = set()
+            sink.write(f"  Extended Day {extended_day} ({date_str})")
             
             units_scheduled_today = []
-            for atomic_unit in unscheduled_units.copy():
-                conflicts = False
-                for branch_sem in atomic_unit['branch_sem_combinations']:
-                    if branch_sem in daily_scheduled_branch_sem[date_str]:
-                        conflicts = True
-                        break
+            for u in unscheduled_units:
+                if units.branch_sem_mask[u] & day_masks[-1]:
+                    continue
+                
+                slot = pick_slot(u, units.unique_semesters[u][0])
+                if slot is None:
+                    continue
                 
-                if not conflicts:
-                    preferred_semester = atomic_unit['unique_semesters'][0]
-                    time_slot = get_preferred_slot(preferred_semester)
-                    
-                    # Check capacity
-                    total_students = 0
-                    for row_idx in atomic_unit['all_rows']:
-                        student_count = df.loc[row_idx, 'StudentCount']
-                        total_students += int(student_count) if pd.notna(student_count) else 0
-                    
-                    if not can_fit_in_session(date_str, time_slot, total_students):
-                        alternate_slot = "2:00 PM - 5:00 PM" if time_slot == "10:00 AM - 1:00 PM" else "10:00 AM - 1:00 PM"
-                        if can_fit_in_session(date_str, alternate_slot, total_students):
-                            time_slot = alternate_slot
-                        else:
-                            continue
-                    
-                    for row_idx in atomic_unit['all_rows']:
-                        df.loc[row_idx, 'Exam Date'] = date_str
-                        df.loc[row_idx, 'Time Slot'] = time_slot
-                    
-                    for branch_sem in atomic_unit['branch_sem_combinations']:
-                        daily_scheduled_branch_sem[date_str].add(branch_sem)
-                    
-                    add_to_session_capacity(date_str, time_slot, total_students)
-                    atomic_unit['scheduled'] = True
-                    scheduled_count += len(atomic_unit['all_rows'])
-                    units_scheduled_today.append(atomic_unit)
+                place_unit(u, slot)
+                scheduled_count += int(units.row_counts[u])
+                units_scheduled_today.append(u)
             
-            for unit in units_scheduled_today:
-                unscheduled_units.remove(unit)
+            if units_scheduled_today:
+                unscheduled_units = [u for u in unscheduled_units if unit_day[u] < 0]
             
-            st.write(f"    Extended day scheduled: {len(units_scheduled_today)} units")
+            sink.write(f"    Extended day scheduled: {len(units_scheduled_today)} units")
             current_date = exam_date + timedelta(days=1)
     
+    # Per-day capacities for the improvement stages (only needed when sessions are overridden)
+    day_capacity = [capacities_on(day) for day in calendar.dates] if overrides else None
+    
+    # STEP 4b: OPTIONAL EXACT BACKEND (warm-started from the greedy result)
+    if backend == "cp":
+        if not cp_backend_available():
+            sink.warning("CP backend requested but OR-Tools is not installed - keeping the greedy schedule")
+        else:
+            greedy_unplaced = int((unit_day < 0).sum())
+            greedy_span = int(unit_day.max()) + 1 if (unit_day >= 0).any() else 0
+            # If greedy placed everything the solver only needs to beat its span
+            horizon = greedy_span if greedy_unplaced == 0 else len(calendar)
+            preferred_slot = [sessions.preferred_slot(max(sems)) for sems in units.unique_semesters]
+            
+            sink.info(f"CP-SAT: optimizing {n_units} units over {horizon} days (budget {time_budget:.0f}s)...")
+            result = solve_exam_schedule_cp(
+                units, horizon, slot_capacity, preferred_slot,
+                time_limit=time_budget, hint=(unit_day, unit_slot),
+                day_capacity=None if day_capacity is None else day_capacity[:horizon],
+                clash_masks=unit_clash
+            )
+            if result is None:
+                sink.warning("CP-SAT found no solution within the time budget - keeping the greedy schedule")
+            elif (result['unplaced'], result['span']) < (greedy_unplaced, greedy_span):
+                sink.success(f"CP-SAT improved the schedule: span {greedy_span} → {result['span']} days, "
+                             f"unscheduled units {greedy_unplaced} → {result['unplaced']}"
+                             f"{' (optimal)' if result['optimal'] else ''}")
+                unit_day, unit_slot = result['unit_day'], result['unit_slot']
+                day_labels = calendar.dates
+            else:
+                sink.info(f"CP-SAT did not beat the greedy schedule ({greedy_span} days) - keeping it")
+    
+    # STEP 4c: OPTIONAL LOCAL-SEARCH IMPROVEMENT
+    if improve_seconds > 0:
+        preferred_slot = [sessions.preferred_slot(max(sems)) for sems in units.unique_semesters]
+        sink.info(f"Local search: improving the schedule for {improve_seconds:.0f}s...")
+        result = improve_assignment(
+            units, unit_day, unit_slot, len(calendar),
+            slot_capacity, preferred_slot,
+            time_budget=improve_seconds, day_capacity=day_capacity, clash_masks=unit_clash
+        )
+        if result['improved']:
+            sink.success(f"Local search improved the schedule: span {result['span_before']} → {result['span_after']} days "
+                         f"({result['iterations']} moves evaluated)")
+            unit_day, unit_slot = result['unit_day'], result['unit_slot']
+            day_labels = calendar.dates
+        else:
+            sink.info(f"Local search found no improvement ({result['iterations']} moves evaluated)")
+    
+    # Single vectorized write-back of every unit assignment
+    write_back_assignments(df, units, unit_day, unit_slot, day_labels, slot_labels)
+    
     # STEP 5: FINAL VERIFICATION AND STATISTICS
-    st.write("Step 5: Final verification and statistics...")
+    sink.write("Step 5: Final verification and statistics...")
     
     successfully_scheduled = df[
-        (df['Exam Date'] != "") & 
-        (df['Exam Date'] != "Out of Range") & 
+        df['Exam Date'].notna() & 
         (df['Category'] != 'INTD') & 
-        (~(df['OE'].notna() & (df['OE'].str.strip() != "")))
+        (~is_open_elective(df))
     ]
     
-    split_subjects = 0
-    properly_grouped_common = 0
+    # Common units must land on exactly one date
+    common_scheduled = units.is_common & (unit_day >= 0)
+    common_rows = np.repeat(common_scheduled, units.row_counts)
+    common_frame = df.iloc[units.row_positions[common_rows]]
+    dates_per_module = common_frame.groupby('ModuleCode')['Exam Date'].nunique()
+    split_modules = dates_per_module[dates_per_module > 1]
+    split_subjects = len(split_modules)
+    properly_grouped_common = int(common_scheduled.sum()) - split_subjects
     
-    for atomic_unit in atomic_subject_units.values():
-        if atomic_unit['is_common'] and atomic_unit['scheduled']:
-            dates_used = set()
-            for row_idx in atomic_unit['all_rows']:
-                exam_date_value = df.loc[row_idx, 'Exam Date']
-                if pd.notna(exam_date_value) and exam_date_value != "":
-                    dates_used.add(exam_date_value)
-            
-            if len(dates_used) > 1:
-                split_subjects += 1
-                st.error(f"SPLIT DETECTED: {atomic_unit['subject_name']} across {len(dates_used)} dates")
-            else:
-                properly_grouped_common += 1
+    for module_code, date_count in split_modules.items():
+        sink.error(f"SPLIT DETECTED: {module_code} across {date_count} dates")
     
-    total_days_used = len(daily_scheduled_branch_sem)
+    total_days_used = len(np.unique(unit_day[unit_day >= 0]))
+    span_days = int(unit_day.max()) + 1 if (unit_day >= 0).any() else 0
     success_rate = (len(successfully_scheduled) / len(eligible_subjects)) * 100
     
-    st.success(f"ATOMIC SCHEDULING WITH CAPACITY CONSTRAINTS COMPLETE:")
-    st.write(f"   Total subjects scheduled: {len(successfully_scheduled)}/{len(eligible_subjects)} ({success_rate:.1f}%)")
-    st.write(f"   Days used: {total_days_used}")
-    st.write(f"   Properly grouped common subjects: {properly_grouped_common}")
-    st.write(f"   Split common subjects: {split_subjects}")
-    st.write(f"   Maximum capacity per session: {MAX_STUDENTS_PER_SESSION} students")
+    # Quality metric: exam days used relative to the proven lower bound (1.00 = optimal)
+    quality_ratio = span_days / bounds['lower_bound'] if bounds['lower_bound'] else 0.0
+    df.attrs['schedule_metrics'] = {
+        'lower_bound_days': bounds['lower_bound'],
+        'colouring_days': bounds['colouring_days'],
+        'span_days': span_days,
+        'days_used': total_days_used,
+        'quality_ratio': quality_ratio,
+        'unscheduled_units': int((unit_day < 0).sum()),
+        'sessions_per_day': len(sessions),
+        'students_per_slot': dict(zip(slot_labels, np.bincount(
+            unit_slot[unit_day >= 0], weights=units.students[unit_day >= 0], minlength=len(sessions)
+        ).astype(int).tolist())),
+    }
+    
+    sink.success(f"ATOMIC SCHEDULING WITH CAPACITY CONSTRAINTS COMPLETE:")
+    sink.write(f"   Total subjects scheduled: {len(successfully_scheduled)}/{len(eligible_subjects)} ({success_rate:.1f}%)")
+    sink.write(f"   Days used: {total_days_used}")
+    sink.write(f"   Exam-day span: {span_days} (lower bound {bounds['lower_bound']}, ratio {quality_ratio:.2f})")
+    sink.write(f"   Properly grouped common subjects: {properly_grouped_common}")
+    sink.write(f"   Split common subjects: {split_subjects}")
+    sink.write(f"   Sessions per day: {len(sessions)} "
+               f"({', '.join(f'{label}: {capacity}' for label, capacity in zip(slot_labels, slot_capacity))} students max)")
     
     if split_subjects == 0:
-        st.success("PERFECT: NO COMMON SUBJECTS SPLIT!")
-        st.balloons()
+        sink.success("PERFECT: NO COMMON SUBJECTS SPLIT!", celebrate=True)
     else:
-        st.error(f"CRITICAL: {split_subjects} common subjects were split across dates!")
+        sink.error(f"CRITICAL: {split_subjects} common subjects were split across dates!")
     
     return df
 
 
-def validate_capacity_constraints(df_dict, max_capacity=2000):
+def _eligible_mask(df):
+    """Rows the comprehensive scheduler places: everything except INTD and open electives"""
+    return (df['Category'] != 'INTD') & ~is_open_elective(df)
+
+
+def _elective_mask(df):
+    """Rows schedule_electives_globally places: INTD rows of an ELECTIVE_DAYS basket"""
+    baskets = [basket for day_baskets, _ in ELECTIVE_DAYS for basket in day_baskets]
+    return (df['Category'] == 'INTD') & df['OE'].isin(baskets)
+
+
+def estimate_exam_days(df, MAX_STUDENTS_PER_SESSION=2000, sessions=None):
+    """
+    Conflict-graph estimate of how many exam days the eligible subjects in df need.
+    Returns the dict from conflict_graph.estimate_day_bounds (lower_bound, colouring_days, ...).
+    """
+    if sessions is None:
+        sessions = SessionModel.from_preset(default_capacity=MAX_STUDENTS_PER_SESSION)
+    eligible_positions = np.flatnonzero(_eligible_mask(df).to_numpy())
+    units = compile_atomic_units(df, eligible_positions)
+    return estimate_day_bounds(units, MAX_STUDENTS_PER_SESSION, slot_capacity=sessions.capacities)
+
+
+def validate_capacity_constraints(df_dict, max_capacity=2000, sessions=None):
     """
-    Validate that no session exceeds the maximum student capacity
+    Validate that no session exceeds the maximum student capacity.
+    With a SessionModel each slot is checked against its own capacity; labels it
+    does not know fall back to max_capacity.
     Returns: (is_valid, violations_list)
     """
     violations = []
@@ -436,191 +435,167 @@ def validate_capacity_constraints(df_dict, max_capacity=2000):
     all_data = pd.concat(df_dict.values(), ignore_index=True)
     
     # Group by date and time slot
-    for (date_str, time_slot), group in all_data.groupby(['Exam Date', 'Time Slot']):
-        if pd.isna(date_str) or date_str == "" or date_str == "Out of Range":
-            continue
-        
+    # Unscheduled rows (NaT) are dropped by the groupby
+    for (exam_date, time_slot), group in all_data.groupby(['Exam Date', 'Time Slot'], observed=True):
         # Calculate total students
         total_students = group['StudentCount'].fillna(0).sum()
+        capacity = max_capacity if sessions is None else sessions.capacity_of_label(time_slot, max_capacity)
         
-        if total_students > max_capacity:
+        if total_students > capacity:
             violations.append({
-                'date': date_str,
+                'date': exam_date,
                 'time_slot': time_slot,
                 'student_count': int(total_students),
-                'excess': int(total_students - max_capacity),
+                'capacity': int(capacity),
+                'excess': int(total_students - capacity),
                 'subjects_count': len(group)
             })
     
     return len(violations) == 0, violations
 
 
-def schedule_electives_globally(df_ele, max_non_elec_date, holidays_set):
+def validate_student_clashes(df_dict, enrollment):
+    """
+    Validate that no student sits two exams in the same session (needs an
+    enrollment.EnrollmentMatrix; the check is one sparse product)
+    Returns: (is_valid, violations_list)
+    """
+    violations = []
+    
+    all_data = pd.concat(df_dict.values(), ignore_index=True)
+    clashes = enrollment.session_clashes(all_data)
+    
+    for (exam_date, time_slot), group in clashes.groupby(['Exam Date', 'Time Slot']):
+        violations.append({
+            'date': exam_date,
+            'time_slot': time_slot,
+            'student_count': len(group),
+            'students': group['StudentID'].head(10).tolist()
+        })
+    
+    return len(violations) == 0, violations
+
+
+def schedule_electives_globally(df_ele, max_non_elec_date, holidays_set, sink=None):
     """
     Schedule electives globally after main scheduling.
     Assumes OE1/OE5 on one day, OE2 on next.
     """
+    sink = get_sink(sink)
     if df_ele.empty:
         return df_ele
     
-    # Find valid days
-    elective_day1 = find_next_valid_day_for_electives(
-        datetime.combine(max_non_elec_date, datetime.min.time()) + timedelta(days=1), 
-        holidays_set
-    )
-    elective_day2 = find_next_valid_day_for_electives(elective_day1 + timedelta(days=1), holidays_set)
+    # Find valid days (one calendar serves both lookups)
+    first_day = datetime.combine(max_non_elec_date, datetime.min.time()) + timedelta(days=1)
+    calendar = get_calendar(first_day, first_day, holidays_set)
+    elective_day1 = find_next_valid_day_for_electives(first_day, holidays_set, calendar=calendar)
+    elective_day2 = find_next_valid_day_for_electives(elective_day1 + timedelta(days=1), holidays_set,
+                                                      calendar=calendar)
     
+    day1 = pd.Timestamp(elective_day1) if elective_day1 else pd.NaT
+    day2 = pd.Timestamp(elective_day2) if elective_day2 else pd.NaT
     day1_str = elective_day1.strftime("%d-%m-%Y") if elective_day1 else ""
     day2_str = elective_day2.strftime("%d-%m-%Y") if elective_day2 else ""
     
     # Schedule OE1/OE5 on day1, OE2 on day2
-    oe1_mask = df_ele['OE'].isin(['OE1', 'OE5'])
-    df_ele.loc[oe1_mask, 'Exam Date'] = day1_str
-    df_ele.loc[oe1_mask, 'Time Slot'] = "10:00 AM - 1:00 PM"
-    
-    oe2_mask = df_ele['OE'] == 'OE2'
-    df_ele.loc[oe2_mask, 'Exam Date'] = day2_str
-    df_ele.loc[oe2_mask, 'Time Slot'] = "2:00 PM - 5:00 PM"
+    for (baskets, time_slot), day in zip(ELECTIVE_DAYS, [day1, day2]):
+        mask = df_ele['OE'].isin(baskets)
+        df_ele.loc[mask, 'Exam Date'] = day
+        df_ele.loc[mask, 'Time Slot'] = time_slot
     
-    st.success(f"Electives scheduled: OE1/OE5 on {day1_str}, OE2 on {day2_str}")
+    sink.success(f"Electives scheduled: OE1/OE5 on {day1_str}, OE2 on {day2_str}")
     return df_ele
 
 
-def optimize_schedule_by_filling_gaps(sem_dict, holidays, base_date, end_date):
+def optimize_schedule_by_filling_gaps(sem_dict, holidays, base_date, end_date, sink=None):
     """
     Optimize schedule by filling gaps with uncommon subjects.
     """
+    sink = get_sink(sink)
     if not sem_dict:
         return sem_dict, 0, []
     
-    st.info("Optimizing schedule by filling gaps...")
+    sink.info("Optimizing schedule by filling gaps...")
     
     all_data = pd.concat(sem_dict.values(), ignore_index=True)
-    all_data['Exam Date'] = all_data['Exam Date'].apply(normalize_date_to_ddmmyyyy)
+    scheduled_dates = all_data['Exam Date'].dropna()
     
-    # Get all scheduled dates
-    scheduled_dates = sorted(all_data[all_data['Exam Date'] != '']['Exam Date'].unique(), 
-                             key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
-    
-    if not scheduled_dates:
+    if scheduled_dates.empty:
         return sem_dict, 0, []
     
-    all_scheduled_dates = scheduled_dates
-    original_span = (datetime.strptime(all_scheduled_dates[-1], "%d-%m-%Y") - 
-                     datetime.strptime(all_scheduled_dates[0], "%d-%m-%Y")).days + 1
+    original_span = (scheduled_dates.max() - scheduled_dates.min()).days + 1
     
-    # Identify gaps and move uncommon subjects
+    # Identify gaps and move uncommon subjects. The gap candidate is the first valid day
+    # of the period; a subject moves there when that day is earlier than its current date.
+    first_valid_day = get_calendar(base_date, end_date, holidays).next_valid(base_date)
     moves_made = 0
     optimization_log = []
     
     for sem in sem_dict:
         df_sem = sem_dict[sem]
-        uncommon = df_sem[(df_sem['CommonAcrossSems'] == False) & (df_sem['IsCommon'] != 'YES')]
+        uncommon = df_sem[(df_sem['CommonAcrossSems'] == False) & (df_sem['IsCommon'] != 'YES') & df_sem['Exam Date'].notna()]
         
         for idx, row in uncommon.iterrows():
-            current_date = row['Exam Date']
-            if current_date == '' or current_date == 'Out of Range':
-                continue
-            
-            current_dt = datetime.strptime(current_date, "%d-%m-%Y")
-            gap_date = find_next_valid_day_in_range(base_date, current_dt - timedelta(days=1), holidays)
-            if gap_date:
-                gap_str = gap_date.strftime("%d-%m-%Y")
-                mask = (sem_dict[sem]['Exam Date'] == gap_str) & (sem_dict[sem]['Branch'] == row['Branch'])
-                if len(sem_dict[sem][mask]) == 0:
-                    sem_dict[sem].loc[idx, 'Exam Date'] = gap_str
+            if first_valid_day is not None and first_valid_day < row['Exam Date']:
+                gap_day = pd.Timestamp(first_valid_day)
+                mask = (sem_dict[sem]['Exam Date'] == gap_day) & (sem_dict[sem]['Branch'] == row['Branch'])
+                if not mask.any():
+                    sem_dict[sem].loc[idx, 'Exam Date'] = gap_day
                     moves_made += 1
-                    optimization_log.append(f"Moved {row['Subject']} to {gap_str}")
+                    optimization_log.append(f"Moved {row['Subject']} to {gap_day:%d-%m-%Y}")
     
     if moves_made > 0:
-        updated_all_data = pd.concat(sem_dict.values(), ignore_index=True)
-        updated_scheduled = updated_all_data[
-            (updated_all_data['Exam Date'] != "") & 
-            (updated_all_data['Exam Date'] != "Out of Range")
-        ].copy()
+        updated_dates = pd.concat([df_sem['Exam Date'] for df_sem in sem_dict.values()]).dropna()
         
-        if not updated_scheduled.empty:
-            updated_scheduled['Exam Date'] = updated_scheduled['Exam Date'].apply(normalize_date_to_ddmmyyyy)
-            updated_dates = sorted(updated_scheduled['Exam Date'].unique(), 
-                                 key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
+        if not updated_dates.empty:
+            new_span = (updated_dates.max() - updated_dates.min()).days + 1
+            span_reduction = original_span - new_span
             
-            if updated_dates:
-                new_first_date = updated_dates[0]
-                new_last_date = updated_dates[-1]
-                
-                new_span = (datetime.strptime(new_last_date, "%d-%m-%Y") - 
-                           datetime.strptime(new_first_date, "%d-%m-%Y")).days + 1
-                
-                span_reduction = original_span - new_span
-                
-                if span_reduction > 0:
-                    optimization_log.append(f"Schedule span reduced by {span_reduction} days!")
-                    st.success(f"Schedule span reduced from {original_span} to {new_span} days (saved {span_reduction} days)")
-    
-    for sem in sem_dict:
-        sem_dict[sem]['Exam Date'] = sem_dict[sem]['Exam Date'].apply(normalize_date_to_ddmmyyyy)
+            if span_reduction > 0:
+                optimization_log.append(f"Schedule span reduced by {span_reduction} days!")
+                sink.success(f"Schedule span reduced from {original_span} to {new_span} days (saved {span_reduction} days)")
     
     if moves_made > 0:
-        st.success(f"Gap Optimization: Made {moves_made} moves to fill gaps!")
-        with st.expander("Gap Optimization Details"):
-            for log in optimization_log:
-                st.write(f"• {log}")
+        sink.success(f"Gap Optimization: Made {moves_made} moves to fill gaps!",
+                     details=optimization_log, details_title="Gap Optimization Details")
     else:
-        st.info("No beneficial moves found for gap optimization")
+        sink.info("No beneficial moves found for gap optimization")
     
     return sem_dict, moves_made, optimization_log
 
 
-def optimize_oe_subjects_after_scheduling(sem_dict, holidays, optimizer=None):
+def optimize_oe_subjects_after_scheduling(sem_dict, holidays, optimizer=None, sink=None):
     """
     After main scheduling AND gap optimization, check if OE subjects can be moved to earlier COMPLETELY EMPTY days.
     CRITICAL: OE2 must be scheduled on the day immediately after OE1/OE5.
     """
+    sink = get_sink(sink)
     if not sem_dict:
         return sem_dict, 0, []
     
-    st.info("Optimizing Open Elective (OE) placement (after gap optimization)...")
+    sink.info("Optimizing Open Elective (OE) placement (after gap optimization)...")
     
     all_data = pd.concat(sem_dict.values(), ignore_index=True)
-    all_data['Exam Date'] = all_data['Exam Date'].apply(normalize_date_to_ddmmyyyy)
     
-    oe_data = all_data[all_data['OE'].notna() & (all_data['OE'].str.strip() != "")]
-    non_oe_data = all_data[~(all_data['OE'].notna() & (all_data['OE'].str.strip() != ""))]
+    oe_rows = is_open_elective(all_data)
+    oe_data = all_data[oe_rows]
     
     if oe_data.empty:
-        st.info("No OE subjects to optimize")
+        sink.info("No OE subjects to optimize")
         return sem_dict, 0, []
     
-    exam_count_per_date = {}
-    for _, row in all_data.iterrows():
-        if pd.notna(row['Exam Date']) and row['Exam Date'].strip() != "":
-            date_str = row['Exam Date']
-            if date_str not in exam_count_per_date:
-                exam_count_per_date[date_str] = 0
-            exam_count_per_date[date_str] += 1
-    
-    all_dates = sorted(exam_count_per_date.keys(), key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
-    if not all_dates:
+    exam_count_per_date = all_data['Exam Date'].value_counts()
+    if exam_count_per_date.empty:
         return sem_dict, 0, []
     
-    start_date = datetime.strptime(all_dates[0], "%d-%m-%Y")
-    end_date = datetime.strptime(all_dates[-1], "%d-%m-%Y")
-    
-    completely_empty_days = []
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() != 6 and current_date.date() not in holidays:
-            date_str = current_date.strftime("%d-%m-%Y")
-            if date_str not in exam_count_per_date:
-                completely_empty_days.append(date_str)
-        current_date += timedelta(days=1)
-    
-    completely_empty_days.sort(key=lambda x: datetime.strptime(x, "%d-%m-%Y"))
+    # Valid (non-Sunday, non-holiday) days between the first and last exam that have no exam at all
+    exam_calendar = ExamCalendar(exam_count_per_date.index.min(), exam_count_per_date.index.max(), holidays)
+    completely_empty_days = exam_calendar.dates[~exam_calendar.dates.isin(exam_count_per_date.index)]
     
-    st.write(f"Found {len(completely_empty_days)} completely empty days for potential OE optimization")
+    sink.write(f"Found {len(completely_empty_days)} completely empty days for potential OE optimization")
     
-    if not completely_empty_days:
-        st.info("No completely empty days available for OE optimization")
+    if len(completely_empty_days) == 0:
+        sink.info("No completely empty days available for OE optimization")
         return sem_dict, 0, []
     
     oe_data_copy = oe_data.copy()
@@ -632,26 +607,22 @@ def optimize_oe_subjects_after_scheduling(sem_dict, holidays, optimizer=None):
     
     if not oe1_oe5_data.empty:
         current_oe1_oe5_date = oe1_oe5_data['Exam Date'].iloc[0]
-        current_oe1_oe5_date_obj = datetime.strptime(current_oe1_oe5_date, "%d-%m-%Y")
         
         best_oe1_oe5_date = None
         best_oe2_date = None
         
         for empty_day in completely_empty_days:
-            empty_day_obj = datetime.strptime(empty_day, "%d-%m-%Y")
-            if empty_day_obj >= current_oe1_oe5_date_obj:
+            if pd.isna(current_oe1_oe5_date) or empty_day >= current_oe1_oe5_date:
                 break
             
-            next_day = find_next_valid_day_for_electives(empty_day_obj + timedelta(days=1), holidays)
-            if next_day:
-                next_day_str = next_day.strftime("%d-%m-%Y")
-                if next_day_str in completely_empty_days:
-                    best_oe1_oe5_date = empty_day
-                    best_oe2_date = next_day_str
-                    break
+            next_day = exam_calendar.next_valid(empty_day + timedelta(days=1), bounded=False)
+            if next_day and pd.Timestamp(next_day) in completely_empty_days:
+                best_oe1_oe5_date = empty_day
+                best_oe2_date = pd.Timestamp(next_day)
+                break
         
-        if best_oe1_oe5_date and best_oe2_date:
-            days_saved = (current_oe1_oe5_date_obj - datetime.strptime(best_oe1_oe5_date, "%d-%m-%Y")).days
+        if best_oe1_oe5_date is not None and best_oe2_date is not None:
+            days_saved = (current_oe1_oe5_date - best_oe1_oe5_date).days
             
             for idx in oe1_oe5_data.index:
                 sem = all_data.at[idx, 'Semester']
@@ -671,45 +642,27 @@ def optimize_oe_subjects_after_scheduling(sem_dict, holidays, optimizer=None):
                     sem_dict[sem].loc[mask, 'Time Slot'] = "2:00 PM - 5:00 PM"
             
             moves_made += 1
-            optimization_log.append(f"Moved OE1/OE5 from {current_oe1_oe5_date} to {best_oe1_oe5_date} (saved {days_saved} days)")
+            optimization_log.append(f"Moved OE1/OE5 from {current_oe1_oe5_date:%d-%m-%Y} to {best_oe1_oe5_date:%d-%m-%Y} (saved {days_saved} days)")
             if not oe2_data.empty:
-                optimization_log.append(f"Moved OE2 to {best_oe2_date}")
+                optimization_log.append(f"Moved OE2 to {best_oe2_date:%d-%m-%Y}")
         else:
-            st.info("No suitable consecutive completely empty days found")
-    
-    for sem in sem_dict:
-        sem_dict[sem]['Exam Date'] = sem_dict[sem]['Exam Date'].apply(normalize_date_to_ddmmyyyy)
+            sink.info("No suitable consecutive completely empty days found")
     
     if moves_made > 0:
-        st.success(f"OE Optimization: Moved {moves_made} OE groups to completely empty days!")
-        with st.expander("OE Optimization Details"):
-            for log in optimization_log:
-                st.write(f"• {log}")
+        sink.success(f"OE Optimization: Moved {moves_made} OE groups to completely empty days!",
+                     details=optimization_log, details_title="OE Optimization Details")
     else:
-        st.info("OE subjects already optimally placed")
+        sink.info("OE subjects already optimally placed")
     
     return sem_dict, moves_made, optimization_log
 
 
-# ──────────────────────────────────────────────────────────────────────
-# ADDED: Missing function used by elective scheduling
-# ──────────────────────────────────────────────────────────────────────
-def find_next_valid_day_for_electives(start_date, holidays_set):
-    """
-    Find the next valid day for electives (skip Sundays and holidays).
-    Returns a datetime object.
-    """
-    current_date = start_date
-    while True:
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            return current_date
-        current_date += timedelta(days=1)
-
-
 # Export all public functions
 __all__ = [
     "schedule_all_subjects_comprehensively",
     "validate_capacity_constraints",
+    "validate_student_clashes",
+    "estimate_exam_days",
     "optimize_schedule_by_filling_gaps",
     "optimize_oe_subjects_after_scheduling",
     "schedule_electives_globally",
@@ -0,0 +1,91 @@
+"""
+Daily session model.
+
+A day has N sessions (slots), each with a label such as "10:00 AM - 1:00 PM"
+and its own seat capacity. Slot ids are positions in the model, so the
+scheduler, the optimizers and validation all index per-slot arrays instead of
+matching on "morning"/"afternoon" strings.
+"""
+from config import SESSION_PRESETS, DEFAULT_SESSION_PRESET
+
+# Sessions semesters are preferentially assigned to (morning / afternoon)
+REGULAR_SESSIONS = 2
+
+
+class Session:
+    """One exam session of the day"""
+
+    def __init__(self, label, capacity):
+        self.label = label
+        self.capacity = capacity
+
+    @property
+    def start_time(self):
+        return self.label.split(' - ')[0].strip()
+
+    @property
+    def end_time(self):
+        return self.label.split(' - ')[-1].strip()
+
+    def __repr__(self):
+        return f"Session({self.label!r}, capacity={self.capacity})"
+
+
+class SessionModel:
+    """Ordered sessions of an exam day (slot id = position)"""
+
+    def __init__(self, sessions):
+        if not sessions:
+            raise ValueError("A session model needs at least one session")
+        self.sessions = list(sessions)
+
+    @classmethod
+    def from_preset(cls, name=DEFAULT_SESSION_PRESET, default_capacity=2000):
+        """Build a model from config.SESSION_PRESETS; unset capacities take default_capacity"""
+        return cls([Session(label, default_capacity if capacity is None else capacity)
+                    for label, capacity in SESSION_PRESETS[name]])
+
+    def __len__(self):
+        return len(self.sessions)
+
+    @property
+    def labels(self):
+        return [session.label for session in self.sessions]
+
+    @property
+    def capacities(self):
+        return [session.capacity for session in self.sessions]
+
+    def scaled(self, fraction):
+        """Model with every capacity scaled down by `fraction` (rounded down, at least 1 seat)"""
+        return SessionModel([Session(session.label, max(1, int(session.capacity * fraction)))
+                             for session in self.sessions])
+
+    def capped(self, limit):
+        """Model with every capacity limited to `limit` seats"""
+        return SessionModel([Session(session.label, min(session.capacity, int(limit)))
+                             for session in self.sessions])
+
+    def index_of(self, label):
+        """Slot id of a session label, or -1 when the label is not part of the model"""
+        for slot, session in enumerate(self.sessions):
+            if session.label == label:
+                return slot
+        return -1
+
+    def capacity_of_label(self, label, default=None):
+        slot = self.index_of(label)
+        return self.sessions[slot].capacity if slot >= 0 else default
+
+    def preferred_slot(self, semester):
+        """
+        Preferred slot id for a semester: semesters pair up (1-2, 3-4, ...) and the
+        pairs alternate between the first two (regular) sessions, as in
+        utils.get_preferred_slot. Further sessions take the overflow.
+        """
+        position = (int(semester) + 1) // 2
+        return (position - 1) % min(len(self.sessions), REGULAR_SESSIONS)
+
+    def slot_order(self, preferred):
+        """Slot ids to try: the preferred one first, then the others by distance from it"""
+        return sorted(range(len(self.sessions)), key=lambda slot: (abs(slot - preferred), slot))
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pandas as pd
+
+from enrollment import EnrollmentMatrix
+from incremental import reschedule_incrementally
+
+MORNING, AFTERNOON = "10:00 AM - 1:00 PM", "2:00 PM - 5:00 PM"
+
+
+def _published_timetable():
+    """Two regular subjects, then the elective days: OE1/OE5 on Mon 07-04, OE2 on Tue 08-04"""
+    rows = [
+        # ModuleCode, Branch, Semester, Subject, Category, OE, Exam Date, Time Slot
+        ("M1", "CSE", 1, "Maths", "COMP", "", "2025-04-01", MORNING),
+        ("M2", "CSE", 1, "Physics", "COMP", "", "2025-04-02", MORNING),
+        ("E1", "CSE", 1, "Design Thinking", "INTD", "OE1", "2025-04-07", MORNING),
+        ("E5", "IT", 1, "Psychology", "INTD", "OE5", "2025-04-07", MORNING),
+        ("E2", "CSE", 1, "Finance", "INTD", "OE2", "2025-04-08", AFTERNOON),
+        # Open elective outside the INTD category: never placed by the main scheduler
+        ("X3", "IT", 1, "Photography", "COMP", "OE3", None, ""),
+    ]
+    df = pd.DataFrame(rows, columns=["ModuleCode", "Branch", "Semester", "Subject", "Category", "OE",
+                                     "Exam Date", "Time Slot"])
+    df["Exam Date"] = pd.to_datetime(df["Exam Date"])
+    df["StudentCount"] = 60
+    df["CommonAcrossSems"] = False
+    df["IsCommon"] = "NO"
+    return df
+
+
+def _repair(added_holiday):
+    holidays = {added_holiday}
+    return reschedule_incrementally(
+        _published_timetable(), holidays, datetime(2025, 4, 1), datetime(2025, 4, 15),
+        MAX_STUDENTS_PER_SESSION=100, added_holidays=holidays,
+    )
+
+
+def _date_of(df, module_code):
+    return df.loc[df["ModuleCode"] == module_code, "Exam Date"].iloc[0]
+
+
+def test_holiday_on_the_oe_day_moves_the_elective_baskets_together():
+    repaired, report = _repair(datetime(2025, 4, 7).date())
+
+    # OE1/OE5 share the next free valid day, OE2 follows on the valid day after it
+    assert _date_of(repaired, "E1") == pd.Timestamp("2025-04-08")
+    assert _date_of(repaired, "E5") == pd.Timestamp("2025-04-08")
+    assert _date_of(repaired, "E2") == pd.Timestamp("2025-04-09")
+    assert set(repaired.loc[repaired["OE"].isin(["OE1", "OE5"]), "Time Slot"].astype(str)) == {MORNING}
+    assert set(repaired.loc[repaired["OE"] == "OE2", "Time Slot"].astype(str)) == {AFTERNOON}
+
+    # Regular exams keep their published sessions
+    assert _date_of(repaired, "M1") == pd.Timestamp("2025-04-01")
+    assert _date_of(repaired, "M2") == pd.Timestamp("2025-04-02")
+
+    # Baskets are reported by name; the non-INTD open elective is neither touched nor "unplaced"
+    assert report["unplaced"] == []
+    assert {move[0] for move in report["moved"]} == {"OE1", "OE5", "OE2"}
+    assert pd.isna(_date_of(repaired, "X3"))
+
+
+def test_holiday_on_the_oe2_day_keeps_oe1_and_moves_oe2_to_the_next_valid_day():
+    repaired, report = _repair(datetime(2025, 4, 8).date())
+
+    assert _date_of(repaired, "E1") == pd.Timestamp("2025-04-07")
+    assert _date_of(repaired, "E5") == pd.Timestamp("2025-04-07")
+    assert _date_of(repaired, "E2") == pd.Timestamp("2025-04-09")
+    assert set(report["kept"]) == {"OE1", "OE5"}
+    assert [move[0] for move in report["moved"]] == ["OE2"]
+
+
+def test_moved_unit_avoids_a_session_holding_a_subject_it_shares_students_with():
+    previous = _published_timetable()
+    third = previous.iloc[[1]].assign(ModuleCode="M3", Branch="ME", Subject="Mechanics",
+                                      **{"Exam Date": pd.Timestamp("2025-04-03")})
+    previous = pd.concat([previous, third], ignore_index=True)
+    enrollment = EnrollmentMatrix.from_frame(pd.DataFrame({"StudentID": ["S1", "S1"], "ModuleCode": ["M2", "M3"]}))
+    holidays = {datetime(2025, 4, 2).date()}
+
+    repaired, _ = reschedule_incrementally(
+        previous, holidays, datetime(2025, 4, 1), datetime(2025, 4, 15),
+        MAX_STUDENTS_PER_SESSION=1000, added_holidays=holidays, enrollment=enrollment,
+    )
+
+    # Physics lands on the Mechanics day, but not in its (morning) session
+    physics = repaired[repaired["ModuleCode"] == "M2"].iloc[0]
+    assert physics["Exam Date"] == pd.Timestamp("2025-04-03")
+    assert str(physics["Time Slot"]) == AFTERNOON
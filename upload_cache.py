@@ -0,0 +1,126 @@
+"""
+Content-addressed on-disk cache of parsed uploads.
+
+read_timetable() parses the workbook and normalizes every column, which takes
+seconds for a large catalogue. The normalized (df_non_elective, df_elective,
+full_df) triple is pickled under SHA-256(PARSER_VERSION + upload bytes), so the
+same file is parsed once no matter how many times a timetable is generated.
+Bumping data_processing.PARSER_VERSION invalidates every entry.
+
+The cache directory is TIMETABLE_CACHE_DIR (default: <tmp>/timetable_cache) and
+is bounded to TIMETABLE_CACHE_MAX_BYTES (default 512 MB); the least recently
+used entries are evicted first. Cache failures never fail a parse.
+
+Entries are unpickled, so the directory is created owner-only (0700) and is
+only used while it is owned by the current user and closed to everyone else;
+otherwise the cache is bypassed.
+"""
+import hashlib
+import io
+import os
+import pickle
+import stat
+import tempfile
+
+from data_processing import read_timetable, PARSER_VERSION
+from progress import get_sink
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_dir():
+    return os.environ.get("TIMETABLE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "timetable_cache"))
+
+
+def cache_max_bytes():
+    return int(os.environ.get("TIMETABLE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+def upload_key(data):
+    """Cache key of an upload: hex SHA-256 of the parser version plus the raw bytes"""
+    digest = hashlib.sha256(PARSER_VERSION.encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _read_bytes(uploaded_file):
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    if hasattr(uploaded_file, "read"):
+        return uploaded_file.read()
+    with open(uploaded_file, "rb") as f:
+        return f.read()
+
+
+def _private_dir(directory):
+    """Create `directory` owner-only if missing; raise if another user could write into it"""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{directory} is not a directory")
+    if os.name == "posix":
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{directory} is owned by another user")
+        if info.st_mode & 0o077:
+            raise PermissionError(f"{directory} is open to other users (mode {stat.S_IMODE(info.st_mode):o})")
+    return directory
+
+
+def _evict(directory, max_bytes):
+    """Delete least recently used entries until the directory fits in max_bytes"""
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".pkl"):
+            path = os.path.join(directory, name)
+            info = os.stat(path)
+            entries.append((info.st_mtime, info.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def read_timetable_cached(uploaded_file, sink=None, directory=None, max_bytes=None):
+    """
+    read_timetable() with a content-addressed disk cache in front of it.
+    Same return value: (df_non_elective, df_elective, full_df) or (None, None, None).
+    """
+    sink = get_sink(sink)
+    directory = directory or cache_dir()
+    max_bytes = cache_max_bytes() if max_bytes is None else max_bytes
+
+    data = _read_bytes(uploaded_file)
+    try:
+        _private_dir(directory)
+    except OSError as e:
+        sink.warning(f"⚠️ Not using the upload cache: {e}")
+        return read_timetable(io.BytesIO(data), sink=sink)
+    path = os.path.join(directory, upload_key(data) + ".pkl")
+
+    try:
+        with open(path, "rb") as f:
+            result = pickle.load(f)
+        os.utime(path)  # mark as recently used
+        sink.info("⚡ Loaded the parsed timetable from cache (same file as a previous run)")
+        return result
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        sink.warning(f"⚠️ Ignoring unreadable cache entry: {e}")
+
+    result = read_timetable(io.BytesIO(data), sink=sink)
+    if result[0] is None:
+        return result
+
+    try:
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        _evict(directory, max_bytes)
+    except Exception as e:
+        sink.warning(f"⚠️ Could not cache the parsed timetable: {e}")
+    return result
@@ -1,11 +1,43 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from exam_calendar import get_calendar
 from fpdf import FPDF
 from collections import defaultdict
 
 # Cache for text wrapping results
 wrap_text_cache = {}
 
+def nonblank_mask(series):
+    """
+    True where a string column holds a non-blank value.
+    Categorical columns test each category once and index the result by code.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        nonblank = np.append(np.asarray(series.cat.categories.astype(str).str.strip() != ""), False)
+        return pd.Series(nonblank[series.cat.codes.to_numpy()], index=series.index)
+    return series.notna() & (series.str.strip() != "")
+
+def is_open_elective(df):
+    """Rows that belong to an open-elective (OE) basket"""
+    return nonblank_mask(df['OE'])
+
+def compact_categories(df):
+    """Drop categories no row uses (so pivots/groupbys over a slice only see its own values)"""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+def to_exam_dates(values):
+    """
+    Exam dates as datetime64 (NaT = unscheduled). Already-datetime input is returned
+    unchanged; legacy DD-MM-YYYY strings ("" / "Out of Range" for unscheduled) are parsed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format="%d-%m-%Y", errors='coerce')
+
 def get_valid_dates_in_range(start_date, end_date, holidays_set):
     """
     Get all valid examination dates within the specified range.
@@ -19,18 +51,9 @@ def get_valid_dates_in_range(start_date, end_date, holidays_set):
     Returns:
         list: List of valid date strings in DD-MM-YYYY format
     """
-    valid_dates = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Skip Sundays (weekday 6) and holidays
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            valid_dates.append(current_date.strftime("%d-%m-%Y"))
-        current_date += timedelta(days=1)
-    
-    return valid_dates
+    return get_calendar(start_date, end_date, holidays_set).labels()
 
-def find_next_valid_day_in_range(start_date, end_date, holidays_set):
+def find_next_valid_day_in_range(start_date, end_date, holidays_set, calendar=None):
     """
     Find the next valid examination day within the specified range.
     
@@ -38,16 +61,18 @@ def find_next_valid_day_in_range(start_date, end_date, holidays_set):
         start_date (datetime): Start date to search from
         end_date (datetime): End date limit
         holidays_set (set): Set of holiday dates
+        calendar (ExamCalendar): calendar of the whole examination period to reuse across
+            calls (default: get_calendar(start_date, end_date, holidays_set))
     
     Returns:
         datetime or None: Next valid date or None if no valid date found in range
     """
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            return current_date
-        current_date += timedelta(days=1)
-    return None
+    if calendar is None:
+        calendar = get_calendar(start_date, end_date, holidays_set)
+    day = calendar.next_valid(start_date)
+    if day is None or pd.Timestamp(day) > pd.Timestamp(end_date).normalize():
+        return None
+    return day
 
 def get_preferred_slot(semester, program_type="B TECH"):
     """Get preferred time slot based on semester and program type"""
@@ -83,16 +108,15 @@ def get_preferred_slot_with_capacity(semester, date_str, session_capacity, stude
     # If neither fits, return None to indicate no slot available
     return None
 
-def find_next_valid_day_for_electives(start_date, holidays_set):
+def find_next_valid_day_for_electives(start_date, holidays_set, calendar=None):
     """
     Find next valid day for electives (skip Sundays/holidays).
+    The search is not bounded by the calendar's end date; pass `calendar` to reuse
+    one calendar across lookups (default: get_calendar(start_date, start_date, holidays_set)).
     """
-    current_date = start_date
-    while True:
-        if current_date.weekday() != 6 and current_date.date() not in holidays_set:
-            return current_date
-        current_date += timedelta(days=1)
-    return None
+    if calendar is None:
+        calendar = get_calendar(start_date, start_date, holidays_set)
+    return calendar.next_valid(start_date, bounded=False)
 
 def calculate_end_time(start_time, duration):
     """
@@ -148,27 +172,25 @@ def normalize_date_to_ddmmyyyy(date_val):
             return str(date_val)
 
 def format_subject_display(row):
-    """Format subject display for non-electives in Streamlit interface"""
+    """
+    Format subject display for non-electives in Streamlit interface.
+    The session itself is shown from the row's Time Slot; only exams shorter or longer
+    than the 3-hour session get their own time range.
+    """
     subject = row['Subject']
     time_slot = row['Time Slot']
     duration = row.get('Exam Duration', 3)
-    is_common = row.get('CommonAcrossSems', False)
-    semester = row['Semester']
 
     # Add CM Group prefix
     cm_group = str(row.get('CMGroup', '')).strip()
     cm_group_prefix = f"[{cm_group}] " if cm_group and cm_group != "" else ""
 
-    preferred_slot = get_preferred_slot(semester)
-
     time_range = ""
 
     if duration != 3 and time_slot and time_slot.strip():
         start_time = time_slot.split(' - ')[0].strip()
         end_time = calculate_end_time(start_time, duration)
         time_range = f" ({start_time} - {end_time})"
-    elif is_common and time_slot != preferred_slot and time_slot and time_slot.strip():
-        time_range = f" ({time_slot})"
 
     return cm_group_prefix + subject + time_range
 
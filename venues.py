@@ -0,0 +1,255 @@
+"""
+Room- and venue-level seat allocation.
+
+A venue inventory lists rooms with their seat counts and campus. After
+scheduling, every session (date, slot, campus) is packed into that campus's
+rooms by best-fit decreasing: the largest subjects are placed first, each into
+the smallest room that still has enough free seats, and a subject too large for
+any single room is spread over the rooms with the most free seats. Sessions
+that cannot be seated are fed back to the scheduler as lower session
+capacities and the timetable is rebuilt: per campus when the scheduler is
+campus_partition.schedule_by_campus (which also caps every campus partition at
+its own seats), otherwise per session with the shortfalls of all its campuses
+added up.
+"""
+import numpy as np
+import pandas as pd
+
+from campus_partition import schedule_by_campus, _campus_labels
+from data_processing import read_table
+from progress import get_sink
+from sessions import SessionModel
+
+VENUE_COLUMN_MAPPING = {
+    "Room": "Room",
+    "Room Name": "Room",
+    "Room No": "Room",
+    "Venue": "Room",
+    "Hall": "Room",
+    "Campus": "Campus",
+    "Campus Name": "Campus",
+    "Seats": "Seats",
+    "Seat Count": "Seats",
+    "Capacity": "Seats",
+    "Seating Capacity": "Seats",
+}
+
+
+class Room:
+    """One examination room"""
+
+    def __init__(self, name, campus, seats):
+        self.name = name
+        self.campus = campus
+        self.seats = seats
+
+    def __repr__(self):
+        return f"Room({self.name!r}, campus={self.campus!r}, seats={self.seats})"
+
+
+class VenueInventory:
+    """Rooms available in every session, grouped by campus"""
+
+    def __init__(self, rooms):
+        self.rooms = list(rooms)
+        self.by_campus = {}
+        for room in self.rooms:
+            self.by_campus.setdefault(room.campus, []).append(room)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build an inventory from a Room / Campus / Seats table (header variations in VENUE_COLUMN_MAPPING)"""
+        df = df.rename(columns=lambda c: VENUE_COLUMN_MAPPING.get(str(c).strip(), str(c).strip()))
+        if "Room" not in df.columns or "Seats" not in df.columns:
+            raise ValueError("Venue file needs Room and Seats columns")
+        if "Campus" not in df.columns:
+            df["Campus"] = ""
+        seats = pd.to_numeric(df["Seats"], errors="coerce")
+        df = df[df["Room"].notna() & (seats > 0)]
+        return cls(Room(str(room).strip(), "" if pd.isna(campus) else str(campus).strip(), int(count))
+                   for room, campus, count in zip(df["Room"], df["Campus"], seats[df.index]))
+
+    def __len__(self):
+        return len(self.rooms)
+
+    @property
+    def total_seats(self):
+        return sum(room.seats for room in self.rooms)
+
+    def rooms_for(self, campus):
+        """Rooms of a campus; a blank campus (single-campus upload) may use every room"""
+        campus = "" if pd.isna(campus) else str(campus).strip()
+        if not campus:
+            return self.rooms
+        return self.by_campus.get(campus, [])
+
+    def seats_of(self, campus):
+        """Seats per session available to one campus"""
+        return sum(room.seats for room in self.rooms_for(campus))
+
+    def seats_for(self, campuses):
+        """Seats per session available to a group of campuses (every room when one of them is blank)"""
+        campuses = set(campuses)
+        if "" in campuses:
+            return self.total_seats
+        return sum(self.seats_of(campus) for campus in campuses)
+
+    def cap_sessions(self, sessions, campuses):
+        """SessionModel whose capacities never exceed the seats of the given campuses"""
+        return sessions.capped(self.seats_for(campuses))
+
+
+def read_venues(uploaded_file):
+    """Read a venue inventory from an Excel, CSV, Parquet or Feather upload"""
+    return VenueInventory.from_frame(read_table(uploaded_file, columns=set(VENUE_COLUMN_MAPPING)))
+
+
+def pack_session(subjects, rooms):
+    """
+    Best-fit decreasing packing of one session.
+
+    Args:
+        subjects (list): (module_code, subject, students) tuples
+        rooms (list[Room]): rooms available to the session
+
+    Returns:
+        tuple: ([(room name, module_code, subject, students seated)], students left unseated)
+    """
+    free = np.array([room.seats for room in rooms], dtype=np.int64)
+    placements = []
+    unseated = 0
+    for module_code, subject, students in sorted(subjects, key=lambda s: -s[2]):
+        need = int(students)
+        fitting = np.flatnonzero(free >= need)
+        if need > 0 and len(fitting):
+            r = fitting[np.argmin(free[fitting])]
+            free[r] -= need
+            placements.append((rooms[r].name, module_code, subject, need))
+            continue
+        # Too large for any single room: spread over the emptiest rooms
+        for r in np.argsort(-free, kind='stable'):
+            if need <= 0 or free[r] <= 0:
+                break
+            seated = int(min(need, free[r]))
+            free[r] -= seated
+            need -= seated
+            placements.append((rooms[r].name, module_code, subject, seated))
+        unseated += need
+    return placements, unseated
+
+
+def allocate_rooms(df, inventory):
+    """
+    Seat every scheduled session of df in the inventory's rooms.
+
+    Returns:
+        tuple: (allocation DataFrame with Exam Date, Time Slot, Campus, Room, ModuleCode,
+                Subject, Students; list of shortfall dicts with 'date', 'time_slot',
+                'campus', 'student_count', 'seats', 'shortfall')
+    """
+    scheduled = df[df['Exam Date'].notna()].copy()
+    scheduled['Campus'] = _campus_labels(scheduled)
+    scheduled['StudentCount'] = pd.to_numeric(scheduled['StudentCount'], errors='coerce').fillna(0)
+
+    subjects = (scheduled.groupby(['Exam Date', 'Time Slot', 'Campus', 'ModuleCode'], observed=True)
+                .agg(Subject=('Subject', 'first'), Students=('StudentCount', 'sum'))
+                .reset_index())
+
+    rows = []
+    shortfalls = []
+    for (exam_date, time_slot, campus), session in subjects.groupby(['Exam Date', 'Time Slot', 'Campus'], observed=True):
+        rooms = inventory.rooms_for(campus)
+        placements, unseated = pack_session(
+            list(zip(session['ModuleCode'], session['Subject'], session['Students'].astype(int))), rooms
+        )
+        rows.extend((exam_date, time_slot, campus, *placement) for placement in placements)
+        if unseated:
+            shortfalls.append({
+                'date': exam_date,
+                'time_slot': time_slot,
+                'campus': campus,
+                'student_count': int(session['Students'].sum()),
+                'seats': sum(room.seats for room in rooms),
+                'shortfall': int(unseated),
+            })
+
+    allocation = pd.DataFrame(rows, columns=['Exam Date', 'Time Slot', 'Campus', 'Room', 'ModuleCode', 'Subject', 'Students'])
+    return allocation, shortfalls
+
+
+def schedule_with_venues(df, holidays, base_date, end_date, inventory, MAX_STUDENTS_PER_SESSION=2000,
+                         sessions=None, max_rounds=3, scheduler=None, sink=None, **schedule_kwargs):
+    """
+    Schedule, seat every session in real rooms, and reschedule with tightened
+    session capacities while some session cannot be seated.
+
+    Args:
+        df (DataFrame): frame to schedule (not modified)
+        inventory (VenueInventory): rooms available in every session
+        sessions (SessionModel): sessions of the day (None = the standard two sessions)
+        max_rounds (int): scheduling passes at most
+        scheduler (callable): campus_partition.schedule_by_campus (default), which gets
+            per-campus seats and capacities, or any scheduler taking session_capacity_overrides
+            (schedule_all_subjects_comprehensively, multistart.schedule_multistart, ...)
+        **schedule_kwargs: forwarded to the scheduler (backend, improve_seconds, ...)
+
+    Returns:
+        tuple: (scheduled DataFrame, room allocation DataFrame, remaining shortfalls)
+    """
+    sink = get_sink(sink)
+    campus_aware = scheduler is None or scheduler is schedule_by_campus
+    scheduler = scheduler or schedule_by_campus
+    if sessions is None:
+        sessions = SessionModel.from_preset(default_capacity=MAX_STUDENTS_PER_SESSION)
+
+    # Every session is capped at the seats of the campuses being scheduled, each campus at its own
+    campuses = list(_campus_labels(df).unique())
+    campus_seats = {campus: inventory.seats_for([campus]) for campus in campuses}
+    sessions = inventory.cap_sessions(sessions, campuses)
+    per_campus = ", ".join(f"{campus or 'all campuses'}: {seats}" for campus, seats in campus_seats.items())
+    sink.info(f"Venue inventory: {len(inventory)} rooms, {inventory.seats_for(campuses)} seats per session ({per_campus})")
+
+    session_overrides = {}
+    campus_overrides = {}
+    for round_number in range(1, max_rounds + 1):
+        if campus_aware:
+            capacity_kwargs = dict(campus_seats=campus_seats, campus_capacity_overrides=campus_overrides)
+        else:
+            capacity_kwargs = dict(session_capacity_overrides=session_overrides)
+        scheduled = scheduler(df.copy(), holidays, base_date, end_date,
+                              MAX_STUDENTS_PER_SESSION=MAX_STUDENTS_PER_SESSION, sink=sink, sessions=sessions,
+                              **capacity_kwargs, **schedule_kwargs)
+        allocation, shortfalls = allocate_rooms(scheduled, inventory)
+        if not shortfalls:
+            sink.success(f"Room allocation: every session seated ({len(allocation)} room assignments)")
+            break
+
+        # Lower each over-booked campus session to what could be seated, and each session
+        # by the shortfalls of all its campuses added up
+        session_load = scheduled.groupby(['Exam Date', 'Time Slot'], observed=True)['StudentCount'].sum()
+        session_shortfall = {}
+        campus_tightened = session_tightened = 0
+        for shortfall in shortfalls:
+            session = (shortfall['date'], shortfall['time_slot'])
+            session_shortfall[session] = session_shortfall.get(session, 0) + shortfall['shortfall']
+            key = (shortfall['date'], str(shortfall['time_slot']), shortfall['campus'])
+            capacity = max(0, shortfall['student_count'] - shortfall['shortfall'])
+            if capacity < campus_overrides.get(key, float('inf')):
+                campus_overrides[key] = capacity
+                campus_tightened += 1
+        for (exam_date, time_slot), unseated in session_shortfall.items():
+            key = (exam_date, str(time_slot))
+            capacity = max(0, int(session_load[(exam_date, time_slot)]) - unseated)
+            if capacity < session_overrides.get(key, float('inf')):
+                session_overrides[key] = capacity
+                session_tightened += 1
+        tightened = campus_tightened if campus_aware else session_tightened
+
+        sink.warning(f"Room allocation round {round_number}: {len(shortfalls)} campus session(s) short of seats "
+                     f"({sum(s['shortfall'] for s in shortfalls)} students)")
+        if not tightened or round_number == max_rounds:
+            break
+        sink.info(f"Rescheduling with {len(campus_overrides if campus_aware else session_overrides)} "
+                  f"tightened session capacities...")
+
+    return scheduled, allocation, shortfalls